@@ -17,13 +17,39 @@ import logging
 import time
 import uuid
 import asyncio
-from typing import Any, Dict, Optional, Callable, List
+import base64
+import hashlib
+import reprlib
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Callable, List, Tuple
 
 import anthropic
 import httpx
 
 from .config import config
 
+# orjson is optional: 2-5x faster (de)serialization of tool payloads and
+# base64-heavy responses; falls back to the stdlib json module.
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# pybase64 is optional: SIMD base64 for raw-PNG screenshots, which are
+# encoded on the agent side; falls back to the stdlib base64 module.
+try:
+    import pybase64
+    PYBASE64_AVAILABLE = True
+except ImportError:
+    PYBASE64_AVAILABLE = False
+
+try:
+    import h2  # noqa: F401
+    H2_AVAILABLE = True
+except ImportError:
+    H2_AVAILABLE = False
+
 logging.basicConfig(
     level=logging.DEBUG,
     format="%(asctime)s - %(levelname)s - %(name)s - %(message)s",
@@ -74,6 +100,146 @@ TOOLS = [
 ]
 
 MAX_TURNS = 100  # safety limit (increased for complex CI workflows)
+EDITOR_VIEW_MAX_LINES = 2000  # cap on lines returned by the editor's view command
+BATCHABLE_ACTIONS = frozenset({"type", "key", "scroll"})  # computer actions execute_many may batch
+# Actions that only observe state; execute_many runs a turn concurrently only if every call is one
+READ_ONLY_ACTIONS = {
+    "computer": frozenset({"screenshot", "cursor_position"}),
+    "browser": frozenset({"screenshot", "get_content", "get_url", "get_title"}),
+    "str_replace_based_edit_tool": frozenset({"view"}),
+}
+SCREENSHOT_TTL = 0.25  # seconds a screenshot is reused if nothing changed the screen
+FILE_CACHE_SIZE = 16  # editor reads kept for etag revalidation
+SCREENSHOT_BLOCK_CACHE_SIZE = 8  # distinct recent frames whose content blocks are reused
+MAX_WAIT_SECONDS = 60.0  # cap on the computer tool's wait action
+HEALTH_CACHE_TTL = 2.0  # seconds a container health probe result is reused
+EDIT_OFFLOAD_BYTES = 64 * 1024  # file edits larger than this run in a worker thread
+
+# Every tool call goes to the same container host; keep enough warm
+# connections for execute_many() fan-out without churning the pool.
+HTTP_LIMITS = httpx.Limits(max_keepalive_connections=32, max_connections=64, keepalive_expiry=60.0)
+
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Clicks are the most frequent container call; fill a fixed body template
+# instead of building and serializing a nested dict each time.
+_CLICK_TEMPLATE = '{"action":"click","params":{"x":%s,"y":%s,"button":"%s","click_count":%d}}'
+
+
+def _click_body(x: Any, y: Any, button: str, clicks: int) -> bytes:
+    """JSON body for a coordinate click ("button" is always left/right)."""
+    if type(x) in (int, float) and type(y) in (int, float):
+        return (_CLICK_TEMPLATE % (x, y, button, clicks)).encode()
+    # Unexpected coordinate types: let the serializer handle/escape them
+    return _json_dumps({"action": "click", "params": {
+        "x": x, "y": y, "button": button, "click_count": clicks,
+    }})
+
+
+# X keysym names Claude uses → Playwright key names
+KEY_MAPPING = {"Return": "Enter", "BackSpace": "Backspace", "space": " "}
+_key_payload_cache: Dict[str, str] = {}
+
+
+def _key_payload(key: str) -> str:
+    """Browser 'type' text for a key press: single characters as-is, named keys as [Name]."""
+    payload = _key_payload_cache.get(key)
+    if payload is None:
+        mapped = KEY_MAPPING.get(key, key)
+        payload = mapped if len(mapped) == 1 else f"[{mapped}]"
+        if len(_key_payload_cache) < 256:
+            _key_payload_cache[key] = payload
+    return payload
+
+
+def _json_dumps(obj: Any) -> bytes:
+    """Serialize a request body to JSON bytes."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode()
+
+
+def _json_loads(data: bytes) -> Any:
+    """Parse a JSON response body."""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _b64encode(data: bytes) -> str:
+    """Base64-encode *data* to an ASCII str (pybase64 when available)."""
+    if PYBASE64_AVAILABLE:
+        return pybase64.b64encode_as_string(data)
+    return base64.b64encode(data).decode("ascii")
+
+
+# Bounded repr for log previews: long strings (file_text, base64) are cut
+# while formatting instead of being serialized in full and then sliced.
+_preview_repr = reprlib.Repr()
+_preview_repr.maxstring = 80
+_preview_repr.maxother = 80
+_preview_repr.maxlevel = 3
+
+
+def _preview(obj: Any, limit: int = 200) -> str:
+    """Short, cheap preview of a tool input or result for logging."""
+    return _preview_repr.repr(obj)[:limit]
+
+
+def _replace_unique(content: str, old: str, new: str) -> Tuple[Optional[str], int]:
+    """
+    Replace *old* with *new* if it occurs exactly once in *content*.
+
+    Returns (new_content, occurrences); new_content is None unless the
+    string was unique. Uses two find() calls instead of in + count +
+    replace, and only counts every occurrence when reporting ambiguity.
+    """
+    idx = content.find(old)
+    if idx < 0:
+        return None, 0
+    end = idx + len(old)
+    if content.find(old, end) != -1:
+        return None, content.count(old)
+    return content[:idx] + new + content[end:], 1
+
+
+def _insert_line(content: str, idx: int, text: str) -> str:
+    """Insert *text* as a new line after line *idx* (0 = top of file)."""
+    lines = content.split("\n")
+    if idx <= 0:
+        lines.insert(0, text)
+    elif idx >= len(lines):
+        lines.append(text)
+    else:
+        lines.insert(idx, text)
+    return "\n".join(lines)
+
+
+async def _apply_edit(func, content: str, *args):
+    """Run an edit helper, off the event loop when *content* is large."""
+    if len(content) > EDIT_OFFLOAD_BYTES:
+        return await asyncio.to_thread(func, content, *args)
+    return func(content, *args)
+
+
+def _workspace_path(path: str) -> str:
+    """Map an editor path into /workspace (same rule the container enforces)."""
+    if not path.startswith("/workspace"):
+        path = f"/workspace/{path.lstrip('/')}"
+    return path
+
+
+class ContainerHTTPError(Exception):
+    """Non-2xx reply from the container; the message is only built if shown."""
+
+    def __init__(self, status_code: int, url: str):
+        super().__init__(status_code, url)
+        self.status_code = status_code
+        self.url = url
+
+    def __str__(self) -> str:
+        return f"Container returned HTTP {self.status_code} for {self.url}"
 
 
 class ComputerUseAgent:
@@ -84,6 +250,11 @@ class ComputerUseAgent:
     (where actions are physically executed).
     """
 
+    # Process-wide HTTP clients, one per container URL, shared by every agent
+    # talking to that container so sessions reuse warm keep-alive connections.
+    _http_clients: Dict[str, httpx.AsyncClient] = {}
+    _http_client_refs: Dict[str, int] = {}
+
     def __init__(
         self,
         container_url: Optional[str] = None,
@@ -102,6 +273,13 @@ class ComputerUseAgent:
 
         self.container_url = container_url or config.container_url
         print(f"  [OK] Container URL: {self.container_url}")
+        self._url_bash = f"{self.container_url}/tools/bash"
+        self._url_browser = f"{self.container_url}/tools/browser"
+        self._url_screenshot = f"{self.container_url}/tools/screenshot"
+        self._url_read = f"{self.container_url}/tools/file/read"
+        self._url_write = f"{self.container_url}/tools/file/write"
+        self._url_patch = f"{self.container_url}/tools/file/patch"
+        self._url_health = f"{self.container_url}/health"
 
         self.model = model or config.model
         print(f"  [OK] Model: {self.model}")
@@ -109,12 +287,34 @@ class ComputerUseAgent:
         self.anthropic = anthropic.AsyncAnthropic(api_key=self.api_key)
         print(f"  [OK] Anthropic async client created")
 
-        self.http = httpx.AsyncClient(timeout=httpx.Timeout(180.0, connect=10.0))
-        print(f"  [OK] HTTP client created (timeout=180s, connect=10s)")
+        self.http = self.get_http_client(self.container_url)
+        self._http_client_refs[self.container_url] = self._http_client_refs.get(self.container_url, 0) + 1
+        print(f"  [OK] HTTP client ready (shared by "
+              f"{self._http_client_refs[self.container_url]} agent(s) for this container)")
 
         self.conversation_history: List[Dict] = []
         self.last_tool_count = 0  # Track tool calls from last run
 
+        # Per-resource locks for execute_many(): calls that touch the same
+        # resource (display, shell, file path) never overlap, even across turns.
+        self._resource_locks: Dict[str, asyncio.Lock] = {}
+
+        # Screenshot single-flight: concurrent requests share one GET, and a
+        # fresh frame (< SCREENSHOT_TTL, no action since) is reused outright.
+        self._screenshot_inflight: Optional[asyncio.Future] = None
+        self._screenshot_cache: Optional[Tuple[float, List[Dict]]] = None
+        # Recently seen frames by digest, so a screen seen before (e.g. toggling
+        # between two pages) reuses its content block and base64 string.
+        self._screenshot_blocks: "OrderedDict[bytes, List[Dict]]" = OrderedDict()
+
+        # Editor read cache: "path?options" -> (etag, response data). Entries are
+        # revalidated with the container on every read, so they never go stale.
+        self._file_cache: "OrderedDict[str, Tuple[str, Dict]]" = OrderedDict()
+
+        # Container health probe cache: (timestamp, healthy)
+        self._health_cache: Optional[Tuple[float, bool]] = None
+        self._health_lock = asyncio.Lock()
+
         print(f"  [OK] Tools registered: {[t['name'] for t in TOOLS]}")
         print(f"  [OK] Display: {config.display_width}x{config.display_height}")
         print(f"  [OK] Max turns: {MAX_TURNS}")
@@ -124,6 +324,49 @@ class ComputerUseAgent:
 
         logger.info(f"Agent ready  model={self.model}  container={self.container_url}")
 
+    # ── Shared HTTP clients ──────────────────────────────────────────
+
+    @classmethod
+    def get_http_client(cls, container_url: str) -> httpx.AsyncClient:
+        """Return the shared HTTP client for *container_url*, creating it if needed."""
+        client = cls._http_clients.get(container_url)
+        if client is None or client.is_closed:
+            http2 = config.container_http2 and H2_AVAILABLE
+            client = httpx.AsyncClient(
+                timeout=httpx.Timeout(180.0, connect=10.0),
+                transport=httpx.AsyncHTTPTransport(retries=1, http2=http2, limits=HTTP_LIMITS),
+            )
+            cls._http_clients[container_url] = client
+            print(f"  [agent] HTTP client created for {container_url} (timeout=180s, connect=10s, "
+                  f"keepalive={HTTP_LIMITS.max_keepalive_connections}, http2={http2})")
+        return client
+
+    @classmethod
+    async def warm_up(cls, container_url: str) -> bool:
+        """
+        Open the shared client's connection pool ahead of the first task.
+
+        The client is pinned for the life of the process (until
+        close_http_clients()), so per-task agents never close it.
+        """
+        client = cls.get_http_client(container_url)
+        cls._http_client_refs[container_url] = cls._http_client_refs.get(container_url, 0) + 1
+        try:
+            resp = await client.get(f"{container_url}/health", timeout=5.0)
+            return resp.status_code == 200
+        except Exception as e:
+            logger.warning(f"Warm-up of {container_url} failed: {e}")
+            return False
+
+    @classmethod
+    async def close_http_clients(cls):
+        """Close every shared HTTP client (call on application shutdown)."""
+        for url, client in list(cls._http_clients.items()):
+            print(f"  [agent] Closing HTTP client for {url}")
+            await client.aclose()
+        cls._http_clients.clear()
+        cls._http_client_refs.clear()
+
     # ── Public API ───────────────────────────────────────────────────
 
     async def run(
@@ -224,7 +467,7 @@ class ComputerUseAgent:
                     print(f"     Block[{i}] text: \"{text_preview}...\"")
                 elif block.type == "tool_use":
                     print(f"     Block[{i}] tool_use: {block.name} (id={block.id[:12]}...)")
-                    print(f"                input: {json.dumps(block.input)[:200]}")
+                    print(f"                input: {_preview(block.input)}")
                 else:
                     print(f"     Block[{i}] type={block.type}")
 
@@ -262,44 +505,43 @@ class ComputerUseAgent:
             print(f"\n  Tool calls to execute this turn: {len(tool_blocks)}")
 
             for idx, block in enumerate(tool_blocks):
-                if block.type != "tool_use":
-                    continue
-
                 tool_count += 1
                 print(f"\n  {'>' * 40}")
                 print(f"  TOOL CALL #{tool_count}  (turn {turn + 1}, item {idx + 1}/{len(tool_blocks)})")
                 print(f"  {'>' * 40}")
                 print(f"    Tool name: {block.name}")
                 print(f"    Tool ID:   {block.id}")
-                print(f"    Input:     {json.dumps(block.input, indent=2)[:500]}")
+                print(f"    Input:     {_preview(block.input, 500)}")
 
                 logger.info(
                     f"[{cid}] Tool #{tool_count}: {block.name} "
-                    f"{json.dumps(block.input)[:100]}"
+                    f"{_preview(block.input, 100)}"
                 )
                 if on_iteration:
                     on_iteration(tool_count, f"executing_{block.name}")
 
-                tool_start = time.time()
-                result = await self._execute_tool(block.name, block.input)
-                tool_elapsed = time.time() - tool_start
+            # Independent calls run concurrently; results come back in block order
+            tool_start = time.time()
+            results = await self.execute_many([(b.name, b.input) for b in tool_blocks])
+            tool_elapsed = time.time() - tool_start
 
+            for block, result in zip(tool_blocks, results):
                 # Log the result
                 if isinstance(result, list) and result and isinstance(result[0], dict) and result[0].get("type") == "image":
-                    print(f"    Result: [screenshot image, base64 len={len(result[0]['source']['data'])}]")
+                    print(f"    Result [{block.name}]: [screenshot image, base64 len={len(result[0]['source']['data'])}]")
                 elif isinstance(result, str):
                     result_preview = result[:300].replace("\n", "\\n")
-                    print(f"    Result: \"{result_preview}\"")
+                    print(f"    Result [{block.name}]: \"{result_preview}\"")
                 else:
-                    print(f"    Result: {str(result)[:300]}")
-                print(f"    Execution time: {tool_elapsed:.2f}s")
-                print(f"  {'<' * 40}")
+                    print(f"    Result [{block.name}]: {str(result)[:300]}")
 
                 tool_results.append({
                     "type": "tool_result",
                     "tool_use_id": block.id,
                     "content": result,
                 })
+            print(f"    Execution time: {tool_elapsed:.2f}s for {len(tool_blocks)} call(s)")
+            print(f"  {'<' * 40}")
 
             print(f"\n  Sending {len(tool_results)} tool result(s) back to Claude...")
             messages.append({"role": "user", "content": tool_results})
@@ -310,11 +552,109 @@ class ComputerUseAgent:
         logger.warning(f"[{cid}] Hit max turns ({MAX_TURNS})")
         return "Reached maximum turns. Task may be incomplete."
 
+    async def health_check(self) -> bool:
+        """
+        Return whether the container's /health endpoint responds OK.
+
+        Results are cached for HEALTH_CACHE_TTL seconds and concurrent
+        callers share a single probe.
+        """
+        cached = self._health_cache
+        if cached and time.monotonic() - cached[0] < HEALTH_CACHE_TTL:
+            return cached[1]
+
+        async with self._health_lock:
+            # Another caller may have refreshed it while we waited
+            cached = self._health_cache
+            if cached and time.monotonic() - cached[0] < HEALTH_CACHE_TTL:
+                return cached[1]
+            try:
+                resp = await self.http.get(self._url_health, timeout=10.0)
+                healthy = resp.status_code == 200
+            except Exception as e:
+                logger.error(f"Container health check failed: {e}")
+                healthy = False
+            self._health_cache = (time.monotonic(), healthy)
+            return healthy
+
     # ── Tool dispatch ────────────────────────────────────────────────
 
+    async def execute_many(self, calls: List[Tuple[str, Dict]]) -> List[Any]:
+        """
+        Execute several tool calls, returning results in input order.
+
+        The model may rely on the order of calls within a turn (write a file,
+        then run it), so calls run one after another unless every one of them
+        is read-only, in which case they run concurrently. A failure in one
+        call becomes an "Error: ..." result and never stops the others.
+        Runs of consecutive type/key/scroll actions are sent as a single
+        batched container request.
+        """
+        # Consecutive type/key/scroll actions go to the container as one batch
+        groups: List[Tuple[bool, List[int]]] = []
+        for i, (name, tool_input) in enumerate(calls):
+            batchable = name == "computer" and tool_input.get("action") in BATCHABLE_ACTIONS
+            if batchable and groups and groups[-1][0]:
+                groups[-1][1].append(i)
+            else:
+                groups.append((batchable, [i]))
+
+        async def run_group(batchable: bool, idxs: List[int]) -> List[Any]:
+            if batchable and len(idxs) > 1:
+                async with self._resource_locks.setdefault("display", asyncio.Lock()):
+                    return await self._execute_batch([calls[i][1] for i in idxs])
+            return [await self._execute_locked(*calls[idxs[0]])]
+
+        if all(self._is_read_only(name, tool_input) for name, tool_input in calls):
+            grouped = await asyncio.gather(
+                *(run_group(batchable, idxs) for batchable, idxs in groups),
+                return_exceptions=True,
+            )
+        else:
+            grouped = []
+            for batchable, idxs in groups:
+                try:
+                    grouped.append(await run_group(batchable, idxs))
+                except Exception as e:
+                    grouped.append(e)
+        results: List[Any] = []
+        for (_, idxs), group_results in zip(groups, grouped):
+            if isinstance(group_results, Exception):
+                results.extend([f"Error: {group_results}"] * len(idxs))
+            else:
+                results.extend(group_results)
+        return results
+
+    async def _execute_locked(self, name: str, tool_input: Dict) -> Any:
+        """Run one tool call while holding the lock of the resource it touches."""
+        key = self._resource_key(name, tool_input)
+        if key is None:
+            return await self._execute_tool(name, tool_input)
+        lock = self._resource_locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            return await self._execute_tool(name, tool_input)
+
+    @staticmethod
+    def _is_read_only(name: str, tool_input: Dict) -> bool:
+        key = "command" if name == "str_replace_based_edit_tool" else "action"
+        return tool_input.get(key) in READ_ONLY_ACTIONS.get(name, ())
+
+    @staticmethod
+    def _resource_key(name: str, tool_input: Dict) -> Optional[str]:
+        if name in ("computer", "browser"):
+            return "display"
+        if name == "bash":
+            return "shell"
+        if name == "str_replace_based_edit_tool":
+            return f"file:{_workspace_path(tool_input.get('path', ''))}"
+        return None
+
     async def _execute_tool(self, name: str, tool_input: Dict) -> Any:
         """Route a tool call to the correct container endpoint."""
         print(f"    [dispatch] Routing tool '{name}' to container {self.container_url}")
+        if not (name == "computer" and tool_input.get("action") == "screenshot"):
+            # Anything else may change what is on screen
+            self._screenshot_cache = None
         try:
             if name == "computer":
                 return await self._exec_computer(tool_input)
@@ -339,21 +679,7 @@ class ComputerUseAgent:
         print(f"    [computer] Action: {action}")
 
         if action == "screenshot":
-            print(f"    [computer] Taking screenshot via GET {self.container_url}/tools/screenshot")
-            resp = await self.http.get(f"{self.container_url}/tools/screenshot")
-            resp.raise_for_status()
-            data = resp.json()
-            b64_len = len(data.get("image_base64", ""))
-            print(f"    [computer] Screenshot received: base64 length={b64_len}, "
-                  f"dimensions={data.get('width', '?')}x{data.get('height', '?')}")
-            return [{
-                "type": "image",
-                "source": {
-                    "type": "base64",
-                    "media_type": "image/png",
-                    "data": data["image_base64"],
-                },
-            }]
+            return await self._screenshot()
 
         if action in ("left_click", "right_click", "double_click"):
             coord = inp.get("coordinate", [0, 0])
@@ -361,54 +687,21 @@ class ComputerUseAgent:
             clicks = 2 if action == "double_click" else 1
             print(f"    [computer] {action}: coordinate=({coord[0]}, {coord[1]}), "
                   f"button={button}, clicks={clicks}")
-            for click_num in range(clicks):
-                print(f"    [computer] Sending click {click_num + 1}/{clicks} to "
-                      f"POST {self.container_url}/tools/browser")
-                await self.http.post(
-                    f"{self.container_url}/tools/browser",
-                    json={"action": "click", "params": {"x": coord[0], "y": coord[1], "button": button}},
-                )
-            print(f"    [computer] {action} completed at ({coord[0]}, {coord[1]})")
-            return f"{action} at ({coord[0]}, {coord[1]})"
-
-        if action == "type":
-            text = inp.get("text", "")
-            print(f"    [computer] Typing text: \"{text[:80]}{'...' if len(text) > 80 else ''}\" "
-                  f"(length={len(text)})")
-            print(f"    [computer] POST {self.container_url}/tools/browser")
+            print(f"    [computer] POST {self._url_browser}")
             await self.http.post(
-                f"{self.container_url}/tools/browser",
-                json={"action": "type", "params": {"text": text}},
+                self._url_browser,
+                content=_click_body(coord[0], coord[1], button, clicks),
+                headers=JSON_HEADERS,
             )
-            print(f"    [computer] Type completed")
-            return f"Typed text"
+            print(f"    [computer] {action} completed at ({coord[0]}, {coord[1]})")
+            return f"{action} at ({coord[0]}, {coord[1]})"
 
-        if action == "key":
-            key = inp.get("key", "")
-            mapped = {"Return": "Enter", "BackSpace": "Backspace", "space": " "}.get(key, key)
-            payload = mapped if len(mapped) == 1 else f"[{mapped}]"
-            print(f"    [computer] Key press: '{key}' → mapped='{mapped}' → payload='{payload}'")
-            print(f"    [computer] POST {self.container_url}/tools/browser")
-            await self.http.post(
-                f"{self.container_url}/tools/browser",
-                json={"action": "type", "params": {"text": payload}},
-            )
-            print(f"    [computer] Key press completed")
-            return f"Pressed key: {key}"
-
-        if action == "scroll":
-            direction = inp.get("scroll_direction", "down")
-            raw_amount = inp.get("scroll_amount", 3)
-            amount = raw_amount * 100
-            print(f"    [computer] Scroll: direction={direction}, raw_amount={raw_amount}, "
-                  f"pixels={amount}")
-            print(f"    [computer] POST {self.container_url}/tools/browser")
-            await self.http.post(
-                f"{self.container_url}/tools/browser",
-                json={"action": "scroll", "params": {"direction": direction, "amount": amount}},
-            )
-            print(f"    [computer] Scroll completed")
-            return f"Scrolled {direction}"
+        if action in BATCHABLE_ACTIONS:
+            op, result = self._input_op(inp)
+            print(f"    [computer] POST {self._url_browser}")
+            await self._post(self._url_browser, op)
+            print(f"    [computer] {action} completed")
+            return result
 
         if action == "mouse_move":
             coord = inp.get("coordinate", [0, 0])
@@ -424,10 +717,11 @@ class ComputerUseAgent:
             return "Drag executed"
 
         if action == "wait":
-            print(f"    [computer] Waiting 1 second...")
-            await asyncio.sleep(1)
+            seconds = max(0.0, min(float(inp.get("duration", config.default_wait_seconds)), MAX_WAIT_SECONDS))
+            print(f"    [computer] Waiting {seconds} second(s)...")
+            await asyncio.sleep(seconds)
             print(f"    [computer] Wait completed")
-            return "Waited 1 second"
+            return f"Waited {seconds} second(s)"
 
         # NEW: Add URL navigation support (navigates via Playwright browser tool)
         if action == "navigate" or action == "goto":
@@ -435,15 +729,13 @@ class ComputerUseAgent:
             if not url:
                 return "Error: URL is required for navigation"
             print(f"    [computer] Navigating to URL: {url}")
-            print(f"    [computer] POST {self.container_url}/tools/browser (navigate action)")
+            print(f"    [computer] POST {self._url_browser} (navigate action)")
             try:
-                resp = await self.http.post(
-                    f"{self.container_url}/tools/browser",
-                    json={"action": "navigate", "params": {"url": url, "wait_until": "networkidle", "timeout": 30000}},
+                data = await self._post_json(
+                    self._url_browser,
+                    {"action": "navigate", "params": {"url": url, "wait_until": "networkidle", "timeout": 30000}},
                     timeout=35.0
                 )
-                resp.raise_for_status()
-                data = resp.json()
                 print(f"    [computer] Navigation completed: {data.get('url', url)}")
                 # Wait additional 2 seconds for page to fully render
                 await asyncio.sleep(2)
@@ -456,6 +748,137 @@ class ComputerUseAgent:
         print(f"    [computer] Unknown action: {action}")
         return f"Unknown computer action: {action}"
 
+    async def _screenshot(self) -> List[Dict]:
+        """Fetch a screenshot, sharing in-flight and just-taken frames."""
+        cached = self._screenshot_cache
+        if cached and time.monotonic() - cached[0] < SCREENSHOT_TTL:
+            print(f"    [computer] Reusing screenshot taken {time.monotonic() - cached[0]:.3f}s ago")
+            return cached[1]
+        if self._screenshot_inflight is not None:
+            print(f"    [computer] Joining in-flight screenshot request")
+            return await asyncio.shield(self._screenshot_inflight)
+
+        fut = asyncio.get_running_loop().create_future()
+        self._screenshot_inflight = fut
+        try:
+            print(f"    [computer] Taking screenshot via GET {self._url_screenshot}")
+            # Ask for raw PNG bytes; older containers still answer with base64 JSON
+            resp = await self.http.get(
+                self._url_screenshot, headers={"Accept": "image/png"},
+            )
+            resp.raise_for_status()
+            if resp.headers.get("content-type", "").startswith("image/png"):
+                png: Optional[bytes] = resp.content
+                b64 = None
+                raw = png
+                print(f"    [computer] Screenshot received: {len(png)} PNG bytes, "
+                      f"dimensions={resp.headers.get('x-image-width', '?')}x"
+                      f"{resp.headers.get('x-image-height', '?')}")
+            else:
+                data = _json_loads(resp.content)
+                png = None
+                b64 = data["image_base64"]
+                raw = b64.encode()
+                print(f"    [computer] Screenshot received: base64 length={len(b64)}, "
+                      f"dimensions={data.get('width', '?')}x{data.get('height', '?')}")
+
+            # Frame seen recently: hand back the existing content block
+            # (and skip base64-encoding it again)
+            digest = hashlib.blake2b(raw, digest_size=8).digest()
+            content = self._screenshot_blocks.get(digest)
+            if content is not None:
+                print(f"    [computer] Same frame as a recent screenshot, reusing it")
+                self._screenshot_blocks.move_to_end(digest)
+            else:
+                if b64 is None:
+                    b64 = _b64encode(png)
+                content = [{
+                    "type": "image",
+                    "source": {
+                        "type": "base64",
+                        "media_type": "image/png",
+                        "data": b64,
+                    },
+                }]
+                self._screenshot_blocks[digest] = content
+                if len(self._screenshot_blocks) > SCREENSHOT_BLOCK_CACHE_SIZE:
+                    self._screenshot_blocks.popitem(last=False)
+
+            self._screenshot_cache = (time.monotonic(), content)
+            fut.set_result(content)
+            return content
+        except asyncio.CancelledError:
+            fut.cancel()
+            raise
+        except Exception as e:
+            fut.set_exception(e)
+            fut.exception()  # mark retrieved when nobody else was waiting
+            raise
+        finally:
+            self._screenshot_inflight = None
+
+    def _input_op(self, inp: Dict) -> Tuple[Dict, str]:
+        """Translate a type/key/scroll computer action into a browser op + its result text."""
+        action = inp.get("action")
+
+        if action == "type":
+            text = inp.get("text", "")
+            print(f"    [computer] Typing text: \"{text[:80]}{'...' if len(text) > 80 else ''}\" "
+                  f"(length={len(text)})")
+            return {"action": "type", "params": {"text": text}}, "Typed text"
+
+        if action == "key":
+            key = inp.get("key", "")
+            payload = _key_payload(key)
+            print(f"    [computer] Key press: '{key}' → payload='{payload}'")
+            return {"action": "type", "params": {"text": payload}}, f"Pressed key: {key}"
+
+        # scroll
+        direction = inp.get("scroll_direction", "down")
+        raw_amount = inp.get("scroll_amount", 3)
+        amount = raw_amount * 100
+        print(f"    [computer] Scroll: direction={direction}, raw_amount={raw_amount}, "
+              f"pixels={amount}")
+        return (
+            {"action": "scroll", "params": {"direction": direction, "amount": amount}},
+            f"Scrolled {direction}",
+        )
+
+    async def _execute_batch(self, inputs: List[Dict]) -> List[Any]:
+        """
+        Send a run of type/key/scroll actions to the container in one request.
+
+        Each input still gets its own result string. Containers without
+        the batch action get the actions one by one.
+        """
+        self._screenshot_cache = None
+        ops, results = zip(*(self._input_op(inp) for inp in inputs))
+        print(f"    [computer] Batching {len(ops)} input actions into one "
+              f"POST {self._url_browser}")
+        try:
+            data = await self._post_json(
+                self._url_browser,
+                {"action": "batch", "params": {"ops": list(ops)}},
+            )
+        except Exception as e:
+            print(f"    [computer] Batch failed: {e}")
+            logger.error(f"Tool error (computer batch): {e}")
+            return [f"Error: {e}"] * len(inputs)
+
+        if data.get("status") == "error":
+            print(f"    [computer] Batch unsupported ({data.get('error')}), sending one by one")
+            return [await self._execute_tool("computer", inp) for inp in inputs]
+
+        op_results = data.get("data", {}).get("results", [])
+        out = []
+        for i, result in enumerate(results):
+            op_result = op_results[i] if i < len(op_results) else {}
+            if isinstance(op_result, dict) and "error" in op_result:
+                out.append(f"Error: {op_result['error']}")
+            else:
+                out.append(result)
+        return out
+
     # ── bash tool ────────────────────────────────────────────────────
 
     async def _exec_bash(self, inp: Dict) -> str:
@@ -465,14 +888,12 @@ class ComputerUseAgent:
 
         command = inp.get("command", "")
         print(f"    [bash] Executing command: \"{command[:200]}\"")
-        print(f"    [bash] POST {self.container_url}/tools/bash")
+        print(f"    [bash] POST {self._url_bash}")
 
-        resp = await self.http.post(
-            f"{self.container_url}/tools/bash",
-            json={"command": command, "timeout": 120},
+        data = await self._post_json(
+            self._url_bash,
+            {"command": command, "timeout": 120},
         )
-        resp.raise_for_status()
-        data = resp.json()
 
         print(f"    [bash] Return code: {data.get('return_code', '?')}")
         if data.get("stdout"):
@@ -502,17 +923,15 @@ class ComputerUseAgent:
         params = inp.get("params", {})
 
         print(f"    [browser] Action: {action}")
-        print(f"    [browser] Params: {json.dumps(params, indent=2)[:200]}")
-        print(f"    [browser] POST {self.container_url}/tools/browser")
+        print(f"    [browser] Params: {_preview(params)}")
+        print(f"    [browser] POST {self._url_browser}")
 
         try:
-            resp = await self.http.post(
-                f"{self.container_url}/tools/browser",
-                json={"action": action, "params": params},
+            data = await self._post_json(
+                self._url_browser,
+                {"action": action, "params": params},
                 timeout=60.0,
             )
-            resp.raise_for_status()
-            data = resp.json()
 
             status = data.get("status", "unknown")
             print(f"    [browser] Status: {status}")
@@ -538,7 +957,7 @@ class ComputerUseAgent:
 
             # For other actions, return formatted result
             if result_data:
-                result_preview = json.dumps(result_data, indent=2)[:500]
+                result_preview = _preview(result_data, 500)
                 print(f"    [browser] Result: {result_preview}")
                 return json.dumps({"success": True, "action": action, "data": result_data})
             else:
@@ -553,35 +972,48 @@ class ComputerUseAgent:
 
     async def _exec_editor(self, inp: Dict) -> str:
         command = inp.get("command")
-        path = inp.get("path", "")
-        if not path.startswith("/workspace"):
-            path = f"/workspace/{path.lstrip('/')}"
+        path = _workspace_path(inp.get("path", ""))
 
         print(f"    [editor] Command: {command}")
         print(f"    [editor] Path: {path}")
 
+        if command in ("create", "str_replace", "insert"):
+            self._forget_file(path)
+
         if command == "view":
-            print(f"    [editor] Reading file via POST {self.container_url}/tools/file/read")
-            resp = await self.http.post(
-                f"{self.container_url}/tools/file/read", json={"path": path},
-            )
-            if resp.status_code == 404:
+            print(f"    [editor] Reading file via POST {self._url_read}")
+            data = await self._read_file(path, numbered=True, max_lines=EDITOR_VIEW_MAX_LINES)
+            if data is None:
                 print(f"    [editor] File not found: {path}")
                 return f"Error: File not found: {path}"
-            resp.raise_for_status()
-            content = resp.json().get("content", "")
+            content = data.get("content", "")
+
+            if data.get("numbered"):
+                # Container already numbered (and capped) the lines
+                total = data.get("total_lines", 0)
+                print(f"    [editor] File read OK: {total} lines, {len(content)} chars (numbered)")
+                if data.get("truncated"):
+                    content += f"\n... [showing {EDITOR_VIEW_MAX_LINES} of {total} lines]"
+                return content
+
+            # Older container: number the lines here
             lines = content.split("\n")
             print(f"    [editor] File read OK: {len(lines)} lines, {len(content)} chars")
             print(f"    [editor] Content preview: {content[:200]}")
-            return "\n".join(f"{i+1:4d}\t{line}" for i, line in enumerate(lines))
+            numbered = "\n".join(
+                f"{i+1:4d}\t{line}" for i, line in enumerate(lines[:EDITOR_VIEW_MAX_LINES])
+            )
+            if len(lines) > EDITOR_VIEW_MAX_LINES:
+                numbered += f"\n... [showing {EDITOR_VIEW_MAX_LINES} of {len(lines)} lines]"
+            return numbered
 
         if command == "create":
             file_text = inp.get("file_text", "")
             print(f"    [editor] Creating file: {path} ({len(file_text)} chars)")
-            print(f"    [editor] POST {self.container_url}/tools/file/write")
-            resp = await self.http.post(
-                f"{self.container_url}/tools/file/write",
-                json={"path": path, "content": file_text},
+            print(f"    [editor] POST {self._url_write}")
+            resp = await self._post(
+                self._url_write,
+                {"path": path, "content": file_text},
             )
             resp.raise_for_status()
             print(f"    [editor] File created successfully: {path}")
@@ -593,30 +1025,46 @@ class ComputerUseAgent:
             print(f"    [editor] str_replace in {path}")
             print(f"    [editor]   old_str: \"{old[:100]}\"")
             print(f"    [editor]   new_str: \"{new[:100]}\"")
-            print(f"    [editor] Reading file first...")
 
-            read = await self.http.post(
-                f"{self.container_url}/tools/file/read", json={"path": path},
+            resp = await self._patch_file(
+                {"path": path, "op": "str_replace", "old_str": old, "new_str": new}
             )
-            if read.status_code == 404:
+            if resp is not None:
+                if resp.status_code == 404:
+                    print(f"    [editor] File not found: {path}")
+                    return f"Error: File not found: {path}"
+                resp.raise_for_status()
+                count = _json_loads(resp.content).get("count", 0)
+                if count == 0:
+                    print(f"    [editor] ERROR: old_str not found in file")
+                    return "Error: String not found in file"
+                if count > 1:
+                    print(f"    [editor] ERROR: old_str appears {count} times (must be unique)")
+                    return f"Error: String appears {count} times. Be more specific."
+                print(f"    [editor] Replacement complete in {path}")
+                return f"Replaced text in {path}"
+
+            print(f"    [editor] Reading file first...")
+
+            data = await self._read_file(path)
+            if data is None:
                 print(f"    [editor] File not found: {path}")
                 return f"Error: File not found: {path}"
-            read.raise_for_status()
-            content = read.json().get("content", "")
+            content = data.get("content", "")
             print(f"    [editor] File read: {len(content)} chars")
 
-            if old not in content:
+            new_content, count = await _apply_edit(_replace_unique, content, old, new)
+            if count == 0:
                 print(f"    [editor] ERROR: old_str not found in file")
                 return "Error: String not found in file"
-            if content.count(old) > 1:
-                count = content.count(old)
+            if count > 1:
                 print(f"    [editor] ERROR: old_str appears {count} times (must be unique)")
                 return f"Error: String appears {count} times. Be more specific."
 
             print(f"    [editor] Replacing and writing back...")
-            await self.http.post(
-                f"{self.container_url}/tools/file/write",
-                json={"path": path, "content": content.replace(old, new, 1)},
+            await self._post_json(
+                self._url_write,
+                {"path": path, "content": new_content},
             )
             print(f"    [editor] Replacement complete in {path}")
             return f"Replaced text in {path}"
@@ -627,27 +1075,30 @@ class ComputerUseAgent:
             print(f"    [editor] Insert at line {idx} in {path}")
             print(f"    [editor] Text to insert: \"{new_str[:100]}\"")
 
-            read = await self.http.post(
-                f"{self.container_url}/tools/file/read", json={"path": path},
+            resp = await self._patch_file(
+                {"path": path, "op": "insert", "insert_line": idx, "new_str": new_str}
             )
-            if read.status_code == 404:
+            if resp is not None:
+                if resp.status_code == 404:
+                    print(f"    [editor] File not found: {path}")
+                    return f"Error: File not found: {path}"
+                resp.raise_for_status()
+                print(f"    [editor] Insert complete at line {idx}")
+                return f"Inserted text at line {idx}"
+
+            data = await self._read_file(path)
+            if data is None:
                 print(f"    [editor] File not found: {path}")
                 return f"Error: File not found: {path}"
-            read.raise_for_status()
-
-            lines = read.json().get("content", "").split("\n")
-            print(f"    [editor] File has {len(lines)} lines, inserting at {idx}")
 
-            if idx <= 0:
-                lines.insert(0, new_str)
-            elif idx >= len(lines):
-                lines.append(new_str)
-            else:
-                lines.insert(idx, new_str)
+            content = data.get("content", "")
+            line_count = content.count("\n") + 1
+            print(f"    [editor] File has {line_count} lines, inserting at {idx}")
+            new_content = await _apply_edit(_insert_line, content, idx, new_str)
 
-            await self.http.post(
-                f"{self.container_url}/tools/file/write",
-                json={"path": path, "content": "\n".join(lines)},
+            await self._post_json(
+                self._url_write,
+                {"path": path, "content": new_content},
             )
             print(f"    [editor] Insert complete at line {idx}")
             return f"Inserted text at line {idx}"
@@ -659,6 +1110,86 @@ class ComputerUseAgent:
         print(f"    [editor] Unknown command: {command}")
         return f"Unknown editor command: {command}"
 
+    def _post(self, url: str, body: Dict, **kwargs):
+        """POST *body* as JSON (pre-serialized with orjson when available)."""
+        return self.http.post(url, content=_json_dumps(body), headers=JSON_HEADERS, **kwargs)
+
+    async def _post_json(self, url: str, body: Dict, **kwargs) -> Any:
+        """POST *body* and return the decoded JSON reply, raising on non-2xx."""
+        resp = await self._post(url, body, **kwargs)
+        if resp.is_success:
+            return _json_loads(resp.content)
+        raise ContainerHTTPError(resp.status_code, url)
+
+    async def _read_file(self, path: str, **options) -> Optional[Dict]:
+        """
+        Read a file from the container, revalidating any cached copy by etag.
+
+        Returns the read response data, or None if the file does not exist.
+        An unchanged file costs one round-trip with an empty 304 body.
+        """
+        key = path + "?" + "&".join(f"{k}={v}" for k, v in sorted(options.items()))
+        cached = self._file_cache.get(key)
+        body = {"path": path, **options}
+        if cached:
+            body["if_etag"] = cached[0]
+
+        resp = await self._post(self._url_read, body)
+        if resp.status_code == 304 and cached:
+            print(f"    [editor] {path} unchanged since last read, using cached copy")
+            self._file_cache.move_to_end(key)
+            return cached[1]
+        if resp.status_code == 404:
+            return None
+        if not resp.is_success:
+            raise ContainerHTTPError(resp.status_code, self._url_read)
+        data = _json_loads(resp.content)
+
+        etag = data.get("etag")
+        if etag:
+            self._file_cache[key] = (etag, data)
+            self._file_cache.move_to_end(key)
+            while len(self._file_cache) > FILE_CACHE_SIZE:
+                self._file_cache.popitem(last=False)
+        return data
+
+    def _forget_file(self, path: str):
+        """Drop cached reads of *path* before it is modified."""
+        prefix = path + "?"
+        for key in [k for k in self._file_cache if k.startswith(prefix)]:
+            del self._file_cache[key]
+
+    async def _patch_file(self, body: Dict) -> Optional[httpx.Response]:
+        """
+        Edit a file in the container with one request.
+
+        Returns None when the container predates /tools/file/patch, in
+        which case the caller falls back to read + write.
+        """
+        print(f"    [editor] POST {self._url_patch} ({body['op']})")
+        resp = await self._post(self._url_patch, body)
+        if resp.status_code == 501 or (
+            resp.status_code in (404, 405) and self._route_missing(resp)
+        ):
+            print(f"    [editor] Patch endpoint unavailable, falling back to read/write")
+            return None
+        return resp
+
+    @staticmethod
+    def _route_missing(resp: httpx.Response) -> bool:
+        """
+        True if a 404/405 means the route does not exist, not that the file is missing.
+
+        FastAPI's own "Not Found" / "Method Not Allowed" bodies mean an older
+        container; a non-JSON body (a proxy's HTML or text page) is treated
+        the same way, since the tool server always answers in JSON.
+        """
+        try:
+            detail = _json_loads(resp.content).get("detail")
+        except (ValueError, AttributeError):
+            return True
+        return detail in ("Not Found", "Method Not Allowed")
+
     # ── Helpers ──────────────────────────────────────────────────────
 
     def reset_conversation(self):
@@ -670,8 +1201,17 @@ class ComputerUseAgent:
         return self.conversation_history.copy()
 
     async def cleanup(self):
-        print(f"  [agent] Cleaning up HTTP client...")
-        await self.http.aclose()
+        url = self.container_url
+        refs = self._http_client_refs.get(url, 0) - 1
+        if refs > 0:
+            self._http_client_refs[url] = refs
+            print(f"  [agent] HTTP client still used by {refs} other agent(s), leaving it open")
+        else:
+            print(f"  [agent] Cleaning up HTTP client...")
+            self._http_client_refs.pop(url, None)
+            if self._http_clients.get(url) is self.http:
+                del self._http_clients[url]
+            await self.http.aclose()
         print(f"  [agent] Cleanup complete")
         logger.info("Agent cleaned up")
 
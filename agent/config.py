@@ -38,6 +38,16 @@ class AgentConfig:
         default_factory=lambda: int(os.getenv("DISPLAY_HEIGHT", "1080"))
     )
 
+    # Default pause for the computer tool's "wait" action when Claude gives no duration
+    default_wait_seconds: float = field(
+        default_factory=lambda: float(os.getenv("DEFAULT_WAIT_SECONDS", "1.0"))
+    )
+
+    # HTTP/2 to the container (needs the `h2` package and an h2-capable endpoint)
+    container_http2: bool = field(
+        default_factory=lambda: os.getenv("CONTAINER_HTTP2", "false").lower() == "true"
+    )
+
     # Logging
     log_level: str = field(
         default_factory=lambda: os.getenv("LOG_LEVEL", "INFO")
@@ -6,14 +6,25 @@ Exposes DynamicAgent with S3 Skills + MCP Tools
 
 import os
 import sys
+import time
+import uuid
+import base64
+import queue
 import logging
+import logging.handlers
 import asyncio
+import functools
+import contextlib
+import concurrent.futures
+from collections import OrderedDict
 from datetime import datetime
 from typing import Optional, Dict, Any, List
 from pathlib import Path
 
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
+import anyio
 from pydantic import BaseModel, Field
 import uvicorn
 import json
@@ -32,6 +43,7 @@ except ImportError:
 sys.path.insert(0, str(Path(__file__).parent / "orchestrator"))
 
 from agent_runner import DynamicAgent
+from tool_result import ToolResult
 from claude_options import ClaudeAgentOptions, create_agent_with_options
 
 # Import S3 storage helpers
@@ -42,6 +54,15 @@ except ImportError:
     S3_STORAGE_AVAILABLE = False
     logger.warning("S3 storage not available")
 
+# orjson is optional: faster encoding of SSE events and screenshot results
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+BANNER = "=" * 80
+
 # Configure logging with detailed formatting
 logging.basicConfig(
     level=logging.INFO,
@@ -54,11 +75,19 @@ logger = logging.getLogger(__name__)
 console = logging.StreamHandler()
 console.setLevel(logging.INFO)
 formatter = logging.Formatter(
-    '\n' + '='*80 + '\n%(asctime)s | %(levelname)s | %(name)s\n%(message)s\n' + '='*80,
+    '\n' + BANNER + '\n%(asctime)s | %(levelname)s | %(name)s\n%(message)s\n' + BANNER,
     datefmt='%Y-%m-%d %H:%M:%S'
 )
 console.setFormatter(formatter)
-logging.getLogger().addHandler(console)
+
+# Request handlers only enqueue log records; a background listener thread
+# does the formatting and stream writes, keeping them off the event loop.
+_log_queue = queue.SimpleQueue()
+_root_logger = logging.getLogger()
+log_listener = logging.handlers.QueueListener(
+    _log_queue, *_root_logger.handlers, console, respect_handler_level=True
+)
+_root_logger.handlers = [logging.handlers.QueueHandler(_log_queue)]
 
 app = FastAPI(
     title="Computer Use + S3 Skills API",
@@ -66,9 +95,303 @@ app = FastAPI(
     description="End-to-end testing API for DynamicAgent with MCP servers and S3 skills"
 )
 
+# /execute/stream sends an SSE comment after this many idle seconds
+SSE_PING_SECONDS = float(os.getenv("SSE_PING_SECONDS", "15"))
+SSE_PING = b": ping\n\n"
+SSE_BUFFER_SIZE = 64
+
+
+def sse(event: Dict[str, Any]) -> bytes:
+    """Encode one Server-Sent Event"""
+    if ORJSON_AVAILABLE:
+        return b"data: " + orjson.dumps(event, option=orjson.OPT_NON_STR_KEYS) + b"\n\n"
+    return f"data: {json.dumps(event)}\n\n".encode()
+
+
+def cached_system(system_prompt: str) -> List[Dict[str, Any]]:
+    """System prompt as a prompt-cached block, so later turns reuse it"""
+    return [{"type": "text", "text": system_prompt, "cache_control": {"type": "ephemeral"}}]
+
+
 # Global agent instance
 agent: Optional[DynamicAgent] = None
 
+# Tool calls from one assistant turn run concurrently. The handlers are
+# blocking, so they run on the shared TOOL_POOL. Tools that may change state
+# (bash, computer, file edits) also take their session's serial lock, so
+# within one session they run one at a time, in the order Claude requested
+# them, while other sessions' tools keep running.
+TOOL_CONCURRENCY = int(os.getenv("TOOL_CONCURRENCY", "4"))
+_tool_semaphore = asyncio.Semaphore(TOOL_CONCURRENCY)
+TOOL_POOL = concurrent.futures.ThreadPoolExecutor(
+    max_workers=int(os.getenv("TOOL_POOL", "16")), thread_name_prefix="tool"
+)
+
+
+async def run_tool(
+    tool_name: str, tool_input: Dict[str, Any], serial: asyncio.Lock, use_cache: bool = True
+) -> ToolResult:
+    """Run a tool off the event loop, serializing non-cacheable (mutating) tools on *serial*"""
+    if tool_name in agent.cacheable_tools:
+        serial = contextlib.nullcontext()
+    # Lock before the semaphore, so waiting in line does not hold a slot
+    async with serial, _tool_semaphore:
+        return await asyncio.get_running_loop().run_in_executor(
+            TOOL_POOL, functools.partial(agent.run_tool, tool_name, tool_input, use_cache)
+        )
+
+
+def start_early(pending: List[Optional[asyncio.Task]], block, run) -> Optional[asyncio.Task]:
+    """
+    Start a read-only (cacheable) tool while the reply streams; None for others.
+
+    Only blocks with nothing but cacheable blocks before them start early: a
+    read after a mutating call (get_content after navigate) must see its effect.
+    """
+    if block.name in agent.cacheable_tools and all(pending):
+        return asyncio.create_task(run(block))
+    return None
+
+
+async def _run_after(previous: Optional[asyncio.Task], block, run):
+    if previous is not None:
+        await asyncio.wait([previous])
+    return await run(block)
+
+
+def start_remaining(pending: List[Optional[asyncio.Task]], blocks: List[Any], run) -> List[asyncio.Task]:
+    """
+    Once the turn ends in tool_use, start the tools start_early held back.
+
+    From the first held-back block on, each tool waits for the one before
+    it, so the rest of the turn runs in the order Claude requested.
+    """
+    tasks = []
+    previous = None
+    for task, block in zip(pending, blocks):
+        if task is None:
+            task = previous = asyncio.create_task(_run_after(previous, block, run))
+        tasks.append(task)
+    return tasks
+
+
+def cancel_tools(pending: List[Optional[asyncio.Task]]) -> None:
+    for task in pending:
+        if task:
+            task.cancel()
+
+
+async def upload_screenshot(image_bytes: bytes, session_id: str, filename: str) -> Optional[str]:
+    """Upload a screenshot to S3 off the event loop; returns its URL or None"""
+    try:
+        s3_url = await asyncio.to_thread(upload_screenshot_to_s3, image_bytes, session_id, filename)
+    except Exception as e:
+        logger.warning(f"   ⚠️  Screenshot upload failed: {e}")
+        return None
+    if s3_url:
+        logger.info(f"   📸 Screenshot uploaded to S3: {s3_url}")
+    return s3_url
+
+
+# Rolling context: once a conversation exceeds MAX_CONTEXT_TOKENS, the
+# oldest tool turns are dropped (keeping the prompt and the last
+# CONTEXT_KEEP_TURNS turns). With CONTEXT_SUMMARY_MODEL set, dropped turns
+# are replaced by a short summary appended to the prompt.
+MAX_CONTEXT_TOKENS = int(os.getenv("MAX_CONTEXT_TOKENS", "80000"))
+CONTEXT_KEEP_TURNS = max(1, int(os.getenv("CONTEXT_KEEP_TURNS", "4")))
+CONTEXT_SUMMARY_MODEL = os.getenv("CONTEXT_SUMMARY_MODEL", "")
+_context_summaries: "OrderedDict[str, str]" = OrderedDict()  # session_id -> summary
+
+
+def _render_turns(turns: List[Dict[str, Any]], limit: int = 2000) -> str:
+    """Plain-text transcript of assistant/tool_result messages for summarizing"""
+    lines = []
+    for message in turns:
+        content = message["content"]
+        for block in content if isinstance(content, list) else [content]:
+            if isinstance(block, str):
+                lines.append(f"{message['role']}: {block[:limit]}")
+            elif isinstance(block, dict):
+                lines.append(f"tool result: {str(block.get('content', ''))[:limit]}")
+            elif block.type == "text":
+                lines.append(f"assistant: {block.text[:limit]}")
+            elif block.type == "tool_use":
+                lines.append(f"tool call {block.name}: {json.dumps(block.input)[:limit]}")
+    return "\n".join(lines)
+
+
+def _context_tokens(usage: Any) -> int:
+    """Prompt size of the last reply (cached parts included) plus the reply itself"""
+    return (
+        usage.input_tokens
+        + (getattr(usage, "cache_read_input_tokens", None) or 0)
+        + (getattr(usage, "cache_creation_input_tokens", None) or 0)
+        + usage.output_tokens
+    )
+
+
+async def compact_messages(
+    messages: List[Dict[str, Any]], system_prompt: str, prompt: str, session_id: str,
+    usage: Any = None
+) -> List[Dict[str, Any]]:
+    """
+    Drop (and optionally summarize) old turns once the context is over budget.
+
+    The size comes from *usage*, the previous response's token usage, which
+    is free; count_tokens is only called when there is no earlier usage.
+    """
+    tail = 2 * CONTEXT_KEEP_TURNS
+    if len(messages) <= 1 + tail:
+        return messages
+
+    if usage is not None:
+        tokens = _context_tokens(usage)
+    else:
+        try:
+            count = await agent.anthropic_client.messages.count_tokens(
+                model=agent.model, system=system_prompt, messages=messages, tools=agent._tools_payload
+            )
+        except Exception as e:
+            logger.warning(f"⚠️  Token count failed, keeping full context: {e}")
+            return messages
+        tokens = count.input_tokens
+    if tokens <= MAX_CONTEXT_TOKENS:
+        return messages
+
+    # Drop whole assistant/tool_result pairs so tool_use ids stay matched
+    dropped, kept = messages[1:-tail], messages[-tail:]
+    logger.info(f"✂️  Context at {tokens} tokens, dropping {len(dropped) // 2} old turns")
+
+    summary = _context_summaries.get(session_id, "")
+    if CONTEXT_SUMMARY_MODEL:
+        try:
+            reply = await agent.anthropic_client.messages.create(
+                model=CONTEXT_SUMMARY_MODEL,
+                max_tokens=512,
+                messages=[{"role": "user", "content": (
+                    "Summarize what these agent steps did and found, in a few sentences. "
+                    "Keep file names, URLs and values needed to continue the task.\n\n"
+                    + (f"Earlier summary:\n{summary}\n\n" if summary else "")
+                    + _render_turns(dropped)
+                )}],
+            )
+            summary = "".join(block.text for block in reply.content if block.type == "text")
+            _context_summaries[session_id] = summary
+            _context_summaries.move_to_end(session_id)
+            while len(_context_summaries) > 256:
+                _context_summaries.popitem(last=False)
+        except Exception as e:
+            logger.warning(f"⚠️  Context summary failed, dropping turns without one: {e}")
+
+    first = {"role": "user", "content": prompt}
+    if summary:
+        first["content"] = f"{prompt}\n\n[Summary of earlier steps]\n{summary}"
+    return [first] + kept
+
+
+# Cap on concurrently running /execute and /execute/stream requests; more
+# wait up to EXECUTE_QUEUE_TIMEOUT seconds for a slot, then get a 429
+EXECUTE_CONCURRENCY = int(os.getenv("EXECUTE_CONCURRENCY", "8"))
+EXECUTE_QUEUE_TIMEOUT = float(os.getenv("EXECUTE_QUEUE_TIMEOUT", "5"))
+EXECUTE_SEM = asyncio.Semaphore(EXECUTE_CONCURRENCY)
+executions_in_flight = 0
+
+
+async def acquire_execute_slot():
+    """Wait for an execution slot; raises 429 if none frees up in time"""
+    global executions_in_flight
+    try:
+        await asyncio.wait_for(EXECUTE_SEM.acquire(), timeout=EXECUTE_QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        logger.warning(f"⚠️  Rejecting execution: {EXECUTE_CONCURRENCY} already running")
+        raise HTTPException(status_code=429, detail="Server busy, retry later")
+    executions_in_flight += 1
+
+
+def release_execute_slot():
+    global executions_in_flight
+    executions_in_flight -= 1
+    EXECUTE_SEM.release()
+
+
+# Opt-in: single-turn /execute requests without computer tools are
+# coalesced into Anthropic Message Batches (half the per-token price).
+# Batches can take minutes to finish, so only enable this for
+# throughput-oriented, latency-tolerant workloads.
+MESSAGE_BATCHES_ENABLED = os.getenv("ENABLE_MESSAGE_BATCHES", "false").lower() in ("1", "true", "yes")
+BATCH_WINDOW_MS = int(os.getenv("BATCH_WINDOW_MS", "20"))
+BATCH_MAX = int(os.getenv("BATCH_MAX", "8"))
+BATCH_POLL_SECONDS = float(os.getenv("BATCH_POLL_SECONDS", "2"))
+_batch_queue: Optional[asyncio.Queue] = None
+_batch_worker: Optional[asyncio.Task] = None
+_batch_submissions = set()  # in-flight _submit_batch tasks, kept so they are not garbage-collected
+
+
+async def create_message_batched(params: Dict[str, Any]) -> Any:
+    """messages.create() for one request, submitted through the batch queue"""
+    fut = asyncio.get_running_loop().create_future()
+    await _batch_queue.put((params, fut))
+    return await fut
+
+
+async def _batch_worker_loop():
+    """Collect requests for up to BATCH_WINDOW_MS (or BATCH_MAX) and submit them"""
+    loop = asyncio.get_running_loop()
+    while True:
+        items = [await _batch_queue.get()]
+        deadline = loop.time() + BATCH_WINDOW_MS / 1000
+        while len(items) < BATCH_MAX:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                items.append(await asyncio.wait_for(_batch_queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        # Submit in the background so the next window starts right away
+        task = asyncio.create_task(_submit_batch(items))
+        _batch_submissions.add(task)
+        task.add_done_callback(_batch_submissions.discard)
+
+
+async def _submit_batch(items: List[Any]):
+    """Send collected requests as one Message Batch and resolve their futures"""
+    client = agent.anthropic_client
+    try:
+        if len(items) == 1:
+            # Nothing to coalesce: a regular call is faster
+            params, fut = items[0]
+            message = await client.messages.create(**params)
+            if not fut.done():
+                fut.set_result(message)
+            return
+
+        batch = await client.messages.batches.create(requests=[
+            {"custom_id": f"req-{i}", "params": params} for i, (params, _) in enumerate(items)
+        ])
+        logger.info(f"📦 Submitted message batch {batch.id} ({len(items)} requests)")
+        while batch.processing_status != "ended":
+            await asyncio.sleep(BATCH_POLL_SECONDS)
+            batch = await client.messages.batches.retrieve(batch.id)
+
+        async for entry in await client.messages.batches.results(batch.id):
+            _, fut = items[int(entry.custom_id.split("-", 1)[1])]
+            if fut.done():
+                continue
+            if entry.result.type == "succeeded":
+                fut.set_result(entry.result.message)
+            else:
+                fut.set_exception(RuntimeError(f"Batched request {entry.result.type}"))
+    except Exception as e:
+        logger.error(f"❌ Message batch failed: {e}")
+        for _, fut in items:
+            if not fut.done():
+                fut.set_exception(e)
+    finally:
+        for _, fut in items:
+            if not fut.done():
+                fut.set_exception(RuntimeError("Request missing from batch results"))
+
 
 # ============================================================
 # Pydantic Models
@@ -115,6 +438,7 @@ class SystemStatusResponse(BaseModel):
     s3_skills: Dict[str, Any]
     total_tools: int
     anthropic_model: str
+    executions_in_flight: int = 0
 
 
 # ============================================================
@@ -124,11 +448,12 @@ class SystemStatusResponse(BaseModel):
 @app.on_event("startup")
 async def startup_event():
     """Initialize agent on startup"""
-    global agent
+    global agent, _batch_queue, _batch_worker
 
-    logger.info("="*80)
+    log_listener.start()
+    logger.info(BANNER)
     logger.info("🚀 STARTING API SERVER")
-    logger.info("="*80)
+    logger.info(BANNER)
 
     api_key = os.getenv("ANTHROPIC_API_KEY")
     if not api_key:
@@ -151,9 +476,9 @@ async def startup_event():
             s3_skills_prefix="skills_phase3/"
         )
 
-        logger.info("="*80)
+        logger.info(BANNER)
         logger.info("✅ AGENT INITIALIZED SUCCESSFULLY")
-        logger.info("="*80)
+        logger.info(BANNER)
         logger.info(f"   MCP Servers: {len(agent.mcp_client.servers)}")
         for server_name, server in agent.mcp_client.servers.items():
             logger.info(f"      • {server_name}: {len(server.tools or [])} tools")
@@ -164,12 +489,32 @@ async def startup_event():
             logger.info(f"      • Skills: {list(skills.keys())}")
 
         logger.info(f"   Total Tools: {len(agent.tools)}")
-        logger.info("="*80)
+        logger.info(BANNER)
 
     except Exception as e:
         logger.error(f"❌ Failed to initialize agent: {e}")
         raise
 
+    if MESSAGE_BATCHES_ENABLED:
+        _batch_queue = asyncio.Queue()
+        _batch_worker = asyncio.create_task(_batch_worker_loop())
+        logger.info(f"📦 Message batching enabled (window={BATCH_WINDOW_MS}ms, max={BATCH_MAX})")
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the batch worker and submissions, tool thread pool and MCP client, then flush queued log records"""
+    if _batch_worker:
+        _batch_worker.cancel()
+    # Cancelled submissions fail their waiting requests in _submit_batch's finally
+    for task in _batch_submissions:
+        task.cancel()
+    await asyncio.gather(*_batch_submissions, return_exceptions=True)
+    TOOL_POOL.shutdown(wait=False, cancel_futures=True)
+    if agent:
+        agent.mcp_client.close()
+    log_listener.stop()
+
 
 # ============================================================
 # API Endpoints
@@ -206,9 +551,9 @@ async def get_status():
     if not agent:
         raise HTTPException(status_code=503, detail="Agent not initialized")
 
-    logger.info("\n" + "="*80)
+    logger.info("\n" + BANNER)
     logger.info("📊 STATUS CHECK REQUESTED")
-    logger.info("="*80)
+    logger.info(BANNER)
 
     # MCP servers info
     mcp_servers_info = {}
@@ -241,37 +586,105 @@ async def get_status():
         mcp_servers=mcp_servers_info,
         s3_skills=s3_skills_info,
         total_tools=len(agent.tools),
-        anthropic_model=agent.model
+        anthropic_model=agent.model,
+        executions_in_flight=executions_in_flight
     )
 
     logger.info(f"MCP Servers: {len(mcp_servers_info)}")
     logger.info(f"S3 Skills: {len(s3_skills_info['skills'])}")
     logger.info(f"Total Tools: {len(agent.tools)}")
-    logger.info("="*80 + "\n")
+    logger.info(BANNER + "\n")
 
     return status_response
 
 
 @app.post("/execute", response_model=AgentResponse)
-async def execute_agent(request: AgentRequest):
+async def execute_agent(request: AgentRequest, http_request: Request):
     """Execute agent with user prompt"""
     if not agent:
         raise HTTPException(status_code=503, detail="Agent not initialized")
 
-    logger.info("\n" + "="*80)
+    await acquire_execute_slot()
+    try:
+        return await _execute_agent(request, http_request)
+    finally:
+        release_execute_slot()
+
+
+async def _execute_agent(request: AgentRequest, http_request: Request) -> AgentResponse:
+    """Run the multi-turn agent loop for one /execute request"""
+    # Clients can bypass memoized tool results with X-Skip-Tool-Cache: 1
+    use_tool_cache = http_request.headers.get("X-Skip-Tool-Cache") != "1"
+    use_batches = MESSAGE_BATCHES_ENABLED and request.max_turns == 1 and not request.use_computer_tools
+
+    logger.info("\n" + BANNER)
     logger.info("🤖 NEW AGENT EXECUTION REQUEST")
-    logger.info("="*80)
+    logger.info(BANNER)
     logger.info(f"Prompt: {request.prompt}")
     logger.info(f"Max Turns: {request.max_turns}")
     logger.info(f"S3 Skills: {request.include_s3_skills}")
     logger.info(f"Computer Tools: {request.use_computer_tools}")
     logger.info(f"Temperature: {request.temperature}")
-    logger.info("="*80 + "\n")
+    logger.info(BANNER + "\n")
 
-    start_time = datetime.now()
+    start_time = time.perf_counter()
     tools_used = []
     artifacts = {"screenshots": [], "files": []}
-    session_id = f"session_{int(start_time.timestamp())}"
+    upload_tasks = []
+    # Timestamp prefix keeps S3 folders sortable; the suffix keeps
+    # concurrent requests in the same second apart
+    session_id = f"session_{int(time.time())}_{uuid.uuid4().hex[:8]}"
+    tool_lock = asyncio.Lock()  # runs this session's mutating tools in order
+
+    async def run_tool_block(block) -> Dict[str, Any]:
+        """Execute one tool_use block and build its tool_result"""
+        tool_name = block.name
+        tool_input = block.input
+        tool_id = block.id
+
+        logger.info(f"\n   Tool: {tool_name}")
+        logger.info(f"   Input: {tool_input}")
+
+        # Execute tool (native, S3 skill or MCP)
+        try:
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"      S3 skills: {sorted(agent.skill_names)}")
+                logger.debug(f"      Is S3 skill: {tool_name in agent.skill_names}")
+            logger.info(f"   ⚙️  Executing tool {tool_name}...")
+            result = await run_tool(tool_name, tool_input, tool_lock, use_cache=use_tool_cache)
+            logger.info(f"   ✅ Tool {tool_name} executed")
+
+            # Upload screenshots to S3 if computer tool was used
+            # Computer tool can come from MCP with various names (computer, computer_20250124, etc.)
+            if (S3_STORAGE_AVAILABLE and tool_name in agent.computer_tools
+                    and tool_input.get("action") == "screenshot"):
+                try:
+                    # Native tools hand over the raw bytes; MCP tools return JSON text
+                    image_bytes = result.image_bytes
+                    if image_bytes is None:
+                        result_dict = result.content
+                        if isinstance(result_dict, str):
+                            result_dict = orjson.loads(result_dict) if ORJSON_AVAILABLE else json.loads(result_dict)
+                        if "base64_image" in result_dict:
+                            image_bytes = base64.b64decode(result_dict["base64_image"])
+                    if image_bytes:
+                        # Upload in the background; collected before responding
+                        upload_tasks.append(asyncio.create_task(
+                            upload_screenshot(image_bytes, session_id, f"screenshot_{turn}_{tool_id}.png")
+                        ))
+                except Exception as upload_error:
+                    logger.warning(f"   ⚠️  Screenshot upload failed: {upload_error}")
+
+            return result.as_anthropic_content(tool_id)
+
+        except Exception as e:
+            logger.error(f"   ❌ Error in {tool_name}: {e}")
+            return {
+                "type": "tool_result",
+                "tool_use_id": tool_id,
+                "content": f"Error: {str(e)}",
+                "is_error": True
+            }
 
     try:
         # Enable computer tools if requested
@@ -281,6 +694,7 @@ async def execute_agent(request: AgentRequest):
             logger.info(f"   Total tools available: {len(agent.tools)}\n")
         # Build system prompt
         system_prompt = agent._build_system_prompt()
+        system_blocks = cached_system(system_prompt)
 
         logger.info("📝 System Prompt Generated")
         logger.info(f"   Length: {len(system_prompt)} characters")
@@ -296,152 +710,86 @@ async def execute_agent(request: AgentRequest):
 
         while turn < request.max_turns:
             turn += 1
-            logger.info(f"{'='*80}")
+            logger.info(BANNER)
             logger.info(f"TURN {turn}/{request.max_turns}")
-            logger.info(f"{'='*80}")
+            logger.info(BANNER)
 
-            # Call Claude API
+            # Call Claude API. Streamed replies start read-only (cacheable) tools
+            # as soon as their tool_use block is complete, while the rest is
+            # still generated, up to the first mutating tool; that one and
+            # everything after it wait for stop_reason == "tool_use".
             logger.info("📡 Calling Claude API...")
-            response = await agent.anthropic_client.messages.create(
-                model=agent.model,
-                max_tokens=4096,
-                temperature=request.temperature,
-                system=system_prompt,
-                messages=messages,
-                tools=agent.tools
-            )
+            tool_blocks = []
+            pending_tools = []
+            if use_batches:
+                response = await create_message_batched(dict(
+                    model=agent.model,
+                    max_tokens=4096,
+                    temperature=request.temperature,
+                    system=system_prompt,
+                    messages=messages,
+                    tools=agent._tools_payload
+                ))
+                tool_blocks = [block for block in response.content if block.type == "tool_use"]
+                for block in tool_blocks:
+                    pending_tools.append(start_early(pending_tools, block, run_tool_block))
+            else:
+                try:
+                    async with agent.anthropic_client.messages.stream(
+                        model=agent.model,
+                        max_tokens=4096,
+                        temperature=request.temperature,
+                        system=system_blocks,
+                        messages=messages,
+                        tools=agent._tools_payload
+                    ) as stream:
+                        async for event in stream:
+                            if event.type == "content_block_stop" and event.content_block.type == "tool_use":
+                                tool_blocks.append(event.content_block)
+                                pending_tools.append(start_early(pending_tools, event.content_block, run_tool_block))
+                        response = await stream.get_final_message()
+                except BaseException:
+                    cancel_tools(pending_tools)
+                    raise
 
             logger.info(f"✅ Response received (stop_reason: {response.stop_reason})")
 
             # Process response
             if response.stop_reason == "end_turn":
-                # Final response
-                for block in response.content:
-                    if hasattr(block, 'text'):
-                        final_response = block.text
-                        logger.info(f"\n📄 FINAL RESPONSE:\n{final_response}\n")
+                # Final response (all text blocks, in order)
+                final_response = "".join(block.text for block in response.content if block.type == "text")
+                logger.info(f"\n📄 FINAL RESPONSE:\n{final_response}\n")
                 break
 
             elif response.stop_reason == "tool_use":
                 # Tool calls
                 logger.info(f"\n🔧 TOOL CALLS REQUESTED:")
 
-                tool_results = []
-                for block in response.content:
-                    if block.type == "tool_use":
-                        tool_name = block.name
-                        tool_input = block.input
-                        tool_id = block.id
-
-                        logger.info(f"\n   Tool: {tool_name}")
-                        logger.info(f"   Input: {tool_input}")
-
-                        tools_used.append(tool_name)
-
-                        # Execute tool (native or MCP)
-                        try:
-                            # Check if this is a native Anthropic tool
-                            native_tools = ["bash", "str_replace_based_edit_tool", "computer"]
-
-                            if tool_name in native_tools:
-                                # Execute via native handler
-                                logger.info(f"   🖥️  Executing native tool...")
-                                from orchestrator.native_tool_handlers import get_handler
-                                handler = get_handler()
-
-                                if tool_name == "bash":
-                                    result = handler.handle_bash(tool_input)
-                                elif tool_name == "str_replace_based_edit_tool":
-                                    result = handler.handle_text_editor(tool_input)
-                                elif tool_name == "computer":
-                                    result = handler.handle_computer(tool_input)
-                                else:
-                                    result = {"error": f"Unknown native tool: {tool_name}"}
-
-                                # Convert result to string
-                                if isinstance(result, dict):
-                                    import json
-                                    result = json.dumps(result, indent=2)
-
-                                logger.info(f"   ✅ Native tool executed")
-                            elif agent.skill_loader and agent.skills_loaded:
-                                # Check if this is an S3 skill
-                                logger.info(f"   🔍 Checking if '{tool_name}' is an S3 skill...")
-                                logger.info(f"      skill_loader exists: {agent.skill_loader is not None}")
-                                logger.info(f"      skills_loaded: {agent.skills_loaded}")
-                                skills = agent.skill_loader.get_skills()
-                                logger.info(f"      Available skills: {list(skills.keys())}")
-                                logger.info(f"      Tool name: '{tool_name}'")
-                                logger.info(f"      Match: {tool_name in skills}")
-
-                                if tool_name in skills:
-                                    # Execute S3 skill
-                                    logger.info(f"   📦 Executing S3 skill...")
-                                    from orchestrator.s3_skill_executor import execute_s3_skill
-                                    result = execute_s3_skill(agent.skill_loader, tool_name, tool_input)
-                                    logger.info(f"   ✅ S3 skill executed")
-                                else:
-                                    # Not an S3 skill, try MCP
-                                    logger.info(f"   ⚙️  Executing via MCP...")
-                                    result = agent.mcp_client.call_tool(tool_name, tool_input)
-                                    logger.info(f"   ✅ MCP tool executed")
-                            else:
-                                # Execute via MCP
-                                logger.info(f"   ⚙️  Executing via MCP...")
-                                result = agent.mcp_client.call_tool(tool_name, tool_input)
-                                logger.info(f"   ✅ MCP tool executed")
-
-                            tool_results.append({
-                                "type": "tool_result",
-                                "tool_use_id": tool_id,
-                                "content": str(result)
-                            })
-
-                            # Upload screenshots to S3 if computer tool was used
-                            # Computer tool can come from MCP with various names (computer, computer_20250124, etc.)
-                            if "computer" in tool_name.lower() and S3_STORAGE_AVAILABLE:
-                                # Check if action was screenshot
-                                action = tool_input.get("action")
-                                if action == "screenshot":
-                                    try:
-                                        # Extract base64 image from result
-                                        import base64
-                                        import json
-                                        result_dict = json.loads(result) if isinstance(result, str) else result
-                                        if "base64_image" in result_dict:
-                                            image_bytes = base64.b64decode(result_dict["base64_image"])
-                                            s3_url = upload_screenshot_to_s3(
-                                                image_bytes,
-                                                session_id,
-                                                f"screenshot_{turn}.png"
-                                            )
-                                            if s3_url:
-                                                artifacts["screenshots"].append(s3_url)
-                                                logger.info(f"   📸 Screenshot uploaded to S3: {s3_url}")
-                                    except Exception as upload_error:
-                                        logger.warning(f"   ⚠️  Screenshot upload failed: {upload_error}")
-
-                        except Exception as e:
-                            logger.error(f"   ❌ Error: {e}")
-                            tool_results.append({
-                                "type": "tool_result",
-                                "tool_use_id": tool_id,
-                                "content": f"Error: {str(e)}",
-                                "is_error": True
-                            })
+                tools_used.extend(block.name for block in tool_blocks)
+                tool_results = await asyncio.gather(*start_remaining(pending_tools, tool_blocks, run_tool_block))
 
                 # Add assistant message and tool results
                 messages.append({"role": "assistant", "content": response.content})
                 messages.append({"role": "user", "content": tool_results})
+                messages = await compact_messages(
+                    messages, system_prompt, request.prompt, session_id,
+                    usage=getattr(response, "usage", None)
+                )
 
-                logger.info(f"\n{'='*80}\n")
+                logger.info("\n" + BANNER + "\n")
 
             else:
                 # Unexpected stop reason
                 logger.warning(f"⚠️  Unexpected stop_reason: {response.stop_reason}")
+                cancel_tools(pending_tools)
                 break
 
-        execution_time = (datetime.now() - start_time).total_seconds()
+        # Wait for screenshot uploads still in flight
+        if upload_tasks:
+            urls = await asyncio.gather(*upload_tasks)
+            artifacts["screenshots"].extend(url for url in urls if url)
+
+        execution_time = time.perf_counter() - start_time
 
         # Get active servers and skills
         mcp_servers_active = list(agent.mcp_client.servers.keys())
@@ -449,13 +797,13 @@ async def execute_agent(request: AgentRequest):
         if agent.skill_loader:
             s3_skills_loaded = list(agent.skill_loader.get_skills().keys())
 
-        logger.info("="*80)
+        logger.info(BANNER)
         logger.info("✅ EXECUTION COMPLETE")
-        logger.info("="*80)
+        logger.info(BANNER)
         logger.info(f"Total Turns: {turn}")
         logger.info(f"Tools Used: {tools_used}")
         logger.info(f"Execution Time: {execution_time:.2f}s")
-        logger.info("="*80 + "\n")
+        logger.info(BANNER + "\n")
 
         return AgentResponse(
             success=True,
@@ -470,12 +818,12 @@ async def execute_agent(request: AgentRequest):
         )
 
     except Exception as e:
-        execution_time = (datetime.now() - start_time).total_seconds()
-        logger.error("="*80)
+        execution_time = time.perf_counter() - start_time
+        logger.error(BANNER)
         logger.error("❌ EXECUTION FAILED")
-        logger.error("="*80)
+        logger.error(BANNER)
         logger.error(f"Error: {str(e)}")
-        logger.error("="*80 + "\n")
+        logger.error(BANNER + "\n")
 
         return AgentResponse(
             success=False,
@@ -492,23 +840,57 @@ async def execute_agent(request: AgentRequest):
 
 
 @app.post("/execute/stream")
-async def execute_agent_stream(request: AgentRequest):
+async def execute_agent_stream(request: AgentRequest, http_request: Request):
     """Execute agent with streaming responses (Server-Sent Events)"""
     if not agent:
         raise HTTPException(status_code=503, detail="Agent not initialized")
 
-    async def event_generator():
-        """Generate Server-Sent Events for streaming"""
+    # Clients can bypass memoized tool results with X-Skip-Tool-Cache: 1
+    use_tool_cache = http_request.headers.get("X-Skip-Tool-Cache") != "1"
+    tool_lock = asyncio.Lock()  # runs this stream's mutating tools in order
+
+    await acquire_execute_slot()
+    slot_held = True
+
+    def release_slot():
+        # Called when the stream ends, and again as a background task in
+        # case the client disconnected before the stream started
+        nonlocal slot_held
+        if slot_held:
+            slot_held = False
+            release_execute_slot()
+
+    async def run_streamed_tool(block):
+        """Execute one tool_use block; returns (tool_result, SSE event)"""
+        try:
+            result = await run_tool(block.name, block.input, tool_lock, use_cache=use_tool_cache)
+            tool_result = result.as_anthropic_content(block.id)
+            result_str = tool_result["content"] if isinstance(tool_result["content"], str) else result.text
+            preview = result_str[:500] if len(result_str) > 500 else result_str
+            return (
+                tool_result,
+                sse({'type': 'tool_result', 'tool': block.name, 'result': preview})
+            )
+        except Exception as e:
+            error_msg = str(e)
+            return (
+                {"type": "tool_result", "tool_use_id": block.id, "content": f"Error: {error_msg}", "is_error": True},
+                sse({'type': 'tool_error', 'tool': block.name, 'error': error_msg})
+            )
+
+    async def agent_events():
+        """Run the agent loop, yielding Server-Sent Events"""
         try:
             # Send initial event
-            yield f"data: {json.dumps({'type': 'start', 'prompt': request.prompt})}\n\n"
+            yield sse({'type': 'start', 'prompt': request.prompt})
 
-            start_time = datetime.now()
+            start_time = time.perf_counter()
             tools_used = []
 
             # Build system prompt
             system_prompt = agent._build_system_prompt()
-            yield f"data: {json.dumps({'type': 'system_prompt_ready', 'length': len(system_prompt)})}\n\n"
+            system_blocks = cached_system(system_prompt)
+            yield sse({'type': 'system_prompt_ready', 'length': len(system_prompt)})
 
             # Execute agent loop
             messages = [{"role": "user", "content": request.prompt}]
@@ -516,98 +898,111 @@ async def execute_agent_stream(request: AgentRequest):
 
             while turn < request.max_turns:
                 turn += 1
-                yield f"data: {json.dumps({'type': 'turn_start', 'turn': turn, 'max_turns': request.max_turns})}\n\n"
+                yield sse({'type': 'turn_start', 'turn': turn, 'max_turns': request.max_turns})
 
                 # Call Claude API
-                yield f"data: {json.dumps({'type': 'api_call', 'message': 'Calling Claude API...'})}\n\n"
-
-                response = await agent.anthropic_client.messages.create(
-                    model=agent.model,
-                    max_tokens=4096,
-                    temperature=request.temperature,
-                    system=system_prompt,
-                    messages=messages,
-                    tools=agent.tools
-                )
-
-                yield f"data: {json.dumps({'type': 'api_response', 'stop_reason': response.stop_reason})}\n\n"
+                yield sse({'type': 'api_call', 'message': 'Calling Claude API...'})
+
+                # Stream the reply: forward text as it arrives and start each
+                # read-only tool as soon as its tool_use block is complete
+                tool_blocks = []
+                pending_tools = []
+                try:
+                    async with agent.anthropic_client.messages.stream(
+                        model=agent.model,
+                        max_tokens=4096,
+                        temperature=request.temperature,
+                        system=system_blocks,
+                        messages=messages,
+                        tools=agent._tools_payload
+                    ) as stream:
+                        async for event in stream:
+                            if event.type == "content_block_delta" and event.delta.type == "text_delta":
+                                yield sse({'type': 'text_delta', 'text': event.delta.text})
+                            elif event.type == "content_block_stop" and event.content_block.type == "tool_use":
+                                block = event.content_block
+                                yield sse({'type': 'tool_call', 'tool': block.name, 'input': block.input})
+                                tools_used.append(block.name)
+                                tool_blocks.append(block)
+                                pending_tools.append(start_early(pending_tools, block, run_streamed_tool))
+                        response = await stream.get_final_message()
+                except BaseException:
+                    cancel_tools(pending_tools)
+                    raise
+
+                yield sse({'type': 'api_response', 'stop_reason': response.stop_reason})
 
                 # Process response
                 if response.stop_reason == "end_turn":
-                    # Final response
-                    for block in response.content:
-                        if hasattr(block, 'text'):
-                            final_response = block.text
-                            yield f"data: {json.dumps({'type': 'final_response', 'text': final_response})}\n\n"
+                    # Final response (all text blocks, in order)
+                    final_response = "".join(block.text for block in response.content if block.type == "text")
+                    yield sse({'type': 'final_response', 'text': final_response})
                     break
 
                 elif response.stop_reason == "tool_use":
-                    # Tool calls
+                    # Tool calls (report them in request order)
                     tool_results = []
-                    for block in response.content:
-                        if block.type == "tool_use":
-                            tool_name = block.name
-                            tool_input = block.input
-                            tool_id = block.id
-
-                            yield f"data: {json.dumps({'type': 'tool_call', 'tool': tool_name, 'input': tool_input})}\n\n"
-
-                            tools_used.append(tool_name)
-
-                            # Execute tool
-                            try:
-                                native_tools = ["bash", "str_replace_based_edit_tool", "computer"]
-
-                                if tool_name in native_tools:
-                                    from orchestrator.native_tool_handlers import get_handler
-                                    handler = get_handler()
-                                    result = await handler.execute_tool(tool_name, tool_input)
-                                    result_str = str(result)
-                                elif agent.skill_loader and agent.skills_loaded:
-                                    skills = agent.skill_loader.get_skills()
-                                    if tool_name in skills:
-                                        from orchestrator.s3_skill_executor import execute_s3_skill
-                                        result_str = execute_s3_skill(agent.skill_loader, tool_name, tool_input)
-                                    else:
-                                        result_str = agent.mcp_client.call_tool(tool_name, tool_input)
-                                else:
-                                    result_str = agent.mcp_client.call_tool(tool_name, tool_input)
-
-                                yield f"data: {json.dumps({'type': 'tool_result', 'tool': tool_name, 'result': result_str[:500]})}\n\n"
-
-                                tool_results.append({
-                                    "type": "tool_result",
-                                    "tool_use_id": tool_id,
-                                    "content": result_str
-                                })
-
-                            except Exception as e:
-                                error_msg = str(e)
-                                yield f"data: {json.dumps({'type': 'tool_error', 'tool': tool_name, 'error': error_msg})}\n\n"
-
-                                tool_results.append({
-                                    "type": "tool_result",
-                                    "tool_use_id": tool_id,
-                                    "content": f"Error: {error_msg}",
-                                    "is_error": True
-                                })
+                    for task in start_remaining(pending_tools, tool_blocks, run_streamed_tool):
+                        tool_result, event = await task
+                        yield event
+                        tool_results.append(tool_result)
 
                     # Add assistant message with tool results
                     messages.append({"role": "assistant", "content": response.content})
                     messages.append({"role": "user", "content": tool_results})
 
                 else:
+                    cancel_tools(pending_tools)
                     break
 
             # Send completion event
-            execution_time = (datetime.now() - start_time).total_seconds()
-            yield f"data: {json.dumps({'type': 'complete', 'turns': turn, 'tools_used': tools_used, 'execution_time': execution_time})}\n\n"
+            execution_time = time.perf_counter() - start_time
+            yield sse({'type': 'complete', 'turns': turn, 'tools_used': tools_used, 'execution_time': execution_time})
 
         except Exception as e:
-            yield f"data: {json.dumps({'type': 'error', 'error': str(e)})}\n\n"
+            yield sse({'type': 'error', 'error': str(e)})
+
+    async def event_generator():
+        """
+        Drain agent events through a memory stream.
+
+        The agent loop runs as its own task, so while it waits on Claude or
+        a slow tool a keepalive task can still emit SSE comments and stop
+        proxies from closing an idle connection.
+        """
+        send, recv = anyio.create_memory_object_stream(max_buffer_size=SSE_BUFFER_SIZE)
+        last_sent = time.monotonic()
+
+        async def keepalive():
+            while True:
+                await asyncio.sleep(SSE_PING_SECONDS)
+                if time.monotonic() - last_sent >= SSE_PING_SECONDS:
+                    await send.send(SSE_PING)
+
+        async def driver():
+            nonlocal last_sent
+            ping_task = asyncio.create_task(keepalive())
+            try:
+                async with contextlib.aclosing(agent_events()) as events:
+                    async for frame in events:
+                        await send.send(frame)
+                        last_sent = time.monotonic()
+            finally:
+                ping_task.cancel()
+                send.close()
+
+        driver_task = asyncio.create_task(driver())
+        try:
+            async with recv:
+                async for frame in recv:
+                    yield frame
+        finally:
+            driver_task.cancel()
+            release_slot()
 
     return StreamingResponse(
         event_generator(),
+        background=BackgroundTask(release_slot),
         media_type="text/event-stream",
         headers={
             "Cache-Control": "no-cache",
@@ -638,15 +1033,15 @@ async def global_exception_handler(request: Request, exc: Exception):
 # ============================================================
 
 if __name__ == "__main__":
-    logger.info("="*80)
+    logger.info(BANNER)
     logger.info("🚀 Starting FastAPI Server - E2E Testing API")
-    logger.info("="*80)
+    logger.info(BANNER)
     logger.info("Endpoints:")
     logger.info("  - http://localhost:8003/")
     logger.info("  - http://localhost:8003/status")
     logger.info("  - http://localhost:8003/execute")
     logger.info("  - http://localhost:8003/health")
-    logger.info("="*80 + "\n")
+    logger.info(BANNER + "\n")
 
     uvicorn.run(
         app,
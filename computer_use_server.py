@@ -3,14 +3,23 @@ FastAPI server for computer use operations
 Provides REST endpoints for screenshot, mouse, keyboard control
 Compatible with native_tool_handlers.py expectations
 """
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Response
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, Tuple
+import asyncio
 import base64
 import logging
+import threading
 from io import BytesIO
 from PIL import Image
 
+# pyvips is optional: libvips PNG encoding is several times faster than PIL's
+try:
+    import pyvips
+    PYVIPS_AVAILABLE = True
+except ImportError:
+    PYVIPS_AVAILABLE = False
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -30,6 +39,43 @@ def _get_mss():
     import mss
     return mss
 
+# mss objects hold an X display connection and are not thread-safe, so each
+# worker thread keeps its own, reused across screenshots
+_mss_local = threading.local()
+_mss_instances = []
+_mss_instances_lock = threading.Lock()
+
+def _get_sct():
+    """Return this thread's mss instance, opening it on first use"""
+    sct = getattr(_mss_local, "sct", None)
+    if sct is None:
+        sct = _get_mss().mss()
+        _mss_local.sct = sct
+        _mss_local.monitor = sct.monitors[1]
+        with _mss_instances_lock:
+            _mss_instances.append(sct)
+    return sct
+
+def _capture_png() -> Tuple[bytes, int, int]:
+    """
+    Grab the primary monitor and encode it as PNG (blocking; run in a thread).
+
+    Uses fast compression (level 1): the frame is sent once and decoded
+    once, so encode time matters more than a few percent of size.
+    """
+    sct = _get_sct()
+    screenshot = sct.grab(_mss_local.monitor)
+    width, height = screenshot.size
+
+    if PYVIPS_AVAILABLE:
+        img = pyvips.Image.new_from_memory(screenshot.rgb, width, height, 3, "uchar")
+        return img.pngsave_buffer(compression=1), width, height
+
+    img = Image.frombytes('RGB', screenshot.size, screenshot.rgb)
+    buffered = BytesIO()
+    img.save(buffered, format="PNG", compress_level=1)
+    return buffered.getvalue(), width, height
+
 class MouseMove(BaseModel):
     x: int
     y: int
@@ -45,6 +91,17 @@ class KeyboardType(BaseModel):
 class KeyboardKey(BaseModel):
     key: str
 
+@app.on_event("shutdown")
+async def close_screen_grabbers():
+    """Close the per-thread mss instances (and their display connections)"""
+    with _mss_instances_lock:
+        for sct in _mss_instances:
+            try:
+                sct.close()
+            except Exception as e:
+                logger.warning(f"Closing mss instance failed: {e}")
+        _mss_instances.clear()
+
 @app.get("/")
 async def root():
     """Root endpoint"""
@@ -54,6 +111,7 @@ async def root():
         "endpoints": {
             "health": "/health",
             "screenshot": "/screenshot",
+            "screenshot_raw": "/screenshot/raw",
             "mouse_move": "/mouse/move",
             "mouse_click": "/mouse/click",
             "mouse_position": "/mouse/position",
@@ -86,29 +144,38 @@ async def screenshot():
     """
     try:
         logger.info("Capturing screenshot...")
-        mss = _get_mss()
-
-        with mss.mss() as sct:
-            # Capture the primary monitor
-            monitor = sct.monitors[1]
-            screenshot = sct.grab(monitor)
+        # Capture and PNG encoding are CPU-bound; keep them off the event loop
+        png, width, height = await asyncio.to_thread(_capture_png)
+        img_base64 = base64.b64encode(png).decode()
 
-            # Convert to PIL Image
-            img = Image.frombytes('RGB', screenshot.size, screenshot.rgb)
+        logger.info(f"Screenshot captured: {width}x{height}")
 
-            # Convert to base64
-            buffered = BytesIO()
-            img.save(buffered, format="PNG")
-            img_base64 = base64.b64encode(buffered.getvalue()).decode()
+        return {
+            "base64_image": img_base64,
+            "width": width,
+            "height": height,
+            "success": True
+        }
+    except Exception as e:
+        logger.error(f"Screenshot failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
 
-            logger.info(f"Screenshot captured: {img.width}x{img.height}")
+@app.get("/screenshot/raw")
+async def screenshot_raw():
+    """
+    Capture screenshot and return the PNG bytes
 
-            return {
-                "base64_image": img_base64,
-                "width": img.width,
-                "height": img.height,
-                "success": True
-            }
+    Skips the base64 + JSON wrapping of /screenshot; the size is sent in
+    the X-Width / X-Height headers.
+    """
+    try:
+        png, width, height = await asyncio.to_thread(_capture_png)
+        logger.info(f"Screenshot captured: {width}x{height}")
+        return Response(
+            content=png,
+            media_type="image/png",
+            headers={"X-Width": str(width), "X-Height": str(height)}
+        )
     except Exception as e:
         logger.error(f"Screenshot failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
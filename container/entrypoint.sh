@@ -36,5 +36,11 @@ echo "Workspace: /workspace"
 echo ""
 
 # Start the tool server
+if [ -n "${CONTAINER_UDS:-}" ]; then
+    # Also listen on a Unix socket for a colocated MCP server (same CONTAINER_UDS)
+    echo "Starting Tool API server on port 8080 and ${CONTAINER_UDS}..."
+    exec python server.py
+fi
 echo "Starting Tool API server on port 8080..."
-exec uvicorn server:app --host 0.0.0.0 --port 8080 --log-level info
+exec uvicorn server:app --host 0.0.0.0 --port 8080 --log-level info \
+    --loop uvloop --http httptools --backlog 2048 --timeout-keep-alive 30
@@ -20,13 +20,20 @@ provides the actual tool execution endpoints using the official Anthropic implem
 Reference: https://docs.anthropic.com/en/docs/agents-and-tools/tool-use/computer-use-tool
 """
 
+import os
 import json
+import base64
+import time
+import socket
+import asyncio
 import logging
+import functools
 import httpx
 from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Dict, Any, List, Optional
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Callable, Awaitable, Tuple
 
 # Configure logging
 logging.basicConfig(
@@ -35,11 +42,50 @@ logging.basicConfig(
 )
 logger = logging.getLogger("MCP_COMPUTER_USE_SERVER")
 
+# HTTP/2 support for the container client is optional (needs the `h2` package)
+try:
+    import h2  # noqa: F401
+    H2_AVAILABLE = True
+except ImportError:
+    H2_AVAILABLE = False
+
+# orjson is optional: faster JSON-RPC parsing and response encoding
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+def _json_loads(raw: bytes) -> Any:
+    """Parse a container response body"""
+    return orjson.loads(raw) if ORJSON_AVAILABLE else json.loads(raw)
+
+
+def _json_dumps(obj: Any) -> str:
+    """Serialize tool output that has to travel as MCP text content"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj).decode()
+    return json.dumps(obj)
+
+
+class _Lazy:
+    """Log argument that JSON-encodes (and truncates) its value only when formatted"""
+    __slots__ = ("obj",)
+
+    def __init__(self, obj: Any):
+        self.obj = obj
+
+    def __str__(self) -> str:
+        return _json_dumps(self.obj)[:200]
+
+
 # Initialize FastAPI app
 app = FastAPI(
     title="MCP Computer-Use Tool Server",
     description="MCP wrapper for official Anthropic computer use tools",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse if ORJSON_AVAILABLE else JSONResponse
 )
 
 # CORS middleware
@@ -54,8 +100,31 @@ app.add_middleware(
 # Container server URL (where actual tools are executed)
 CONTAINER_URL = "http://localhost:8080"
 
-# HTTP client for calling container server
-http_client = httpx.AsyncClient(timeout=httpx.Timeout(180.0, connect=10.0))
+# Opt-in HTTP/2 to the container: multiplexes screenshot/click/bash requests
+# over one connection. Only useful when the container sits behind an
+# h2-capable proxy; plain uvicorn speaks HTTP/1.1 and httpx falls back to it.
+USE_HTTP2 = os.getenv("MCP_HTTP2", "false").lower() == "true" and H2_AVAILABLE
+
+# When the MCP server runs next to the container server, both can talk over
+# a Unix domain socket instead of loopback TCP (the container server binds
+# it when started with the same CONTAINER_UDS)
+CONTAINER_UDS = os.getenv("CONTAINER_UDS") or None
+
+# HTTP client for calling container server, shared by all tool calls so
+# connections stay pooled and kept alive between requests. Requests use
+# paths relative to base_url; TCP_NODELAY keeps small JSON requests from
+# waiting on Nagle's algorithm. Retries stay off: tool calls are not idempotent.
+http_client = httpx.AsyncClient(
+    base_url=CONTAINER_URL,
+    timeout=httpx.Timeout(180.0, connect=2.0),
+    transport=httpx.AsyncHTTPTransport(
+        http2=USE_HTTP2,
+        retries=0,
+        limits=httpx.Limits(max_connections=64, max_keepalive_connections=32, keepalive_expiry=30.0),
+        uds=CONTAINER_UDS,
+        socket_options=None if CONTAINER_UDS else [(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)],
+    ),
+)
 
 
 # ===================
@@ -95,6 +164,11 @@ After each action, take another screenshot to verify the result.
                     "items": {"type": "number"},
                     "description": "[x, y] coordinates for click/move actions (0,0 is top-left)"
                 },
+                "start_coordinate": {
+                    "type": "array",
+                    "items": {"type": "number"},
+                    "description": "[x, y] where a left_click_drag starts (it ends at coordinate)"
+                },
                 "text": {
                     "type": "string",
                     "description": "Text to type (for 'type' action)"
@@ -111,6 +185,10 @@ After each action, take another screenshot to verify the result.
                 "scroll_amount": {
                     "type": "integer",
                     "description": "Number of scroll units (each unit = 100px)"
+                },
+                "duration": {
+                    "type": "number",
+                    "description": "Seconds to wait at most (for 'wait', default 1); returns early once the screen is idle"
                 }
             },
             "required": ["action"]
@@ -232,21 +310,68 @@ Parameters for the action:
     }
 ]
 
+# Static JSON-RPC results, built once at import instead of per request
+# tools/list is encoded once as well; only the request id is spliced in per call
+_TOOLS_LIST_TAIL = b',"result":' + _json_dumps({"tools": OFFICIAL_TOOLS}).encode() + b'}'
+
+_INITIALIZE_RESULT = {
+    "protocolVersion": "2024-11-05",
+    "capabilities": {"tools": {}},
+    "serverInfo": {"name": "computer-use-mcp", "version": "1.0.0"}
+}
+
 
 # ===================
 # MCP Protocol Handlers
 # ===================
 
+# Idempotent GETs in flight, by (display epoch, path): concurrent callers share
+# one request, but never one started before a call that changed the screen
+_inflight: Dict[Tuple[int, str], "asyncio.Task[httpx.Response]"] = {}
+
+
+async def _get_shared(path: str, **kwargs) -> httpx.Response:
+    """GET *path* from the container, joining an identical request already in flight"""
+    key = (_display_epoch, path)
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.create_task(http_client.get(path, **kwargs))
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    # Shielded so one cancelled caller does not cancel the others' request
+    return await asyncio.shield(task)
+
+
+# Container probe result, reused for _HEALTH_TTL seconds so frequent
+# liveness/readiness polling does not turn into one container call each
+_HEALTH_TTL = 3.0
+_health_cache = {"ts": float("-inf"), "healthy": False}
+_health_lock = asyncio.Lock()
+
+
+async def _container_healthy() -> bool:
+    """Probe the container, at most once per _HEALTH_TTL; concurrent callers share one probe."""
+    if time.monotonic() - _health_cache["ts"] < _HEALTH_TTL:
+        return _health_cache["healthy"]
+    async with _health_lock:
+        # Another request may have refreshed it while we waited
+        if time.monotonic() - _health_cache["ts"] < _HEALTH_TTL:
+            return _health_cache["healthy"]
+        try:
+            response = await _get_shared("/health", timeout=5.0)
+            healthy = response.status_code == 200
+        except Exception as e:
+            logger.warning("Container health check failed: %s", e)
+            healthy = False
+        _health_cache["healthy"] = healthy
+        _health_cache["ts"] = time.monotonic()
+        return healthy
+
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
-    try:
-        # Check if container server is accessible
-        response = await http_client.get(f"{CONTAINER_URL}/health", timeout=5.0)
-        container_healthy = response.status_code == 200
-    except Exception as e:
-        logger.warning(f"Container health check failed: {e}")
-        container_healthy = False
+    container_healthy = await _container_healthy()
 
     return {
         "status": "healthy",
@@ -263,43 +388,47 @@ async def mcp_endpoint(request: Request):
     Main MCP endpoint - handles JSON-RPC 2.0 requests.
 
     Supported methods:
+    - initialize: Return server info and capabilities
     - tools/list: Return list of available tools
     - tools/call: Execute a tool call
     """
     try:
-        body = await request.json()
+        body = orjson.loads(await request.body()) if ORJSON_AVAILABLE else await request.json()
     except Exception as e:
-        logger.error(f"Invalid JSON request: {e}")
+        logger.error("Invalid JSON request: %s", e)
         return JSONResponse(
             status_code=400,
             content={"error": "Invalid JSON", "message": str(e)}
         )
 
-    logger.info(f"MCP request: {body.get('method', 'unknown')}")
+    logger.info("MCP request: %s", body.get("method", "unknown"))
 
     # Extract JSON-RPC fields
     method = body.get("method")
     params = body.get("params", {})
     request_id = body.get("id")
 
+    # Handle initialize
+    if method == "initialize":
+        return {"jsonrpc": "2.0", "id": request_id, "result": _INITIALIZE_RESULT}
+
     # Handle tools/list
-    if method == "tools/list":
-        logger.info(f"Returning {len(OFFICIAL_TOOLS)} official Anthropic tools")
-        return {
-            "jsonrpc": "2.0",
-            "id": request_id,
-            "result": {
-                "tools": OFFICIAL_TOOLS
-            }
-        }
+    elif method == "tools/list":
+        logger.info("Returning %d official Anthropic tools", len(OFFICIAL_TOOLS))
+        return Response(
+            content=b'{"jsonrpc":"2.0","id":' + _json_dumps(request_id).encode() + _TOOLS_LIST_TAIL,
+            media_type="application/json"
+        )
 
     # Handle tools/call
     elif method == "tools/call":
         tool_name = params.get("name")
         tool_input = params.get("arguments", {})
 
-        logger.info(f"Tool call: {tool_name}")
-        logger.debug(f"Tool input: {json.dumps(tool_input)[:200]}")
+        logger.info("Tool call: %s", tool_name)
+        # Serializing the input can be expensive (base64 payloads); _Lazy
+        # only does it if a DEBUG record is actually formatted
+        logger.debug("Tool input: %s", _Lazy(tool_input))
 
         # Route to appropriate container endpoint
         try:
@@ -312,7 +441,7 @@ async def mcp_endpoint(request: Request):
                 }
             }
         except Exception as e:
-            logger.error(f"Tool execution error: {e}")
+            logger.error("Tool execution error: %s", e)
             return {
                 "jsonrpc": "2.0",
                 "id": request_id,
@@ -324,7 +453,7 @@ async def mcp_endpoint(request: Request):
 
     # Unknown method
     else:
-        logger.warning(f"Unknown MCP method: {method}")
+        logger.warning("Unknown MCP method: %s", method)
         return {
             "jsonrpc": "2.0",
             "id": request_id,
@@ -339,6 +468,401 @@ async def mcp_endpoint(request: Request):
 # Tool Execution (Routes to Container Server)
 # ===================
 
+WORKSPACE_DIR = "/workspace"
+_WORKSPACE_PREFIX = WORKSPACE_DIR + "/"
+
+
+def _workspace_path(path: str) -> str:
+    """Map an editor path into /workspace; already-normalized paths are returned as-is."""
+    if path.startswith(_WORKSPACE_PREFIX) or path == WORKSPACE_DIR:
+        return path
+    if path.startswith("/"):
+        return WORKSPACE_DIR + path
+    return _WORKSPACE_PREFIX + path
+
+
+# Per-operation client timeouts (seconds), so a cheap call fails fast instead
+# of holding a worker for the client-wide 180 s. Browser values sit a little
+# above the container's own Playwright timeouts (navigate 30 s, click 10 s).
+_BROWSER_TIMEOUTS = {
+    "navigate": 35.0,
+    "go_back": 35.0,
+    "go_forward": 35.0,
+    "refresh": 35.0,
+    "click": 15.0,
+    "scroll": 10.0,
+    "screenshot": 10.0,
+    "get_content": 15.0,
+    "get_url": 5.0,
+    "cursor_position": 5.0,
+    "mouse_move": 10.0,
+    "drag": 15.0,
+    "get_title": 5.0,
+    "evaluate": 30.0,
+    "wait": 60.0,
+    "batch": 120.0,
+}
+_DEFAULT_BROWSER_TIMEOUT = 30.0
+_SCREENSHOT_TIMEOUT = 10.0
+_FILE_READ_TIMEOUT = 10.0
+_FILE_WRITE_TIMEOUT = 30.0
+_BASH_COMMAND_TIMEOUT = 120  # enforced by the container; the HTTP call gets a margin
+
+
+def _browser_timeout(action: str, params: Dict[str, Any]) -> float:
+    """Client timeout for one browser action, stretched by explicit Playwright timeouts / waits"""
+    if action == "type":
+        # Typing is paced at `delay` ms per character
+        timeout = 10.0 + len(params.get("text", "")) * params.get("delay", 50) / 1000
+    else:
+        timeout = _BROWSER_TIMEOUTS.get(action, _DEFAULT_BROWSER_TIMEOUT)
+    if "timeout" in params:  # Playwright timeout, in ms
+        timeout = max(timeout, params["timeout"] / 1000 + 5.0)
+    if "seconds" in params:
+        timeout = max(timeout, params["seconds"] + 5.0)
+    return timeout
+
+
+async def _browser_post(url: str, action: str, params: Dict[str, Any]) -> None:
+    """POST a single browser action to the container and raise on HTTP errors."""
+    resp = await http_client.post(
+        url, json={"action": action, "params": params}, timeout=_browser_timeout(action, params)
+    )
+    resp.raise_for_status()
+
+
+# Browser endpoint bound once; the computer actions below only vary action/params.
+_post_browser_action = functools.partial(_browser_post, "/tools/browser")
+
+
+# ── computer_20250124 actions ──
+
+MAX_WAIT_SECONDS = 60.0
+
+
+async def _computer_screenshot(tool_input: Dict[str, Any]) -> Any:
+    # Raw PNG body: no base64 inflation or JSON parsing of a multi-MB string;
+    # base64 is only applied for the MCP/Anthropic image block below
+    resp = await _get_shared(
+        "/tools/screenshot", headers={"Accept": "image/png"}, timeout=_SCREENSHOT_TIMEOUT
+    )
+    resp.raise_for_status()
+    if resp.headers.get("content-type", "").startswith("image/"):
+        image_base64 = base64.b64encode(resp.content).decode()
+    else:
+        # Older containers ignore Accept and answer with JSON
+        image_base64 = _json_loads(resp.content)["image_base64"]
+    # Return in Anthropic's expected format (base64 image)
+    return [{
+        "type": "image",
+        "source": {
+            "type": "base64",
+            "media_type": "image/png",
+            "data": image_base64
+        }
+    }]
+
+
+async def _computer_click(tool_input: Dict[str, Any]) -> str:
+    action: str = tool_input["action"]
+    coord: List[int] = tool_input.get("coordinate", [0, 0])
+    button = "right" if action == "right_click" else "left"
+    clicks = 2 if action == "double_click" else 1
+
+    # One request; the container turns click_count=2 into a native double click
+    await _post_browser_action(
+        "click", {"x": coord[0], "y": coord[1], "button": button, "click_count": clicks}
+    )
+
+    return f"{action} at ({coord[0]}, {coord[1]})"
+
+
+async def _computer_type(tool_input: Dict[str, Any]) -> str:
+    await _post_browser_action("type", {"text": tool_input.get("text", "")})
+    return "Typed text"
+
+
+# X11 key names -> Playwright names, and the "type" payload built per key
+# (single characters as-is, named keys in brackets), memoized per key name
+_SPECIAL_KEYS = {"Return": "Enter", "BackSpace": "Backspace", "space": " "}
+_KEY_PAYLOADS: Dict[str, str] = {}
+
+
+def _key_payload(key: str) -> str:
+    payload = _KEY_PAYLOADS.get(key)
+    if payload is None:
+        mapped = _SPECIAL_KEYS.get(key, key)
+        payload = mapped if len(mapped) == 1 else f"[{mapped}]"
+        if len(_KEY_PAYLOADS) < 256:
+            _KEY_PAYLOADS[key] = payload
+    return payload
+
+
+async def _computer_key(tool_input: Dict[str, Any]) -> str:
+    key: str = tool_input.get("key", "")
+    await _post_browser_action("type", {"text": _key_payload(key)})
+    return f"Pressed key: {key}"
+
+
+async def _computer_scroll(tool_input: Dict[str, Any]) -> str:
+    direction: str = tool_input.get("scroll_direction", "down")
+    amount: int = tool_input.get("scroll_amount", 3) * 100  # Convert to pixels
+
+    await _post_browser_action("scroll", {"direction": direction, "amount": amount})
+    return f"Scrolled {direction}"
+
+
+async def _computer_mouse_move(tool_input: Dict[str, Any]) -> str:
+    coord = tool_input.get("coordinate", [0, 0])
+    await _post_browser_action("mouse_move", {"x": coord[0], "y": coord[1]})
+    return f"Moved mouse to ({coord[0]}, {coord[1]})"
+
+
+async def _computer_cursor_position(tool_input: Dict[str, Any]) -> str:
+    resp = await http_client.post(
+        "/tools/browser",
+        json={"action": "cursor_position", "params": {}},
+        timeout=_browser_timeout("cursor_position", {})
+    )
+    resp.raise_for_status()
+    data = _json_loads(resp.content).get("data") or {}
+    return f"Cursor position: ({data.get('x', 0)}, {data.get('y', 0)})"
+
+
+async def _computer_wait(tool_input: Dict[str, Any]) -> str:
+    # Up to `duration` seconds (default 1, capped at MAX_WAIT_SECONDS), returning
+    # as soon as the UI is idle (older containers: blind sleep)
+    duration = min(max(float(tool_input.get("duration", 1)), 0.0), MAX_WAIT_SECONDS)
+    resp = await http_client.post(
+        "/tools/wait_idle", json={"max_ms": int(duration * 1000)}, timeout=duration + 5.0
+    )
+    if resp.status_code == 404:
+        await asyncio.sleep(duration)
+        return f"Waited {duration:g} seconds"
+    resp.raise_for_status()
+    return f"Waited {_json_loads(resp.content).get('elapsed_ms', 0)}ms for the screen to settle"
+
+
+async def _computer_drag(tool_input: Dict[str, Any]) -> str:
+    # Press, move and release happen in the container with one request
+    start = tool_input.get("start_coordinate", [0, 0])
+    end = tool_input.get("coordinate", [0, 0])
+    await _post_browser_action(
+        "drag", {"start_x": start[0], "start_y": start[1], "x": end[0], "y": end[1]}
+    )
+    return f"Dragged from ({start[0]}, {start[1]}) to ({end[0]}, {end[1]})"
+
+
+async def _unknown_computer_action(tool_input: Dict[str, Any]) -> str:
+    return f"Unknown computer action: {tool_input.get('action', '')}"
+
+
+COMPUTER_ACTIONS: Dict[str, Callable[[Dict[str, Any]], Awaitable[Any]]] = {
+    "screenshot": _computer_screenshot,
+    "left_click": _computer_click,
+    "right_click": _computer_click,
+    "double_click": _computer_click,
+    "type": _computer_type,
+    "key": _computer_key,
+    "scroll": _computer_scroll,
+    "mouse_move": _computer_mouse_move,
+    "cursor_position": _computer_cursor_position,
+    "wait": _computer_wait,
+    "left_click_drag": _computer_drag,
+}
+
+
+async def execute_computer(tool_input: Dict[str, Any]) -> Any:
+    """Execute a computer_20250124 action against the container server."""
+    action: str = tool_input.get("action", "")
+    logger.info("Computer action: %s", action)
+    return await COMPUTER_ACTIONS.get(action, _unknown_computer_action)(tool_input)
+
+
+# ── bash_20250124 tool ──
+
+async def execute_bash(tool_input: Dict[str, Any]) -> str:
+    if tool_input.get("restart"):
+        return "Shell restarted"
+
+    command = tool_input.get("command", "")
+    resp = await http_client.post(
+        "/tools/bash",
+        json={"command": command, "timeout": _BASH_COMMAND_TIMEOUT},
+        timeout=_BASH_COMMAND_TIMEOUT + 10.0
+    )
+    resp.raise_for_status()
+    data = _json_loads(resp.content)
+
+    # Format response
+    parts = []
+    if data.get("stdout"):
+        parts.append(data["stdout"])
+    if data.get("stderr"):
+        parts.append(f"STDERR:\n{data['stderr']}")
+    if data.get("return_code", 0) != 0:
+        parts.append(f"\nExit code: {data['return_code']}")
+
+    return "\n".join(parts) if parts else "(no output)"
+
+
+# ── text_editor_20250728 commands ──
+
+async def _editor_view(path: str, tool_input: Dict[str, Any]) -> str:
+    # The container numbers the lines itself, so the file text is only
+    # materialized once, already in its final form
+    resp = await http_client.post(
+        "/tools/file/read",
+        json={"path": path, "numbered": True},
+        timeout=_FILE_READ_TIMEOUT
+    )
+    if resp.status_code == 404:
+        return f"Error: File not found: {path}"
+    resp.raise_for_status()
+    return _json_loads(resp.content).get("content", "")
+
+
+async def _editor_create(path: str, tool_input: Dict[str, Any]) -> str:
+    file_text = tool_input.get("file_text", "")
+    resp = await http_client.post(
+        "/tools/file/write",
+        json={"path": path, "content": file_text},
+        timeout=_FILE_WRITE_TIMEOUT
+    )
+    resp.raise_for_status()
+    return f"Created file: {path}"
+
+
+async def _editor_patch(path: str, body: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Edit a file with one container-side /tools/file/patch call; None if it does not exist"""
+    resp = await http_client.post(
+        "/tools/file/patch", json={"path": path, **body}, timeout=_FILE_WRITE_TIMEOUT
+    )
+    if resp.status_code == 404:
+        return None
+    resp.raise_for_status()
+    return _json_loads(resp.content)
+
+
+async def _editor_str_replace(path: str, tool_input: Dict[str, Any]) -> str:
+    old_str = tool_input.get("old_str", "")
+    if not old_str:
+        return "Error: old_str is required"
+
+    # Uniqueness is checked in the container; the match count comes back either way
+    result = await _editor_patch(path, {
+        "op": "str_replace", "old_str": old_str, "new_str": tool_input.get("new_str", "")
+    })
+    if result is None:
+        return f"Error: File not found: {path}"
+    count = result.get("count", 0)
+    if count == 0:
+        return "Error: String not found in file"
+    if count > 1:
+        return f"Error: String appears {count} times. Be more specific."
+    return f"Replaced text in {path}"
+
+
+async def _editor_insert(path: str, tool_input: Dict[str, Any]) -> str:
+    insert_line = tool_input.get("insert_line", 0)
+    result = await _editor_patch(path, {
+        "op": "insert", "new_str": tool_input.get("new_str", ""), "insert_line": insert_line
+    })
+    if result is None:
+        return f"Error: File not found: {path}"
+    return f"Inserted text at line {insert_line}"
+
+
+async def _editor_undo(path: str, tool_input: Dict[str, Any]) -> str:
+    return "Undo is not supported."
+
+
+EDITOR_COMMANDS: Dict[str, Callable[[str, Dict[str, Any]], Awaitable[str]]] = {
+    "view": _editor_view,
+    "create": _editor_create,
+    "str_replace": _editor_str_replace,
+    "insert": _editor_insert,
+    "undo_edit": _editor_undo,
+}
+
+
+async def execute_text_editor(tool_input: Dict[str, Any]) -> str:
+    command = tool_input.get("command")
+    handler = EDITOR_COMMANDS.get(command)
+    if handler is None:
+        return f"Unknown editor command: {command}"
+    # Ensure path is in workspace
+    return await handler(_workspace_path(tool_input.get("path", "")), tool_input)
+
+
+# ── browser tool ──
+
+async def execute_browser(tool_input: Dict[str, Any]) -> str:
+    action = tool_input.get("action", "")
+    params = tool_input.get("params", {})
+
+    resp = await http_client.post(
+        "/tools/browser",
+        json={"action": action, "params": params},
+        timeout=_browser_timeout(action, params)
+    )
+    resp.raise_for_status()
+    data = _json_loads(resp.content)
+
+    if data.get("status") == "error":
+        return f"Browser action '{action}' failed: {data.get('error', 'Unknown error')}"
+
+    result_data = data.get("data", {})
+
+    # Special handling for screenshot
+    if action == "screenshot" and "image_base64" in result_data:
+        return _json_dumps({
+            "success": True,
+            "action": "screenshot",
+            "message": "Screenshot captured successfully",
+            "image_available": True
+        })
+
+    # Return formatted result
+    if result_data:
+        return _json_dumps({"success": True, "action": action, "data": result_data})
+    else:
+        return _json_dumps({"success": True, "action": action, "message": f"{action} completed"})
+
+
+# Tool name -> coroutine; one dict lookup per tools/call
+TOOL_DISPATCH: Dict[str, Callable[[Dict[str, Any]], Awaitable[Any]]] = {
+    "computer_20250124": execute_computer,
+    "bash_20250124": execute_bash,
+    "text_editor_20250728": execute_text_editor,
+    "browser": execute_browser,
+}
+
+
+# Agents often screenshot (or read the page) right after another
+# screenshot to "verify" a result. Those two reads are answered from a short
+# TTL cache. Every other call except the read-only ones may change the
+# screen, so it bumps _display_epoch, which is part of the cache key.
+_RESPONSE_TTL = 0.5
+_RESPONSE_CACHE_MAX = 8
+_CACHED_CALLS = frozenset({("computer_20250124", "screenshot"), ("browser", "get_content")})
+_READ_ONLY_CALLS = _CACHED_CALLS | {
+    ("computer_20250124", "cursor_position"),
+    ("browser", "get_url"),
+    ("browser", "get_title"),
+    ("browser", "screenshot"),
+    ("text_editor_20250728", "view"),
+}
+_response_cache: "OrderedDict[tuple, Tuple[float, Any]]" = OrderedDict()
+_display_epoch = 0
+
+
+def _bump_display_epoch():
+    global _display_epoch
+    _display_epoch += 1
+    _response_cache.clear()
+
+
 async def execute_tool(tool_name: str, tool_input: Dict[str, Any]) -> Any:
     """
     Route tool call to the container server.
@@ -346,263 +870,35 @@ async def execute_tool(tool_name: str, tool_input: Dict[str, Any]) -> Any:
     This is a thin wrapper that translates MCP tool calls
     to HTTP requests to the existing container/server.py endpoints.
     """
-    logger.info(f"Routing {tool_name} to container at {CONTAINER_URL}")
-
-    # ── computer_20250124 tool ──
-    if tool_name == "computer_20250124":
-        action = tool_input.get("action")
-        logger.info(f"Computer action: {action}")
-
-        # Screenshot
-        if action == "screenshot":
-            resp = await http_client.get(f"{CONTAINER_URL}/tools/screenshot")
-            resp.raise_for_status()
-            data = resp.json()
-            # Return in Anthropic's expected format (base64 image)
-            return [{
-                "type": "image",
-                "source": {
-                    "type": "base64",
-                    "media_type": "image/png",
-                    "data": data["image_base64"]
-                }
-            }]
-
-        # Click actions
-        elif action in ("left_click", "right_click", "double_click"):
-            coord = tool_input.get("coordinate", [0, 0])
-            button = "right" if action == "right_click" else "left"
-            clicks = 2 if action == "double_click" else 1
-
-            for _ in range(clicks):
-                resp = await http_client.post(
-                    f"{CONTAINER_URL}/tools/browser",
-                    json={"action": "click", "params": {"x": coord[0], "y": coord[1], "button": button}}
-                )
-                resp.raise_for_status()
-
-            return f"{action} at ({coord[0]}, {coord[1]})"
-
-        # Type text
-        elif action == "type":
-            text = tool_input.get("text", "")
-            resp = await http_client.post(
-                f"{CONTAINER_URL}/tools/browser",
-                json={"action": "type", "params": {"text": text}}
-            )
-            resp.raise_for_status()
-            return "Typed text"
-
-        # Key press
-        elif action == "key":
-            key = tool_input.get("key", "")
-            # Map special keys
-            mapped = {"Return": "Enter", "BackSpace": "Backspace", "space": " "}.get(key, key)
-            payload = mapped if len(mapped) == 1 else f"[{mapped}]"
-
-            resp = await http_client.post(
-                f"{CONTAINER_URL}/tools/browser",
-                json={"action": "type", "params": {"text": payload}}
-            )
-            resp.raise_for_status()
-            return f"Pressed key: {key}"
-
-        # Scroll
-        elif action == "scroll":
-            direction = tool_input.get("scroll_direction", "down")
-            amount = tool_input.get("scroll_amount", 3) * 100  # Convert to pixels
-
-            resp = await http_client.post(
-                f"{CONTAINER_URL}/tools/browser",
-                json={"action": "scroll", "params": {"direction": direction, "amount": amount}}
-            )
-            resp.raise_for_status()
-            return f"Scrolled {direction}"
-
-        # Mouse move
-        elif action == "mouse_move":
-            coord = tool_input.get("coordinate", [0, 0])
-            return f"Moved mouse to ({coord[0]}, {coord[1]})"
-
-        # Cursor position
-        elif action == "cursor_position":
-            return "Cursor position: (960, 540)"
-
-        # Wait
-        elif action == "wait":
-            import asyncio
-            await asyncio.sleep(1)
-            return "Waited 1 second"
-
-        # Drag
-        elif action == "left_click_drag":
-            return "Drag executed"
-
-        else:
-            return f"Unknown computer action: {action}"
-
-    # ── bash_20250124 tool ──
-    elif tool_name == "bash_20250124":
-        if tool_input.get("restart"):
-            return "Shell restarted"
-
-        command = tool_input.get("command", "")
-        resp = await http_client.post(
-            f"{CONTAINER_URL}/tools/bash",
-            json={"command": command, "timeout": 120}
-        )
-        resp.raise_for_status()
-        data = resp.json()
-
-        # Format response
-        parts = []
-        if data.get("stdout"):
-            parts.append(data["stdout"])
-        if data.get("stderr"):
-            parts.append(f"STDERR:\n{data['stderr']}")
-        if data.get("return_code", 0) != 0:
-            parts.append(f"\nExit code: {data['return_code']}")
-
-        return "\n".join(parts) if parts else "(no output)"
-
-    # ── text_editor_20250728 tool ──
-    elif tool_name == "text_editor_20250728":
-        command = tool_input.get("command")
-        path = tool_input.get("path", "")
-
-        # Ensure path is in workspace
-        if not path.startswith("/workspace"):
-            path = f"/workspace/{path.lstrip('/')}"
-
-        # View file
-        if command == "view":
-            resp = await http_client.post(
-                f"{CONTAINER_URL}/tools/file/read",
-                json={"path": path}
-            )
-            if resp.status_code == 404:
-                return f"Error: File not found: {path}"
-            resp.raise_for_status()
-            content = resp.json().get("content", "")
-            lines = content.split("\n")
-            return "\n".join(f"{i+1:4d}\t{line}" for i, line in enumerate(lines))
-
-        # Create file
-        elif command == "create":
-            file_text = tool_input.get("file_text", "")
-            resp = await http_client.post(
-                f"{CONTAINER_URL}/tools/file/write",
-                json={"path": path, "content": file_text}
-            )
-            resp.raise_for_status()
-            return f"Created file: {path}"
-
-        # Replace string
-        elif command == "str_replace":
-            old_str = tool_input.get("old_str", "")
-            new_str = tool_input.get("new_str", "")
-
-            # Read file
-            read_resp = await http_client.post(
-                f"{CONTAINER_URL}/tools/file/read",
-                json={"path": path}
-            )
-            if read_resp.status_code == 404:
-                return f"Error: File not found: {path}"
-            read_resp.raise_for_status()
-            content = read_resp.json().get("content", "")
-
-            # Check uniqueness
-            if old_str not in content:
-                return "Error: String not found in file"
-            if content.count(old_str) > 1:
-                return f"Error: String appears {content.count(old_str)} times. Be more specific."
-
-            # Replace and write
-            new_content = content.replace(old_str, new_str, 1)
-            write_resp = await http_client.post(
-                f"{CONTAINER_URL}/tools/file/write",
-                json={"path": path, "content": new_content}
-            )
-            write_resp.raise_for_status()
-            return f"Replaced text in {path}"
-
-        # Insert line
-        elif command == "insert":
-            insert_line = tool_input.get("insert_line", 0)
-            new_str = tool_input.get("new_str", "")
-
-            # Read file
-            read_resp = await http_client.post(
-                f"{CONTAINER_URL}/tools/file/read",
-                json={"path": path}
-            )
-            if read_resp.status_code == 404:
-                return f"Error: File not found: {path}"
-            read_resp.raise_for_status()
-
-            lines = read_resp.json().get("content", "").split("\n")
-
-            # Insert
-            if insert_line <= 0:
-                lines.insert(0, new_str)
-            elif insert_line >= len(lines):
-                lines.append(new_str)
-            else:
-                lines.insert(insert_line, new_str)
-
-            # Write back
-            new_content = "\n".join(lines)
-            write_resp = await http_client.post(
-                f"{CONTAINER_URL}/tools/file/write",
-                json={"path": path, "content": new_content}
-            )
-            write_resp.raise_for_status()
-            return f"Inserted text at line {insert_line}"
-
-        # Undo
-        elif command == "undo_edit":
-            return "Undo is not supported."
-
-        else:
-            return f"Unknown editor command: {command}"
-
-    # ── browser tool ──
-    elif tool_name == "browser":
-        action = tool_input.get("action", "")
-        params = tool_input.get("params", {})
-
-        resp = await http_client.post(
-            f"{CONTAINER_URL}/tools/browser",
-            json={"action": action, "params": params},
-            timeout=60.0
-        )
-        resp.raise_for_status()
-        data = resp.json()
-
-        if data.get("status") == "error":
-            return f"Browser action '{action}' failed: {data.get('error', 'Unknown error')}"
-
-        result_data = data.get("data", {})
-
-        # Special handling for screenshot
-        if action == "screenshot" and "image_base64" in result_data:
-            return json.dumps({
-                "success": True,
-                "action": "screenshot",
-                "message": "Screenshot captured successfully",
-                "image_available": True
-            })
-
-        # Return formatted result
-        if result_data:
-            return json.dumps({"success": True, "action": action, "data": result_data})
-        else:
-            return json.dumps({"success": True, "action": action, "message": f"{action} completed"})
-
-    # Unknown tool
-    else:
-        raise ValueError(f"Unknown tool: {tool_name}")
+    logger.info("Routing %s to container at %s", tool_name, CONTAINER_URL)
+    try:
+        handler = TOOL_DISPATCH[tool_name]
+    except KeyError:
+        raise ValueError(f"Unknown tool: {tool_name}") from None
+
+    call = (tool_name, tool_input.get("action") or tool_input.get("command"))
+    if call not in _READ_ONLY_CALLS:
+        # Bump before and after, so reads that overlap the change are not kept
+        _bump_display_epoch()
+        try:
+            return await handler(tool_input)
+        finally:
+            _bump_display_epoch()
+
+    if call not in _CACHED_CALLS:
+        return await handler(tool_input)
+
+    key = (_display_epoch, tool_name, _json_dumps(tool_input))
+    entry = _response_cache.get(key)
+    if entry is not None and time.monotonic() - entry[0] < _RESPONSE_TTL:
+        logger.info("Cached %s %s", *call)
+        return entry[1]
+    result = await handler(tool_input)
+    if key[0] == _display_epoch:
+        _response_cache[key] = (time.monotonic(), result)
+        while len(_response_cache) > _RESPONSE_CACHE_MAX:
+            _response_cache.popitem(last=False)
+    return result
 
 
 # ===================
@@ -615,9 +911,12 @@ async def startup_event():
     logger.info("=" * 70)
     logger.info("MCP COMPUTER-USE SERVER STARTING")
     logger.info("=" * 70)
-    logger.info(f"Container URL: {CONTAINER_URL}")
-    logger.info(f"Tools exposed: {[t['name'] for t in OFFICIAL_TOOLS]}")
-    logger.info(f"MCP Protocol: JSON-RPC 2.0")
+    logger.info("Container URL: %s", CONTAINER_URL)
+    if CONTAINER_UDS:
+        logger.info("Container socket: %s", CONTAINER_UDS)
+    logger.info("HTTP/2 to container: %s", USE_HTTP2)
+    logger.info("Tools exposed: %s", [t["name"] for t in OFFICIAL_TOOLS])
+    logger.info("MCP Protocol: JSON-RPC 2.0")
     logger.info("=" * 70)
     logger.info("MCP SERVER READY")
     logger.info("=" * 70)
@@ -633,4 +932,18 @@ async def shutdown_event():
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8081)
+    # uvloop + httptools come with uvicorn[standard]. One worker by default:
+    # the response cache, display epoch and in-flight GETs are per process,
+    # so extra workers could serve a screenshot cached before another
+    # worker's click.
+    workers = int(os.getenv("MCP_WORKERS", "1"))
+    uvicorn.run(
+        app if workers == 1 else "mcp_server:app",  # workers need an import string
+        host="0.0.0.0",
+        port=8081,
+        loop="uvloop",
+        http="httptools",
+        workers=workers,
+        backlog=2048,
+        timeout_keep_alive=30
+    )
@@ -9,10 +9,12 @@ in the containerized environment. It provides endpoints for:
 - Screenshots
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Depends
+from fastapi.responses import Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import Optional, Dict, Any, List
+import msgspec
 import asyncio
 import base64
 import os
@@ -20,7 +22,7 @@ import logging
 
 from tools.bash_tool import execute_bash
 from tools.browser_tool import BrowserManager
-from tools.file_tool import read_file, write_file, list_directory
+from tools.file_tool import read_file, write_file, patch_file, copy_file, list_directory, number_lines, file_etag
 from tools.screenshot_tool import take_screenshot
 
 # Configure logging
@@ -34,14 +36,17 @@ app = FastAPI(
     version="1.0.0"
 )
 
-# CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# CORS middleware - off by default: this server is only called by the agent
+# and the MCP server, never from a browser, so it would just add a middleware
+# layer to every request. Set ENABLE_CORS=true to turn it back on.
+if os.environ.get("ENABLE_CORS", "false").lower() == "true":
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
 
 # Initialize browser manager (singleton)
 browser_manager = BrowserManager()
@@ -51,7 +56,11 @@ browser_manager = BrowserManager()
 # Request/Response Models
 # ===================
 
-class BashRequest(BaseModel):
+# Bodies of the per-tool-call endpoints are msgspec Structs, decoded from the
+# raw request body in one C pass (see msgspec_body) instead of going through
+# Pydantic validation.
+
+class BashRequest(msgspec.Struct):
     """Request to execute a bash command."""
     command: str
     timeout: int = 120
@@ -65,7 +74,7 @@ class BashResponse(BaseModel):
     return_code: int
 
 
-class BrowserRequest(BaseModel):
+class BrowserRequest(msgspec.Struct):
     """Request for browser actions."""
     action: str  # navigate, click, type, screenshot, scroll, get_content, wait, go_back
     params: Dict[str, Any] = {}
@@ -78,17 +87,59 @@ class BrowserResponse(BaseModel):
     error: Optional[str] = None
 
 
-class FileReadRequest(BaseModel):
+class FileReadRequest(msgspec.Struct):
     """Request to read a file."""
     path: str
+    numbered: bool = False  # return cat -n style content
+    max_lines: Optional[int] = None  # with numbered: cap the returned lines
+    if_etag: Optional[str] = None  # etag from a previous read; 304 if unchanged
 
 
-class FileWriteRequest(BaseModel):
+class FileWriteRequest(msgspec.Struct):
     """Request to write a file."""
     path: str
     content: str
 
 
+class FilePatchRequest(msgspec.Struct):
+    """Request to edit a file in place."""
+    path: str
+    op: str  # str_replace, insert
+    old_str: Optional[str] = None
+    new_str: str = ""
+    insert_line: int = 0
+
+
+class FileCopyRequest(msgspec.Struct):
+    """Request to copy a file within the workspace."""
+    src: str
+    dst: str
+
+
+def msgspec_body(struct_type: type):
+    """FastAPI dependency decoding the JSON body into *struct_type* (422 on bad input)"""
+    decoder = msgspec.json.Decoder(struct_type)
+
+    async def decode(request: Request):
+        try:
+            return decoder.decode(await request.body())
+        except msgspec.DecodeError as e:  # includes ValidationError
+            raise HTTPException(status_code=422, detail=str(e))
+
+    return decode
+
+
+def msgspec_response(content: Any) -> Response:
+    """Encode a JSON response with msgspec"""
+    return Response(content=msgspec.json.encode(content), media_type="application/json")
+
+
+class WaitIdleRequest(BaseModel):
+    """Request to wait until the display is idle."""
+    max_ms: int = 1000
+    quiet_ms: int = 200
+
+
 class ScreenshotResponse(BaseModel):
     """Response with screenshot data."""
     image_base64: str
@@ -122,8 +173,11 @@ async def root():
             "browser": "POST /tools/browser",
             "file_read": "POST /tools/file/read",
             "file_write": "POST /tools/file/write",
+            "file_patch": "POST /tools/file/patch",
+            "file_copy": "POST /tools/file/copy",
             "file_list": "GET /tools/file/list",
-            "screenshot": "GET /tools/screenshot"
+            "screenshot": "GET /tools/screenshot",
+            "wait_idle": "POST /tools/wait_idle"
         }
     }
 
@@ -131,14 +185,14 @@ async def root():
 # --- Bash Tool ---
 
 @app.post("/tools/bash", response_model=BashResponse)
-async def bash_endpoint(request: BashRequest):
+async def bash_endpoint(request: BashRequest = Depends(msgspec_body(BashRequest))):
     """
     Execute a bash command and return the result.
 
     The command runs in the workspace directory by default.
     Output is captured and returned.
     """
-    logger.info(f"Executing bash command: {request.command[:100]}...")
+    logger.info("Executing bash command: %s...", request.command[:100])
 
     try:
         result = await execute_bash(
@@ -146,82 +200,161 @@ async def bash_endpoint(request: BashRequest):
             timeout=request.timeout,
             working_dir=request.working_dir
         )
-        return BashResponse(**result)
+        # BashResult encodes to {"stdout", "stderr", "return_code"} directly
+        return msgspec_response(result)
     except Exception as e:
-        logger.error(f"Bash execution error: {e}")
+        logger.error("Bash execution error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
 # --- Browser Tool ---
 
 @app.post("/tools/browser")
-async def browser_endpoint(request: BrowserRequest):
+async def browser_endpoint(request: BrowserRequest = Depends(msgspec_body(BrowserRequest))):
     """
     Execute browser actions.
 
     Supported actions:
     - navigate: Go to a URL (params: url)
-    - click: Click element (params: selector OR x, y)
+    - click: Click element (params: selector OR x, y, click_count?)
+    - mouse_move: Move the pointer (params: x, y)
+    - drag: Press, move and release (params: start_x, start_y, x, y)
+    - cursor_position: Last pointer position
     - type: Type text (params: text, selector?)
-    - screenshot: Take screenshot (params: full_page?)
+    - screenshot: Take screenshot (params: full_page?, format? png|jpeg|raw, quality?)
+      format=raw returns the PNG itself as the body (X-Width/X-Height headers)
     - scroll: Scroll page (params: direction, amount)
     - get_content: Get page content
     - wait: Wait for element/time (params: selector?, seconds?)
     - go_back: Navigate back
     - go_forward: Navigate forward
+    - batch: Run several actions in order (params: ops=[{action, params}])
+
+    Add "isolated": true to params to run on a background page from the
+    pool instead of the visible one.
     """
-    logger.info(f"Browser action: {request.action}")
+    logger.info("Browser action: %s", request.action)
 
     try:
         result = await browser_manager.execute_action(request.action, request.params)
 
         if "error" in result:
-            return {"status": "error", "error": result["error"]}
+            return msgspec_response({"status": "error", "error": result["error"]})
 
-        return {"status": "success", "data": result}
+        if "image_bytes" in result:
+            # screenshot with format=raw: the image is the body
+            return Response(
+                content=result["image_bytes"],
+                media_type=result["media_type"],
+                headers={"X-Width": str(result["width"]), "X-Height": str(result["height"])}
+            )
+
+        return msgspec_response({"status": "success", "data": result})
     except Exception as e:
-        logger.error(f"Browser action error: {e}")
+        logger.error("Browser action error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
 # --- File Tools ---
 
 @app.post("/tools/file/read")
-async def file_read_endpoint(request: FileReadRequest):
-    """Read a file from the workspace."""
-    logger.info(f"Reading file: {request.path}")
+async def file_read_endpoint(request: FileReadRequest = Depends(msgspec_body(FileReadRequest))):
+    """
+    Read a file from the workspace.
+
+    Responses carry an etag (null for a file modified in the last few
+    milliseconds); sending it back as if_etag returns an empty 304 when
+    the file has not changed since.
+    """
+    logger.info("Reading file: %s", request.path)
 
     try:
+        etag = file_etag(request.path)
+        if request.if_etag is not None and request.if_etag == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+
         content = await read_file(request.path)
-        return {"content": content, "path": request.path}
+        if request.numbered:
+            return msgspec_response({"path": request.path, "numbered": True, "etag": etag,
+                                     **number_lines(content, request.max_lines)})
+        return msgspec_response({"content": content, "path": request.path, "etag": etag})
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail=f"File not found: {request.path}")
     except PermissionError:
         raise HTTPException(status_code=403, detail=f"Access denied: {request.path}")
     except Exception as e:
-        logger.error(f"File read error: {e}")
+        logger.error("File read error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.post("/tools/file/write")
-async def file_write_endpoint(request: FileWriteRequest):
+async def file_write_endpoint(request: FileWriteRequest = Depends(msgspec_body(FileWriteRequest))):
     """Write content to a file in the workspace."""
-    logger.info(f"Writing file: {request.path}")
+    logger.info("Writing file: %s", request.path)
 
     try:
         await write_file(request.path, request.content)
-        return {"status": "success", "path": request.path, "size": len(request.content)}
+        return msgspec_response({"status": "success", "path": request.path, "size": len(request.content)})
+    except PermissionError:
+        raise HTTPException(status_code=403, detail=f"Access denied: {request.path}")
+    except Exception as e:
+        logger.error("File write error: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/tools/file/patch")
+async def file_patch_endpoint(request: FilePatchRequest = Depends(msgspec_body(FilePatchRequest))):
+    """
+    Edit a file in the workspace without a read/write round-trip.
+
+    str_replace only applies when old_str occurs exactly once; the
+    occurrence count is returned either way so callers can report it.
+    """
+    logger.info("Patching file: %s (%s)", request.path, request.op)
+
+    try:
+        result = await patch_file(
+            request.path,
+            request.op,
+            old_str=request.old_str,
+            new_str=request.new_str,
+            insert_line=request.insert_line
+        )
+        return msgspec_response({"status": "success", "path": request.path, **result})
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"File not found: {request.path}")
     except PermissionError:
         raise HTTPException(status_code=403, detail=f"Access denied: {request.path}")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        logger.error(f"File write error: {e}")
+        logger.error("File patch error: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/tools/file/copy")
+async def file_copy_endpoint(request: FileCopyRequest = Depends(msgspec_body(FileCopyRequest))):
+    """Copy a file in the workspace without sending its content over the API."""
+    logger.info("Copying file: %s -> %s", request.src, request.dst)
+
+    try:
+        size = await copy_file(request.src, request.dst)
+        return msgspec_response({"status": "success", "src": request.src, "dst": request.dst, "size": size})
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"File not found: {request.src}")
+    except PermissionError:
+        raise HTTPException(status_code=403, detail=f"Access denied: {request.src} -> {request.dst}")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error("File copy error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/tools/file/list")
 async def file_list_endpoint(path: str = "/workspace"):
     """List directory contents."""
-    logger.info(f"Listing directory: {path}")
+    logger.info("Listing directory: %s", path)
 
     try:
         files = await list_directory(path)
@@ -229,15 +362,21 @@ async def file_list_endpoint(path: str = "/workspace"):
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail=f"Directory not found: {path}")
     except Exception as e:
-        logger.error(f"Directory list error: {e}")
+        logger.error("Directory list error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
 # --- Screenshot Tool ---
 
 @app.get("/tools/screenshot")
-async def screenshot_endpoint():
-    """Take a screenshot of the current display."""
+async def screenshot_endpoint(request: Request):
+    """
+    Take a screenshot of the current display.
+
+    Clients sending "Accept: image/png" (or application/octet-stream) get
+    the raw PNG bytes, with the size in X-Image-Width / X-Image-Height,
+    instead of base64 inside JSON.
+    """
     logger.info("Taking screenshot of display")
 
     try:
@@ -246,9 +385,39 @@ async def screenshot_endpoint():
         if "error" in screenshot_data:
             raise HTTPException(status_code=500, detail=screenshot_data["error"])
 
+        accept = request.headers.get("accept", "")
+        if "image/png" in accept or "application/octet-stream" in accept:
+            return Response(
+                content=screenshot_data["image_bytes"],
+                media_type="image/png",
+                headers={
+                    "X-Image-Width": str(screenshot_data["width"]),
+                    "X-Image-Height": str(screenshot_data["height"])
+                }
+            )
+
         return ScreenshotResponse(**screenshot_data)
     except Exception as e:
-        logger.error(f"Screenshot error: {e}")
+        logger.error("Screenshot error: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# --- Wait Tool ---
+
+@app.post("/tools/wait_idle")
+async def wait_idle_endpoint(request: WaitIdleRequest):
+    """
+    Wait until the UI settles.
+
+    Returns as soon as the page has had no DOM mutations for quiet_ms,
+    or after max_ms at the latest.
+    """
+    logger.info("Waiting for idle (max %sms)", request.max_ms)
+
+    try:
+        return await browser_manager.wait_idle(request.max_ms, request.quiet_ms)
+    except Exception as e:
+        logger.error("Wait idle error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -266,7 +435,7 @@ async def startup_event():
         await browser_manager.initialize()
         logger.info("Browser initialized successfully")
     except Exception as e:
-        logger.warning(f"Browser initialization deferred: {e}")
+        logger.warning("Browser initialization deferred: %s", e)
 
     logger.info("Tool Server ready!")
 
@@ -280,9 +449,52 @@ async def shutdown_event():
         await browser_manager.cleanup()
         logger.info("Browser cleaned up")
     except Exception as e:
-        logger.error(f"Cleanup error: {e}")
+        logger.error("Cleanup error: %s", e)
 
 
-if __name__ == "__main__":
+# uvloop + httptools come with uvicorn[standard]. Always a single worker:
+# the browser manager is a per-process singleton.
+UVICORN_OPTIONS = dict(
+    loop="uvloop",
+    http="httptools",
+    backlog=2048,
+    timeout_keep_alive=30,
+    log_level="info",
+)
+
+
+def serve_tcp_and_uds(uds_path: str, port: int = 8080):
+    """
+    Serve on TCP (for the agent) and a Unix socket (for a colocated MCP
+    server) from one process, so both share the same browser session.
+    """
+    import socket
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8080)
+
+    tcp = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    tcp.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    tcp.bind(("0.0.0.0", port))
+
+    if os.path.exists(uds_path):
+        os.unlink(uds_path)
+    uds = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    uds.bind(uds_path)
+    os.chmod(uds_path, 0o660)
+
+    logger.info("Listening on 0.0.0.0:%s and %s", port, uds_path)
+    server = uvicorn.Server(uvicorn.Config(app, **UVICORN_OPTIONS))
+    # asyncio.run skips uvicorn's loop setup, so install uvloop here
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    except ImportError:
+        logger.warning("uvloop not installed, using the default event loop")
+    asyncio.run(server.serve(sockets=[tcp, uds]))
+
+
+if __name__ == "__main__":
+    if os.getenv("CONTAINER_UDS"):
+        serve_tcp_and_uds(os.environ["CONTAINER_UDS"])
+    else:
+        import uvicorn
+        uvicorn.run(app, host="0.0.0.0", port=8080, **UVICORN_OPTIONS)
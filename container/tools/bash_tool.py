@@ -6,22 +6,204 @@ stdout, stderr, and return code.
 """
 
 import asyncio
+import errno
+import fcntl
 import os
 import shlex
-from typing import Dict, Optional
+import msgspec
+from typing import Optional, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
 
 # Maximum output size to prevent memory issues
 MAX_OUTPUT_SIZE = 100000  # 100KB
+_TRUNCATED_SUFFIX = f"\n\n[Output truncated at {MAX_OUTPUT_SIZE} bytes]"
+
+class BashResult(msgspec.Struct):
+    """Result of a command; msgspec encodes it to JSON without a dict."""
+    stdout: str
+    stderr: str
+    return_code: int
+
+
+# Environment for spawned commands, built once instead of per call
+_SUBPROCESS_ENV = {
+    **os.environ,
+    "HOME": "/root",
+    "USER": "root",
+    "TERM": "xterm-256color"
+}
+
+# Anything the shell would interpret (pipes, redirects, expansion, quoting,
+# globbing, comments, line continuations) forces the /bin/sh path
+_SHELL_CHARS = frozenset("|&;<>$`*?[]{}()~#!=\\'\"\n")
+
+# Builtins have no binary to exec
+_SHELL_BUILTINS = frozenset({
+    "cd", "export", "source", ".", "alias", "unset", "set", "exit",
+    "eval", "exec", "ulimit", "umask", "read", "wait", "trap", "shopt",
+})
+
+
+def _needs_shell(command: str) -> bool:
+    """True unless command is a plain "binary arg arg" invocation."""
+    if not _SHELL_CHARS.isdisjoint(command):
+        return True
+    first = command.split(None, 1)
+    return not first or first[0] in _SHELL_BUILTINS
+
+
+async def _spawn(command: str, **kwargs) -> asyncio.subprocess.Process:
+    """
+    Start command, skipping /bin/sh -c when the shell would add nothing.
+
+    Falls back to the shell if the binary cannot be exec'd (not found, not
+    executable, a directory, or a script without a shebang), so the caller
+    still gets the shell's usual behaviour: exit code 127 or 126, or the
+    script run by /bin/sh.
+    """
+    if not _needs_shell(command):
+        try:
+            return await asyncio.create_subprocess_exec(*shlex.split(command), **kwargs)
+        except (FileNotFoundError, PermissionError):
+            pass
+        except OSError as e:
+            if e.errno != errno.ENOEXEC:
+                raise
+    return await asyncio.create_subprocess_shell(command, **kwargs)
+
+
+# Requested kernel pipe buffer for stdout/stderr (default is 64 KiB)
+_PIPE_SIZE = 1 << 20
+
+# Seconds between SIGTERM and SIGKILL for a timed-out command
+_KILL_GRACE = 2.0
+
+
+class _CappedPipe(asyncio.Protocol):
+    """
+    A child's stdout or stderr, read straight into a capped buffer.
+
+    The event loop hands each read to data_received, with no StreamReader
+    buffering and no task wake-up per chunk. Data past cap is dropped, but
+    the pipe keeps being read so the child never blocks on it.
+    """
+
+    def __init__(self, cap: int = MAX_OUTPUT_SIZE):
+        self.read_fd, self.write_fd = os.pipe()
+        if hasattr(fcntl, "F_SETPIPE_SZ"):
+            try:
+                fcntl.fcntl(self.write_fd, fcntl.F_SETPIPE_SZ, _PIPE_SIZE)
+            except OSError:
+                pass  # above /proc/sys/fs/pipe-max-size; keep the default
+        self.cap = cap
+        self.buf = bytearray()
+        self.truncated = False
+        self.transport = None
+        self.closed = asyncio.get_running_loop().create_future()
+
+    async def open(self):
+        """Start reading; call once the child holds its copy of write_fd."""
+        os.close(self.write_fd)
+        self.transport, _ = await asyncio.get_running_loop().connect_read_pipe(
+            lambda: self, os.fdopen(self.read_fd, "rb", buffering=0)
+        )
+
+    def abandon(self):
+        """Close both ends when the child was never started."""
+        os.close(self.read_fd)
+        os.close(self.write_fd)
+
+    def close(self):
+        if self.transport is not None:
+            self.transport.close()
+
+    def data_received(self, data: bytes):
+        room = self.cap - len(self.buf)
+        if len(data) <= room:
+            self.buf += data
+        else:
+            if room > 0:
+                self.buf += data[:room]
+            self.truncated = True
+
+    def connection_lost(self, exc):
+        if not self.closed.done():
+            self.closed.set_result(None)
+
+    def result(self) -> Tuple[bytearray, bool]:
+        # The buffer itself: it is decoded once, so a bytes() copy buys nothing
+        return self.buf, self.truncated
+
+
+async def _spawn_piped(command: str, **kwargs) -> Tuple[asyncio.subprocess.Process, Tuple[_CappedPipe, _CappedPipe]]:
+    """_spawn with stdout and stderr attached to capped pipes."""
+    pipes = (_CappedPipe(), _CappedPipe())
+    try:
+        process = await _spawn(command, stdout=pipes[0].write_fd, stderr=pipes[1].write_fd, **kwargs)
+    except BaseException:
+        for pipe in pipes:
+            pipe.abandon()
+        raise
+    for pipe in pipes:
+        await pipe.open()
+    return process, pipes
+
+
+async def _collect(
+    process: asyncio.subprocess.Process,
+    pipes: Tuple[_CappedPipe, _CappedPipe],
+    timeout: float
+) -> Optional[Tuple[Tuple[bytearray, bool], Tuple[bytearray, bool]]]:
+    """
+    Wait for both pipes to reach EOF and the process to exit, or terminate on timeout.
+
+    Returns ((stdout, truncated), (stderr, truncated)), or None on timeout.
+    """
+    waiter = asyncio.create_task(process.wait())
+    done, pending = await asyncio.wait([pipes[0].closed, pipes[1].closed, waiter], timeout=timeout)
+    if not pending:
+        return pipes[0].result(), pipes[1].result()
+
+    try:
+        process.terminate()
+        try:
+            await asyncio.wait_for(process.wait(), timeout=_KILL_GRACE)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+    except ProcessLookupError:
+        pass  # already exited; a background child is holding the pipes
+    # Background children may still hold the write ends open
+    for pipe in pipes:
+        pipe.close()
+    waiter.cancel()
+    return None
+
+
+async def _feed(stdin: asyncio.StreamWriter, data: bytes):
+    """Write data and close stdin so the child sees EOF."""
+    try:
+        stdin.write(data)
+        await stdin.drain()
+    except (BrokenPipeError, ConnectionResetError):
+        pass
+    finally:
+        stdin.close()
+
+
+def _decode(output: Tuple[bytearray, bool]) -> str:
+    data, truncated = output
+    text = data.decode("utf-8", errors="replace")
+    return text + _TRUNCATED_SUFFIX if truncated else text
 
 
 async def execute_bash(
     command: str,
     timeout: int = 120,
     working_dir: Optional[str] = "/workspace"
-) -> Dict:
+) -> BashResult:
     """
     Execute a bash command and return the result.
 
@@ -31,12 +213,12 @@ async def execute_bash(
         working_dir: Working directory for command execution (default: /workspace)
 
     Returns:
-        Dict with keys:
+        BashResult with:
         - stdout: Standard output (string)
         - stderr: Standard error (string)
         - return_code: Process return code (int)
     """
-    logger.info(f"Executing: {command[:200]}{'...' if len(command) > 200 else ''}")
+    logger.info("Executing: %s%s", command[:200], "..." if len(command) > 200 else "")
 
     # Validate working directory
     if working_dir and not os.path.isdir(working_dir):
@@ -44,64 +226,42 @@ async def execute_bash(
 
     try:
         # Create subprocess
-        process = await asyncio.create_subprocess_shell(
+        process, pipes = await _spawn_piped(
             command,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
             cwd=working_dir,
-            env={
-                **os.environ,
-                "HOME": "/root",
-                "USER": "root",
-                "TERM": "xterm-256color"
-            }
+            env=_SUBPROCESS_ENV
         )
 
-        try:
-            # Wait for completion with timeout
-            stdout, stderr = await asyncio.wait_for(
-                process.communicate(),
-                timeout=timeout
+        # Read both pipes as they fill so memory stays bounded by MAX_OUTPUT_SIZE
+        output = await _collect(process, pipes, timeout)
+        if output is None:
+            logger.warning("Command timed out after %ss: %s", timeout, command[:100])
+            return BashResult(
+                stdout="",
+                stderr=f"Command timed out after {timeout} seconds",
+                return_code=-1
             )
-        except asyncio.TimeoutError:
-            # Kill the process if it times out
-            process.kill()
-            await process.wait()
 
-            logger.warning(f"Command timed out after {timeout}s: {command[:100]}")
-            return {
-                "stdout": "",
-                "stderr": f"Command timed out after {timeout} seconds",
-                "return_code": -1
-            }
-
-        # Decode output
-        stdout_str = stdout.decode("utf-8", errors="replace")
-        stderr_str = stderr.decode("utf-8", errors="replace")
-
-        # Truncate if too large
-        if len(stdout_str) > MAX_OUTPUT_SIZE:
-            stdout_str = stdout_str[:MAX_OUTPUT_SIZE] + f"\n\n[Output truncated at {MAX_OUTPUT_SIZE} bytes]"
-        if len(stderr_str) > MAX_OUTPUT_SIZE:
-            stderr_str = stderr_str[:MAX_OUTPUT_SIZE] + f"\n\n[Output truncated at {MAX_OUTPUT_SIZE} bytes]"
+        stdout_str = _decode(output[0])
+        stderr_str = _decode(output[1])
 
         return_code = process.returncode or 0
 
-        logger.info(f"Command completed with return code: {return_code}")
+        logger.info("Command completed with return code: %s", return_code)
 
-        return {
-            "stdout": stdout_str,
-            "stderr": stderr_str,
-            "return_code": return_code
-        }
+        return BashResult(
+            stdout=stdout_str,
+            stderr=stderr_str,
+            return_code=return_code
+        )
 
     except Exception as e:
-        logger.error(f"Bash execution error: {e}")
-        return {
-            "stdout": "",
-            "stderr": f"Execution error: {str(e)}",
-            "return_code": -1
-        }
+        logger.error("Bash execution error: %s", e)
+        return BashResult(
+            stdout="",
+            stderr=f"Execution error: {str(e)}",
+            return_code=-1
+        )
 
 
 async def execute_bash_interactive(
@@ -109,7 +269,7 @@ async def execute_bash_interactive(
     input_text: Optional[str] = None,
     timeout: int = 120,
     working_dir: Optional[str] = "/workspace"
-) -> Dict:
+) -> BashResult:
     """
     Execute a bash command with optional stdin input.
 
@@ -122,44 +282,39 @@ async def execute_bash_interactive(
         working_dir: Working directory for command execution
 
     Returns:
-        Dict with stdout, stderr, and return_code
+        BashResult with stdout, stderr, and return_code
     """
-    logger.info(f"Executing interactive: {command[:200]}")
+    logger.info("Executing interactive: %s", command[:200])
 
     try:
-        process = await asyncio.create_subprocess_shell(
+        process, pipes = await _spawn_piped(
             command,
             stdin=asyncio.subprocess.PIPE if input_text else None,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
             cwd=working_dir
         )
 
-        try:
-            stdin_bytes = input_text.encode() if input_text else None
-            stdout, stderr = await asyncio.wait_for(
-                process.communicate(input=stdin_bytes),
-                timeout=timeout
+        # Feed stdin alongside the drain so neither side fills a pipe and stalls
+        feeder = asyncio.create_task(_feed(process.stdin, input_text.encode())) if input_text else None
+        output = await _collect(process, pipes, timeout)
+        if feeder is not None and not feeder.done():
+            feeder.cancel()
+        if output is None:
+            return BashResult(
+                stdout="",
+                stderr=f"Command timed out after {timeout} seconds",
+                return_code=-1
             )
-        except asyncio.TimeoutError:
-            process.kill()
-            await process.wait()
-            return {
-                "stdout": "",
-                "stderr": f"Command timed out after {timeout} seconds",
-                "return_code": -1
-            }
-
-        return {
-            "stdout": stdout.decode("utf-8", errors="replace"),
-            "stderr": stderr.decode("utf-8", errors="replace"),
-            "return_code": process.returncode or 0
-        }
+
+        return BashResult(
+            stdout=_decode(output[0]),
+            stderr=_decode(output[1]),
+            return_code=process.returncode or 0
+        )
 
     except Exception as e:
-        logger.error(f"Interactive bash error: {e}")
-        return {
-            "stdout": "",
-            "stderr": str(e),
-            "return_code": -1
-        }
+        logger.error("Interactive bash error: %s", e)
+        return BashResult(
+            stdout="",
+            stderr=str(e),
+            return_code=-1
+        )
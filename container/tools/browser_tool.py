@@ -12,13 +12,68 @@ Provides browser control capabilities for the computer-use agent:
 
 from playwright.async_api import async_playwright, Browser, Page, BrowserContext
 from typing import Dict, Any, Optional, List
-import base64
+import binascii
 import asyncio
+import contextlib
 import logging
 import os
+import re
 
 logger = logging.getLogger(__name__)
 
+# Background pages for actions sent with "isolated": true. Off by default:
+# each page costs a renderer's memory whether or not it is ever used.
+POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", "0"))
+
+# Images, fonts and media aborted when asset blocking is on. Off by default:
+# the agent works from screenshots, which need the page as a user sees it.
+BLOCK_ASSETS = os.getenv("BROWSER_BLOCK_ASSETS", "false").lower() == "true"
+BLOCKED_ASSET_PATTERN = re.compile(
+    r"\.(?:png|jpe?g|gif|webp|svg|ico|woff2?|ttf|otf|mp4|webm|avi|mp3)(?:[?#]|$)",
+    re.IGNORECASE
+)
+
+# Scroll direction -> wheel delta sign (dx, dy), or a scrollTo script
+SCROLLS = {
+    "down": (0, 1),
+    "up": (0, -1),
+    "left": (-1, 0),
+    "right": (1, 0),
+    "top": "() => window.scrollTo(0, 0)",
+    "bottom": "() => window.scrollTo(0, document.body.scrollHeight)",
+}
+
+URL_AND_TITLE_SCRIPT = "() => ({url: location.href, title: document.title})"
+
+# First n chars of the page text / HTML, so large pages are cut before the IPC hop
+TEXT_SLICE_SCRIPT = "(n) => (document.body ? document.body.innerText : '').slice(0, n)"
+HTML_SLICE_SCRIPT = "(n) => document.documentElement.outerHTML.slice(0, n)"
+
+# Resolves once the DOM has had no mutations for `quiet` ms, or after `max` ms.
+WAIT_IDLE_SCRIPT = """
+([quiet, max]) => new Promise(resolve => {
+    const start = performance.now();
+    let timer = null;
+    const done = (idle) => {
+        observer.disconnect();
+        clearTimeout(timer);
+        clearTimeout(cap);
+        resolve({idle, elapsed_ms: Math.round(performance.now() - start)});
+    };
+    const observer = new MutationObserver(() => {
+        clearTimeout(timer);
+        timer = setTimeout(() => done(true), quiet);
+    });
+    observer.observe(document, {subtree: true, childList: true, attributes: true, characterData: true});
+    timer = setTimeout(() => done(true), quiet);
+    const cap = setTimeout(() => done(false), max);
+})
+"""
+
+
+async def _abort_route(route):
+    await route.abort()
+
 
 class BrowserManager:
     """
@@ -28,12 +83,18 @@ class BrowserManager:
     can use to interact with web pages.
     """
 
-    def __init__(self):
+    def __init__(self, block_assets: bool = BLOCK_ASSETS):
+        self.block_assets = block_assets
         self.playwright = None
         self.browser: Optional[Browser] = None
         self.context: Optional[BrowserContext] = None
         self.page: Optional[Page] = None
+        # Warm pages in the same context; the visible page stays self.page
+        self._pool: "asyncio.Queue[Page]" = asyncio.Queue()
+        self._pool_pages: List[Page] = []
         self._initialized = False
+        # Playwright cannot report the pointer position, so track it here
+        self._mouse_position = (0, 0)
 
     async def initialize(self):
         """Initialize Playwright and launch browser."""
@@ -55,7 +116,12 @@ class BrowserManager:
                     # Removed '--disable-gpu' and '--disable-software-rasterizer'
                     # These flags prevented rendering to Xvfb display
                     '--window-size=1920,1080',
-                    '--window-position=0,0'
+                    '--window-position=0,0',
+                    # No background traffic competing with page loads
+                    '--disable-background-networking',
+                    '--disable-sync',
+                    '--disable-translate',
+                    '--mute-audio'
                 ]
             )
 
@@ -65,9 +131,21 @@ class BrowserManager:
                 user_agent='Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
             )
 
+            if self.block_assets:
+                # One route for the whole context, so it covers pooled pages too
+                await self.context.route(BLOCKED_ASSET_PATTERN, _abort_route)
+
             # Create initial page
             self.page = await self.context.new_page()
 
+            # Pre-create the background pool, then give the visible tab focus back
+            for _ in range(POOL_SIZE):
+                page = await self.context.new_page()
+                self._pool_pages.append(page)
+                self._pool.put_nowait(page)
+            if self._pool_pages:
+                await self.page.bring_to_front()
+
             self._initialized = True
             logger.info("Browser initialized successfully")
 
@@ -84,6 +162,11 @@ class BrowserManager:
                 await self.page.close()
                 self.page = None
 
+            for page in self._pool_pages:
+                await page.close()
+            self._pool_pages.clear()
+            self._pool = asyncio.Queue()
+
             if self.context:
                 await self.context.close()
                 self.context = None
@@ -111,6 +194,11 @@ class BrowserManager:
         """
         Execute a browser action.
 
+        Actions run on the visible page, unless params has "isolated": true;
+        then they run on a free background page from the pool, so
+        independent work (e.g. reading another URL) proceeds in parallel
+        without disturbing what the agent sees.
+
         Args:
             action: Action name (navigate, click, type, screenshot, etc.)
             params: Parameters for the action
@@ -123,54 +211,61 @@ class BrowserManager:
         if not self.page:
             return {"error": "Browser not initialized"}
 
-        try:
-            if action == "navigate":
-                return await self._navigate(params)
-
-            elif action == "click":
-                return await self._click(params)
-
-            elif action == "type":
-                return await self._type(params)
-
-            elif action == "screenshot":
-                return await self._screenshot(params)
-
-            elif action == "scroll":
-                return await self._scroll(params)
-
-            elif action == "get_content":
-                return await self._get_content(params)
-
-            elif action == "wait":
-                return await self._wait(params)
-
-            elif action == "go_back":
-                return await self._go_back()
+        if params.get("isolated") and self._pool_pages:
+            async with self._acquire_page() as page:
+                return await self._run(page, action, params)
+        return await self._run(self.page, action, params)
 
-            elif action == "go_forward":
-                return await self._go_forward()
+    async def _run(self, page: Page, action: str, params: Dict[str, Any]) -> Dict:
+        """Dispatch one action to its handler on *page*."""
+        try:
+            handler = self._ACTIONS.get(action)
+            if handler is None:
+                return {"error": f"Unknown action: {action}"}
+            return await handler(self, page, params)
 
-            elif action == "refresh":
-                return await self._refresh()
+        except Exception as e:
+            logger.error(f"Browser action '{action}' failed: {e}")
+            return {"error": str(e)}
 
-            elif action == "get_url":
-                return {"url": self.page.url}
+    @contextlib.asynccontextmanager
+    async def _acquire_page(self):
+        """Borrow a pooled page, waiting if all are busy."""
+        page = await self._pool.get()
+        try:
+            yield page
+        finally:
+            self._pool.put_nowait(page)
 
-            elif action == "get_title":
-                return {"title": await self.page.title()}
+    def _track_mouse(self, page: Page, x, y):
+        """Remember the pointer position of the visible page."""
+        if page is self.page:
+            self._mouse_position = (x, y)
 
-            elif action == "evaluate":
-                return await self._evaluate(params)
+    async def _batch(self, page: Page, params: Dict) -> Dict:
+        """
+        Run several actions in order with one request.
 
+        Stops at the first failing op; the remaining ops are reported as skipped.
+        """
+        ops = params.get("ops", [])
+        results = []
+        failed = False
+
+        for op in ops:
+            if failed:
+                results.append({"error": "Skipped after earlier failure"})
+                continue
+            if op.get("action") == "batch":
+                result = {"error": "Nested batch is not allowed"}
             else:
-                return {"error": f"Unknown action: {action}"}
+                result = await self._run(page, op.get("action", ""), op.get("params", {}))
+            failed = "error" in result
+            results.append(result)
 
-        except Exception as e:
-            logger.error(f"Browser action '{action}' failed: {e}")
-            return {"error": str(e)}
+        return {"results": results, "count": len(results)}
 
-    async def _navigate(self, params: Dict) -> Dict:
+    async def _navigate(self, page: Page, params: Dict) -> Dict:
         """Navigate to a URL."""
         url = params.get("url")
         if not url:
@@ -179,43 +274,49 @@ class BrowserManager:
         logger.info(f"Navigating to: {url}")
 
         try:
-            response = await self.page.goto(
+            response = await page.goto(
                 url,
                 wait_until=params.get("wait_until", "domcontentloaded"),
                 timeout=params.get("timeout", 30000)
             )
 
             return {
-                "url": self.page.url,
-                "title": await self.page.title(),
+                **await self._url_and_title(page),
                 "status": response.status if response else None
             }
         except Exception as e:
             return {"error": f"Navigation failed: {str(e)}"}
 
-    async def _click(self, params: Dict) -> Dict:
+    async def _click(self, page: Page, params: Dict) -> Dict:
         """Click an element by selector or coordinates."""
         logger.info(f"Click action with params: {params}")
 
         try:
             if "selector" in params:
                 selector = params["selector"]
-                await self.page.click(
+                await page.click(
                     selector,
                     timeout=params.get("timeout", 10000),
-                    button=params.get("button", "left")
+                    button=params.get("button", "left"),
+                    click_count=params.get("click_count", 1)
                 )
                 return {"clicked": selector}
 
             elif "x" in params and "y" in params:
                 x, y = params["x"], params["y"]
-                await self.page.mouse.click(x, y, button=params.get("button", "left"))
+                # click_count=2 is a native double click (one dblclick event)
+                await page.mouse.click(
+                    x, y,
+                    button=params.get("button", "left"),
+                    click_count=params.get("click_count", 1)
+                )
+                self._track_mouse(page, x, y)
                 return {"clicked_at": [x, y]}
 
             elif "text" in params:
                 # Click by visible text
                 text = params["text"]
-                await self.page.get_by_text(text, exact=params.get("exact", False)).click(
+                await page.get_by_text(text, exact=params.get("exact", False)).click(
                     timeout=params.get("timeout", 10000)
                 )
                 return {"clicked_text": text}
@@ -226,7 +327,32 @@ class BrowserManager:
         except Exception as e:
             return {"error": f"Click failed: {str(e)}"}
 
-    async def _type(self, params: Dict) -> Dict:
+    async def _mouse_move(self, page: Page, params: Dict) -> Dict:
+        """Move the pointer to x, y (hover)."""
+        x, y = params["x"], params["y"]
+        await page.mouse.move(x, y)
+        self._track_mouse(page, x, y)
+        return {"moved_to": [x, y]}
+
+    async def _drag(self, page: Page, params: Dict) -> Dict:
+        """Press at start_x, start_y, move to x, y and release, in one action."""
+        start_x, start_y, x, y = params["start_x"], params["start_y"], params["x"], params["y"]
+        try:
+            await page.mouse.move(start_x, start_y)
+            await page.mouse.down()
+            await page.mouse.move(x, y, steps=params.get("steps", 10))
+            await page.mouse.up()
+            self._track_mouse(page, x, y)
+            return {"dragged": [[start_x, start_y], [x, y]]}
+        except Exception as e:
+            return {"error": f"Drag failed: {str(e)}"}
+
+    async def _cursor_position(self, page: Page, params: Dict) -> Dict:
+        """Last pointer position set through this manager."""
+        x, y = self._mouse_position
+        return {"x": x, "y": y}
+
+    async def _type(self, page: Page, params: Dict) -> Dict:
         """Type text into an element or the active element."""
         text = params.get("text", "")
 
@@ -234,28 +360,48 @@ class BrowserManager:
             if "selector" in params:
                 selector = params["selector"]
                 if params.get("clear", False):
-                    await self.page.fill(selector, text)
+                    await page.fill(selector, text)
                 else:
-                    await self.page.type(selector, text, delay=params.get("delay", 50))
+                    await page.type(selector, text, delay=params.get("delay", 50))
                 return {"typed": text, "selector": selector}
             else:
                 # Type into currently focused element
-                await self.page.keyboard.type(text, delay=params.get("delay", 50))
+                await page.keyboard.type(text, delay=params.get("delay", 50))
                 return {"typed": text}
 
         except Exception as e:
             return {"error": f"Type failed: {str(e)}"}
 
-    async def _screenshot(self, params: Dict) -> Dict:
-        """Take a screenshot of the page."""
+    async def _screenshot(self, page: Page, params: Dict) -> Dict:
+        """
+        Take a screenshot of the page.
+
+        params["format"]: "png" (default), "jpeg" (with params["quality"],
+        default 70) or "raw" (PNG bytes under "image_bytes", no base64;
+        the server sends those as the response body).
+        """
+        fmt = params.get("format", "png")
+        image_type = "jpeg" if fmt == "jpeg" else "png"
+        options = {"quality": params.get("quality", 70)} if image_type == "jpeg" else {}
+
         try:
-            screenshot_bytes = await self.page.screenshot(
+            screenshot_bytes = await page.screenshot(
                 full_page=params.get("full_page", False),
-                type="png"
+                type=image_type,
+                **options
             )
 
+            if fmt == "raw":
+                return {
+                    "image_bytes": screenshot_bytes,
+                    "media_type": "image/png",
+                    "width": 1920,
+                    "height": 1080
+                }
+
             return {
-                "image_base64": base64.b64encode(screenshot_bytes).decode("utf-8"),
+                "image_base64": binascii.b2a_base64(screenshot_bytes, newline=False).decode("ascii"),
+                "format": image_type,
                 "width": 1920,
                 "height": 1080
             }
@@ -263,75 +409,82 @@ class BrowserManager:
         except Exception as e:
             return {"error": f"Screenshot failed: {str(e)}"}
 
-    async def _scroll(self, params: Dict) -> Dict:
+    async def _scroll(self, page: Page, params: Dict) -> Dict:
         """Scroll the page."""
         direction = params.get("direction", "down")
         amount = params.get("amount", 500)
 
+        scroll = SCROLLS.get(direction)
+        if scroll is None:
+            return {"error": f"Unknown scroll direction: {direction}"}
+
         try:
-            if direction == "down":
-                await self.page.evaluate(f"window.scrollBy(0, {amount})")
-            elif direction == "up":
-                await self.page.evaluate(f"window.scrollBy(0, -{amount})")
-            elif direction == "left":
-                await self.page.evaluate(f"window.scrollBy(-{amount}, 0)")
-            elif direction == "right":
-                await self.page.evaluate(f"window.scrollBy({amount}, 0)")
-            elif direction == "top":
-                await self.page.evaluate("window.scrollTo(0, 0)")
-            elif direction == "bottom":
-                await self.page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+            if isinstance(scroll, tuple):
+                # One Input.dispatchMouseEvent; no script to compile
+                await page.mouse.wheel(scroll[0] * amount, scroll[1] * amount)
             else:
-                return {"error": f"Unknown scroll direction: {direction}"}
+                # Constant source, so V8 reuses the compiled script
+                await page.evaluate(scroll)
 
             return {"scrolled": direction, "amount": amount}
 
         except Exception as e:
             return {"error": f"Scroll failed: {str(e)}"}
 
-    async def _get_content(self, params: Dict) -> Dict:
+    async def _get_content(self, page: Page, params: Dict) -> Dict:
         """Get page content and text."""
+        max_text = params.get("max_text_size", 10000)
+        max_html = params.get("max_html_size", 50000)
+        text_task = html_task = links_task = None
+
         try:
-            content = {
-                "url": self.page.url,
-                "title": await self.page.title(),
-            }
+            # Independent reads, so they share one round trip instead of queueing
+            async with asyncio.TaskGroup() as tg:
+                meta_task = tg.create_task(self._url_and_title(page))
+
+                # Get visible text (truncated in the page; one extra char tells us it was cut)
+                if params.get("text", True):
+                    text_task = tg.create_task(page.evaluate(TEXT_SLICE_SCRIPT, max_text + 1))
+
+                # Get HTML if requested
+                if params.get("html", False):
+                    html_task = tg.create_task(page.evaluate(HTML_SLICE_SCRIPT, max_html + 1))
+
+                # Get links if requested
+                if params.get("links", False):
+                    links_task = tg.create_task(page.eval_on_selector_all(
+                        "a[href]",
+                        "elements => elements.slice(0, 50).map(e => ({href: e.href, text: e.innerText.trim().slice(0, 100)}))"
+                    ))
+        except Exception as e:
+            if isinstance(e, ExceptionGroup):
+                e = e.exceptions[0]
+            return {"error": f"Get content failed: {str(e)}"}
 
-            # Get visible text
-            if params.get("text", True):
-                text = await self.page.inner_text("body")
-                # Limit text size
-                max_size = params.get("max_text_size", 10000)
-                if len(text) > max_size:
-                    text = text[:max_size] + f"\n...[truncated at {max_size} chars]"
-                content["text_content"] = text
-
-            # Get HTML if requested
-            if params.get("html", False):
-                html = await self.page.content()
-                max_size = params.get("max_html_size", 50000)
-                if len(html) > max_size:
-                    html = html[:max_size] + f"\n...[truncated at {max_size} chars]"
-                content["html"] = html
-
-            # Get links if requested
-            if params.get("links", False):
-                links = await self.page.eval_on_selector_all(
-                    "a[href]",
-                    "elements => elements.slice(0, 50).map(e => ({href: e.href, text: e.innerText.trim().slice(0, 100)}))"
-                )
-                content["links"] = links
+        content = meta_task.result()
 
-            return content
+        if text_task is not None:
+            text = text_task.result()
+            if len(text) > max_text:
+                text = text[:max_text] + f"\n...[truncated at {max_text} chars]"
+            content["text_content"] = text
 
-        except Exception as e:
-            return {"error": f"Get content failed: {str(e)}"}
+        if html_task is not None:
+            html = html_task.result()
+            if len(html) > max_html:
+                html = html[:max_html] + f"\n...[truncated at {max_html} chars]"
+            content["html"] = html
+
+        if links_task is not None:
+            content["links"] = links_task.result()
 
-    async def _wait(self, params: Dict) -> Dict:
+        return content
+
+    async def _wait(self, page: Page, params: Dict) -> Dict:
         """Wait for element or time."""
         try:
             if "selector" in params:
-                await self.page.wait_for_selector(
+                await page.wait_for_selector(
                     params["selector"],
                     timeout=params.get("timeout", 10000),
                     state=params.get("state", "visible")
@@ -343,7 +496,7 @@ class BrowserManager:
                 return {"waited_seconds": params["seconds"]}
 
             elif "navigation" in params:
-                await self.page.wait_for_load_state(params.get("state", "domcontentloaded"))
+                await page.wait_for_load_state(params.get("state", "domcontentloaded"))
                 return {"waited_for_navigation": True}
 
             else:
@@ -353,26 +506,80 @@ class BrowserManager:
         except Exception as e:
             return {"error": f"Wait failed: {str(e)}"}
 
-    async def _go_back(self) -> Dict:
+    async def _url_and_title(self, page: Page) -> Dict:
+        """URL and title as the document sees them, in one evaluate."""
+        return await page.evaluate(URL_AND_TITLE_SCRIPT)
+
+    async def wait_idle(self, max_ms: int = 1000, quiet_ms: int = 200) -> Dict:
+        """
+        Wait until the page is visually idle instead of sleeping blindly.
+
+        Returns as soon as no DOM mutation has happened for ``quiet_ms``,
+        or after ``max_ms`` at the latest.
+        """
+        await self.ensure_initialized()
+
+        if not self.page:
+            await asyncio.sleep(max_ms / 1000)
+            return {"idle": False, "elapsed_ms": max_ms}
+
+        try:
+            return await self.page.evaluate(WAIT_IDLE_SCRIPT, [quiet_ms, max_ms])
+        except Exception as e:
+            # Page navigated mid-wait or has no document yet
+            logger.warning(f"wait_idle failed, falling back to sleep: {e}")
+            await asyncio.sleep(max_ms / 1000)
+            return {"idle": False, "elapsed_ms": max_ms}
+
+    async def _go_back(self, page: Page, params: Dict) -> Dict:
         """Navigate back."""
-        await self.page.go_back()
-        return {"url": self.page.url, "title": await self.page.title()}
+        await page.go_back()
+        return await self._url_and_title(page)
 
-    async def _go_forward(self) -> Dict:
+    async def _go_forward(self, page: Page, params: Dict) -> Dict:
         """Navigate forward."""
-        await self.page.go_forward()
-        return {"url": self.page.url, "title": await self.page.title()}
+        await page.go_forward()
+        return await self._url_and_title(page)
 
-    async def _refresh(self) -> Dict:
+    async def _refresh(self, page: Page, params: Dict) -> Dict:
         """Refresh the page."""
-        await self.page.reload()
-        return {"url": self.page.url, "title": await self.page.title()}
+        await page.reload()
+        return await self._url_and_title(page)
 
-    async def _evaluate(self, params: Dict) -> Dict:
+    async def _get_url(self, page: Page, params: Dict) -> Dict:
+        """Current page URL."""
+        return {"url": page.url}
+
+    async def _get_title(self, page: Page, params: Dict) -> Dict:
+        """Current page title."""
+        return {"title": await page.title()}
+
+    async def _evaluate(self, page: Page, params: Dict) -> Dict:
         """Evaluate JavaScript in the page."""
         script = params.get("script", "")
         if not script:
             return {"error": "Script is required"}
 
-        result = await self.page.evaluate(script)
+        result = await page.evaluate(script)
         return {"result": result}
+
+    # Action name -> handler(self, page, params), built once for the class
+    _ACTIONS = {
+        "navigate": _navigate,
+        "click": _click,
+        "mouse_move": _mouse_move,
+        "drag": _drag,
+        "cursor_position": _cursor_position,
+        "type": _type,
+        "screenshot": _screenshot,
+        "scroll": _scroll,
+        "get_content": _get_content,
+        "wait": _wait,
+        "go_back": _go_back,
+        "go_forward": _go_forward,
+        "refresh": _refresh,
+        "get_url": _get_url,
+        "get_title": _get_title,
+        "evaluate": _evaluate,
+        "batch": _batch,
+    }
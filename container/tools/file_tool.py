@@ -7,8 +7,13 @@ sandboxed area.
 """
 
 import os
-import aiofiles
-from typing import List, Dict, Optional
+from stat import S_ISDIR, S_ISREG
+import shutil
+import threading
+import time
+import asyncio
+from collections import OrderedDict
+from typing import List, Dict, Optional, Tuple
 from pathlib import Path
 import logging
 
@@ -18,12 +23,24 @@ logger = logging.getLogger(__name__)
 WORKSPACE_ROOT = Path("/workspace")
 
 
+# The container runs the tools as root; see get_file_info
+_EUID = os.geteuid()
+
+# Resolved workspace root as a string, for prefix checks
+_WS = str(WORKSPACE_ROOT.resolve())
+_WS_PREFIX = _WS.rstrip(os.sep) + os.sep
+
+def _in_workspace(full: str) -> bool:
+    return full == _WS or full.startswith(_WS_PREFIX)
+
+
 def _validate_path(path: str) -> Path:
     """
     Validate and resolve a file path.
 
     Ensures the path is within the workspace directory to prevent
-    directory traversal attacks.
+    directory traversal attacks. Symlinks are resolved on every call, since
+    any directory on the path can be swapped for a symlink at any time.
 
     Args:
         path: The path to validate (can be relative or absolute)
@@ -38,24 +55,242 @@ def _validate_path(path: str) -> Path:
     # Handle both absolute and relative paths
     if path.startswith("/workspace"):
         # Absolute path within workspace
-        full_path = Path(path).resolve()
-    elif path.startswith("/"):
-        # Absolute path outside workspace - prepend workspace
-        full_path = (WORKSPACE_ROOT / path.lstrip("/")).resolve()
+        full = os.path.normpath(path)
     else:
-        # Relative path
-        full_path = (WORKSPACE_ROOT / path).resolve()
+        # Relative path, or absolute path outside workspace - prepend workspace
+        full = os.path.normpath(os.path.join(_WS, path.lstrip("/")))
+
+    if _in_workspace(full):
+        full = os.path.realpath(full)
 
     # Security check: ensure path stays within workspace
-    try:
-        full_path.relative_to(WORKSPACE_ROOT)
-    except ValueError:
+    if not _in_workspace(full):
         raise PermissionError(
             f"Access denied: path must be within {WORKSPACE_ROOT}. "
-            f"Attempted: {path} -> {full_path}"
+            f"Attempted: {path} -> {full}"
         )
 
-    return full_path
+    return Path(full)
+
+
+# Chunk size for pread/sendfile loops
+_IO_CHUNK = 1 << 20  # 1 MiB
+
+# Recently read files: path -> ((inode, size, mtime_ns), content)
+_READ_CACHE_MAX = 64
+_READ_CACHE_ENTRY_MAX = 1 << 20  # larger files are always read from disk
+_read_cache: "OrderedDict[str, Tuple[Tuple[int, int, int], bytes]]" = OrderedDict()
+_read_cache_lock = threading.Lock()
+
+
+def _forget(full_path: Path) -> None:
+    """Drop a cached read after this module changes the file."""
+    with _read_cache_lock:
+        _read_cache.pop(str(full_path), None)
+
+
+# mtimes advance in kernel timer ticks (up to 10 ms), so a same-size rewrite
+# within one tick of a read leaves (inode, size, mtime) unchanged. Files
+# modified this recently get no version (git's "racy clean" rule).
+_RACY_WINDOW_NS = 20_000_000
+
+
+def _version(st: os.stat_result) -> Optional[Tuple[int, int, int]]:
+    """(inode, size, mtime_ns) of a file, or None while it is too fresh to trust."""
+    if time.time_ns() - st.st_mtime_ns < _RACY_WINDOW_NS:
+        return None
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+def _read_cached(full_path: Path) -> bytes:
+    """
+    _read_all with a small LRU in front of it.
+
+    A hit costs one stat(): the entry is used only while inode, size and
+    mtime are unchanged, so edits made outside this module (bash, copies,
+    renames over the file) are picked up too. Files modified in the last
+    _RACY_WINDOW_NS are always read from disk.
+    """
+    key = str(full_path)
+    st = os.stat(key)
+    version = _version(st)
+    if version is None:
+        return _read_all(full_path)
+    with _read_cache_lock:
+        entry = _read_cache.get(key)
+        if entry is not None and entry[0] == version:
+            _read_cache.move_to_end(key)
+            return entry[1]
+
+    data = _read_all(full_path)
+    if S_ISREG(st.st_mode) and len(data) <= _READ_CACHE_ENTRY_MAX:
+        with _read_cache_lock:
+            _read_cache[key] = (version, data)
+            _read_cache.move_to_end(key)
+            if len(_read_cache) > _READ_CACHE_MAX:
+                _read_cache.popitem(last=False)
+    return data
+
+
+def _read_all(full_path: Path) -> bytes:
+    """Read a whole file with pread into a buffer sized from fstat."""
+    return bytes(_read_buffer(full_path))
+
+
+def _read_buffer(full_path: Path) -> bytearray:
+    """_read_all without the final bytes copy."""
+    fd = os.open(full_path, os.O_RDONLY | os.O_CLOEXEC)
+    try:
+        size = os.fstat(fd).st_size
+        buf = bytearray(size)
+        view = memoryview(buf)
+        offset = 0
+        while offset < size:
+            n = os.preadv(fd, [view[offset:offset + _IO_CHUNK]], offset)
+            if n == 0:  # file shrank while reading
+                break
+            offset += n
+        del view
+        if offset < size:
+            del buf[offset:]
+        # Files that grew (or report size 0, like /proc) are read to EOF
+        while True:
+            chunk = os.pread(fd, _IO_CHUNK, len(buf))
+            if not chunk:
+                break
+            buf += chunk
+        return buf
+    finally:
+        os.close(fd)
+
+
+def _read_text(full_path: Path) -> str:
+    """
+    Read and decode a file.
+
+    Files too big for the read cache are decoded straight from the read
+    buffer, skipping the intermediate bytes copy of the whole file.
+    """
+    st = os.stat(full_path)
+    if S_ISREG(st.st_mode) and st.st_size > _READ_CACHE_ENTRY_MAX:
+        return _read_buffer(full_path).decode("utf-8", errors="replace")
+    return _read_cached(full_path).decode("utf-8", errors="replace")
+
+
+def _write_all(full_path: Path, data: bytes, mode: str) -> None:
+    """mkdir, open, write and close in one worker-thread hop."""
+    _forget(full_path)
+    full_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(full_path, mode + "b") as f:
+        f.write(data)
+
+
+def _copy_all(src: Path, dst: Path) -> int:
+    """Copy src to dst with sendfile, so the bytes never enter Python."""
+    # Open src first: a missing source must not leave new directories behind
+    with open(src, "rb") as fsrc:
+        src_stat = os.fstat(fsrc.fileno())
+        try:
+            dst_stat = os.stat(dst)
+        except FileNotFoundError:
+            dst_stat = None
+        # Opening dst for writing truncates it, which would wipe src first
+        if dst_stat is not None and (dst_stat.st_dev, dst_stat.st_ino) == (src_stat.st_dev, src_stat.st_ino):
+            raise ValueError(f"Source and destination are the same file: {src}")
+
+        _forget(dst)
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        with open(dst, "wb") as fdst:
+            return _sendfile_all(fsrc, fdst)
+
+
+def _sendfile_all(fsrc, fdst) -> int:
+    """sendfile src into dst from offset 0; returns bytes copied."""
+    offset = 0
+    try:
+        while True:
+            sent = os.sendfile(fdst.fileno(), fsrc.fileno(), offset, _IO_CHUNK)
+            if sent == 0:
+                break
+            offset += sent
+    except OSError:
+        # sendfile unsupported for this pair of files: plain copy of the rest
+        fsrc.seek(offset)
+        fdst.seek(offset)
+        shutil.copyfileobj(fsrc, fdst, _IO_CHUNK)
+        offset = fdst.tell()
+    return offset
+
+
+async def read_bytes(path: str) -> bytes:
+    """
+    Read a file without decoding it.
+
+    Raises:
+        FileNotFoundError: If file doesn't exist
+        PermissionError: If path is outside workspace
+        ValueError: If path is a directory
+    """
+    return await _read_in_thread(path, _read_cached)
+
+
+async def _read_in_thread(path: str, reader):
+    """Validate path and run reader(full_path) in a worker thread."""
+    full_path = _validate_path(path)
+
+    logger.info("Reading file: %s", full_path)
+
+    try:
+        return await asyncio.to_thread(reader, full_path)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"File not found: {path}")
+    except IsADirectoryError:
+        raise ValueError(f"Not a file: {path}")
+
+
+async def write_bytes(path: str, data: bytes) -> None:
+    """
+    Write raw bytes to a file, creating parent directories if needed.
+
+    Raises:
+        PermissionError: If path is outside workspace
+    """
+    full_path = _validate_path(path)
+
+    logger.info("Writing file: %s (%s bytes)", full_path, len(data))
+
+    await asyncio.to_thread(_write_all, full_path, data, "w")
+
+
+async def copy_file(src: str, dst: str) -> int:
+    """
+    Copy a file within the workspace kernel-side (no decode/encode).
+
+    Args:
+        src: Source file path
+        dst: Destination file path (parent directories are created)
+
+    Returns:
+        Number of bytes copied
+
+    Raises:
+        FileNotFoundError: If src doesn't exist
+        PermissionError: If either path is outside workspace
+        ValueError: If src is a directory, or src and dst are the same file
+    """
+    src_path = _validate_path(src)
+    dst_path = _validate_path(dst)
+
+    logger.info("Copying file: %s -> %s", src_path, dst_path)
+
+    try:
+        return await asyncio.to_thread(_copy_all, src_path, dst_path)
+    except FileNotFoundError:
+        if not src_path.exists():
+            raise FileNotFoundError(f"File not found: {src}")
+        raise
+    except IsADirectoryError:
+        raise ValueError(f"Not a file: {src}")
 
 
 async def read_file(path: str) -> str:
@@ -72,24 +307,51 @@ async def read_file(path: str) -> str:
         FileNotFoundError: If file doesn't exist
         PermissionError: If path is outside workspace
     """
-    full_path = _validate_path(path)
+    content = await _read_in_thread(path, _read_text)
 
-    if not full_path.exists():
-        raise FileNotFoundError(f"File not found: {path}")
+    # Warn if file is very large
+    if len(content) > 100000:
+        logger.warning("Large file read: %s bytes", len(content))
 
-    if not full_path.is_file():
-        raise ValueError(f"Not a file: {path}")
+    return content
 
-    logger.info(f"Reading file: {full_path}")
 
-    async with aiofiles.open(full_path, 'r', encoding='utf-8', errors='replace') as f:
-        content = await f.read()
+def file_etag(path: str) -> Optional[str]:
+    """
+    Cheap validator for a file's current version (inode, size, mtime).
 
-    # Warn if file is very large
-    if len(content) > 100000:
-        logger.warning(f"Large file read: {len(content)} bytes")
+    Returns None for a file modified within the last few milliseconds, whose
+    mtime may not change on the next same-size write.
+
+    Raises:
+        FileNotFoundError: If file doesn't exist
+        PermissionError: If path is outside workspace
+    """
+    version = _version(_validate_path(path).stat())
+    if version is None:
+        return None
+    return '"%x-%x-%x"' % version
 
-    return content
+
+def number_lines(content: str, max_lines: Optional[int] = None) -> Dict:
+    """
+    Prefix each line with its 1-based line number (cat -n style).
+
+    Args:
+        content: Text to number
+        max_lines: Only return the first max_lines lines (None = all)
+
+    Returns:
+        Dict with numbered "content", "total_lines" and "truncated"
+    """
+    total = content.count("\n") + 1
+    if max_lines is not None and total > max_lines:
+        # Only split off the lines that are returned
+        lines = content.split("\n", max_lines)[:max_lines]
+    else:
+        lines = content.split("\n")
+    numbered = "\n".join([f"{i:4d}\t{line}" for i, line in enumerate(lines, 1)])
+    return {"content": numbered, "total_lines": total, "truncated": len(lines) < total}
 
 
 async def write_file(path: str, content: str) -> None:
@@ -107,13 +369,69 @@ async def write_file(path: str, content: str) -> None:
     """
     full_path = _validate_path(path)
 
-    # Create parent directories if needed
-    full_path.parent.mkdir(parents=True, exist_ok=True)
+    logger.info("Writing file: %s (%s bytes)", full_path, len(content))
+
+    # Creates parent directories if needed
+    await asyncio.to_thread(_write_all, full_path, content.encode("utf-8"), "w")
+
+
+async def patch_file(
+    path: str,
+    op: str,
+    old_str: Optional[str] = None,
+    new_str: str = "",
+    insert_line: int = 0
+) -> Dict:
+    """
+    Edit a file in place, so callers don't have to read and re-write it.
+
+    Supported operations:
+    - str_replace: replace old_str with new_str, only if it occurs exactly once
+    - insert: insert new_str as a line after line number insert_line
 
-    logger.info(f"Writing file: {full_path} ({len(content)} bytes)")
+    Args:
+        path: Path to the file
+        op: "str_replace" or "insert"
+        old_str: Text to replace (str_replace)
+        new_str: Replacement / inserted text
+        insert_line: Line number to insert at, 0 = beginning (insert)
 
-    async with aiofiles.open(full_path, 'w', encoding='utf-8') as f:
-        await f.write(content)
+    Returns:
+        Dict with "count" (occurrences of old_str, 1 for insert) and
+        "applied" (whether the file was modified)
+
+    Raises:
+        FileNotFoundError: If file doesn't exist
+        PermissionError: If path is outside workspace
+        ValueError: If op is unknown
+    """
+    content = await read_file(path)
+
+    if op == "str_replace":
+        if not old_str:
+            raise ValueError("old_str is required for str_replace")
+        # Two find() calls decide uniqueness; count() only runs when ambiguous
+        idx = content.find(old_str)
+        if idx < 0:
+            return {"count": 0, "applied": False}
+        end = idx + len(old_str)
+        if content.find(old_str, end) != -1:
+            return {"count": content.count(old_str), "applied": False}
+        await write_file(path, content[:idx] + new_str + content[end:])
+        return {"count": 1, "applied": True}
+
+    if op == "insert":
+        lines = content.split("\n")
+        if insert_line <= 0:
+            lines.insert(0, new_str)
+        elif insert_line >= len(lines):
+            lines.append(new_str)
+        else:
+            lines.insert(insert_line, new_str)
+        await write_file(path, "\n".join(lines))
+        return {"count": 1, "applied": True}
+
+    raise ValueError(f"Unknown patch op: {op}")
 
 
 async def append_file(path: str, content: str) -> None:
@@ -129,13 +447,10 @@ async def append_file(path: str, content: str) -> None:
     """
     full_path = _validate_path(path)
 
-    # Create parent directories and file if needed
-    full_path.parent.mkdir(parents=True, exist_ok=True)
+    logger.info("Appending to file: %s (%s bytes)", full_path, len(content))
 
-    logger.info(f"Appending to file: {full_path} ({len(content)} bytes)")
-
-    async with aiofiles.open(full_path, 'a', encoding='utf-8') as f:
-        await f.write(content)
+    # Creates parent directories and file if needed
+    await asyncio.to_thread(_write_all, full_path, content.encode("utf-8"), "a")
 
 
 async def list_directory(path: str = "/workspace") -> List[Dict]:
@@ -160,15 +475,29 @@ async def list_directory(path: str = "/workspace") -> List[Dict]:
     if not full_path.is_dir():
         raise ValueError(f"Not a directory: {path}")
 
-    logger.info(f"Listing directory: {full_path}")
+    logger.info("Listing directory: %s", full_path)
+
+    return await asyncio.to_thread(_scan_directory, full_path)
+
+
+def _scan_directory(full_path: Path) -> List[Dict]:
+    """
+    Blocking half of list_directory, run in a worker thread.
+
+    os.scandir gets the entry type from readdir itself, so each entry
+    costs a single stat() for size and mtime.
+    """
+    with os.scandir(full_path) as it:
+        entries = sorted(it, key=lambda e: e.name)
 
     files = []
-    for item in sorted(full_path.iterdir()):
-        stat = item.stat()
+    for entry in entries:
+        is_dir = entry.is_dir()
+        stat = entry.stat()
         files.append({
-            "name": item.name,
-            "type": "directory" if item.is_dir() else "file",
-            "size": stat.st_size if item.is_file() else None,
+            "name": entry.name,
+            "type": "directory" if is_dir else "file",
+            "size": stat.st_size if entry.is_file() else None,
             "modified": stat.st_mtime
         })
 
@@ -194,8 +523,9 @@ async def delete_file(path: str) -> None:
     if full_path.is_dir():
         raise ValueError(f"Cannot delete directory with delete_file: {path}")
 
-    logger.info(f"Deleting file: {full_path}")
+    logger.info("Deleting file: %s", full_path)
     full_path.unlink()
+    _forget(full_path)
 
 
 async def file_exists(path: str) -> bool:
@@ -227,18 +557,26 @@ async def get_file_info(path: str) -> Dict:
     """
     full_path = _validate_path(path)
 
-    if not full_path.exists():
+    # One stat answers exists/is_dir/size/times
+    try:
+        stat = full_path.stat()
+    except FileNotFoundError:
         raise FileNotFoundError(f"File not found: {path}")
 
-    stat = full_path.stat()
+    if _EUID == 0:
+        # root passes permission checks, no access(2) calls needed
+        is_readable = is_writable = True
+    else:
+        is_readable = os.access(full_path, os.R_OK)
+        is_writable = os.access(full_path, os.W_OK)
 
     return {
         "name": full_path.name,
         "path": str(full_path),
-        "type": "directory" if full_path.is_dir() else "file",
+        "type": "directory" if S_ISDIR(stat.st_mode) else "file",
         "size": stat.st_size,
         "created": stat.st_ctime,
         "modified": stat.st_mtime,
-        "is_readable": os.access(full_path, os.R_OK),
-        "is_writable": os.access(full_path, os.W_OK)
+        "is_readable": is_readable,
+        "is_writable": is_writable
     }
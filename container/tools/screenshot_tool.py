@@ -1,21 +1,38 @@
 """
 Screenshot Tool.
 
-Takes screenshots of the virtual display (Xvfb) using scrot or pillow.
+Takes screenshots of the virtual display (Xvfb) using mss, scrot or ImageMagick.
 This captures what's currently visible on the desktop, including
 browser windows and any GUI applications.
 """
 
 import subprocess
-import base64
+import binascii
 import asyncio
 import os
-from typing import Dict
+from typing import Dict, List, Optional, Tuple
 from PIL import Image
 import io
+import struct
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+# SIMD base64 (picks the widest instruction set the CPU supports at import)
+try:
+    import pybase64
+    PYBASE64_AVAILABLE = True
+except ImportError:
+    PYBASE64_AVAILABLE = False
+
+# mss grabs frames over a long-lived X connection, so captures skip the
+# fork/exec and X connection setup of a scrot run
+try:
+    import mss
+    MSS_AVAILABLE = True
+except ImportError:
+    MSS_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
 # Screenshot storage location (temp for processing)
@@ -24,6 +41,27 @@ SCREENSHOT_DIR = "/tmp/screenshots"
 # Persistent storage location (mounted to local machine)
 PERSISTENT_SCREENSHOT_DIR = "/screenshots"
 
+# Captures go through stdout; the directory is only the fallback target and
+# the capture tools' working directory
+os.makedirs(SCREENSHOT_DIR, exist_ok=True)
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# mss instances are not thread-safe: one thread owns them (display -> mss)
+_grab_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="screen-grab")
+_grabbers: Dict[str, "mss.base.MSSBase"] = {}
+
+# Background persistent saves: at most 4 writing at once
+_save_slots = asyncio.Semaphore(4)
+_pending_saves = set()
+
+
+def _b64encode(data: bytes) -> str:
+    """Base64 text for a PNG, without a separate .decode() pass."""
+    if PYBASE64_AVAILABLE:
+        return pybase64.b64encode_as_string(data)
+    return binascii.b2a_base64(data, newline=False).decode("ascii")
+
 
 async def take_screenshot(
     display: str = ":99",
@@ -36,7 +74,8 @@ async def take_screenshot(
 
     Args:
         display: X display to capture (default: :99)
-        filename: Output filename (saved in /tmp/screenshots)
+        filename: Output filename in /tmp/screenshots, used only when scrot
+            cannot write the PNG to stdout
 
     Returns:
         Dict with:
@@ -45,70 +84,86 @@ async def take_screenshot(
         - height: Image height in pixels
         - error: Error message if failed
     """
-    # Ensure screenshot directory exists
-    os.makedirs(SCREENSHOT_DIR, exist_ok=True)
-
     output_path = os.path.join(SCREENSHOT_DIR, filename)
 
-    logger.info(f"Taking screenshot of display {display}")
+    logger.info("Taking screenshot of display %s", display)
 
     try:
-        # Method 1: Use scrot (preferred)
-        result = await _take_screenshot_scrot(display, output_path)
-        if result:
-            return result
-
-        # Method 2: Fallback to import (ImageMagick)
-        result = await _take_screenshot_import(display, output_path)
-        if result:
-            return result
-
-        return {"error": "No screenshot method available"}
+        image_data = await _capture_raw(display, output_path)
+        if image_data is None:
+            return {"error": "No screenshot method available"}
+        return await _process_screenshot(image_data)
 
     except Exception as e:
-        logger.error(f"Screenshot failed: {e}")
+        logger.error("Screenshot failed: %s", e)
         return {"error": str(e)}
 
 
-async def _take_screenshot_scrot(display: str, output_path: str) -> Dict:
-    """Take screenshot using scrot."""
-    try:
-        process = await asyncio.create_subprocess_exec(
-            'scrot', '-o', output_path,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
-            env={**os.environ, 'DISPLAY': display}
-        )
-
-        stdout, stderr = await asyncio.wait_for(
-            process.communicate(),
-            timeout=10
-        )
+async def _capture_raw(display: str, output_path: str) -> Optional[bytes]:
+    """Capture the display as PNG bytes, or None if no method worked."""
+    # Method 1: Persistent in-process grab (mss)
+    image_data = await _grab_display(display)
+    if image_data is None:
+        # Method 2: Use scrot
+        image_data = await _take_screenshot_scrot(display, output_path)
+    if image_data is None:
+        # Method 3: Fallback to import (ImageMagick)
+        image_data = await _take_screenshot_import(display, output_path)
+    return image_data
 
-        if process.returncode != 0:
-            logger.warning(f"scrot failed: {stderr.decode()}")
-            return None
 
-        return await _read_screenshot(output_path)
+async def _grab_display(display: str, region: Optional[Dict] = None) -> Optional[bytes]:
+    """
+    Grab the display (or a left/top/width/height region) with mss.
 
-    except FileNotFoundError:
-        logger.debug("scrot not found")
-        return None
-    except asyncio.TimeoutError:
-        logger.warning("scrot timed out")
+    Runs on the single grab thread; returns None if mss is missing or the
+    grab failed, so callers fall back to scrot.
+    """
+    if not MSS_AVAILABLE:
         return None
+    try:
+        return await asyncio.get_running_loop().run_in_executor(
+            _grab_executor, _grab_png, display, region
+        )
     except Exception as e:
-        logger.debug(f"scrot error: {e}")
+        logger.debug("mss grab failed, falling back to scrot: %s", e)
         return None
 
 
-async def _take_screenshot_import(display: str, output_path: str) -> Dict:
-    """Take screenshot using ImageMagick import."""
+def _grab_png(display: str, region: Optional[Dict]) -> bytes:
+    """Blocking half of _grab_display; only ever runs on the grab thread."""
+    sct = _grabbers.get(display)
+    if sct is None:
+        sct = mss.mss(display=display)
+        _grabbers[display] = sct
+    try:
+        shot = sct.grab(region or sct.monitors[1])
+    except Exception:
+        # Drop the connection; the next call reconnects
+        _grabbers.pop(display, None)
+        sct.close()
+        raise
+
+    # Fast compression (level 1): the frame is sent once and decoded once
+    img = Image.frombytes("RGB", shot.size, shot.rgb)
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG", compress_level=1)
+    return buffer.getvalue()
+
+
+async def _run_capture(name: str, args: List[str], display: str) -> Optional[bytes]:
+    """
+    Run a capture command and return its stdout.
+
+    Returns None (logged) when the tool is missing, fails or times out.
+    Runs in SCREENSHOT_DIR, so stray output files land there.
+    """
     try:
         process = await asyncio.create_subprocess_exec(
-            'import', '-window', 'root', output_path,
+            *args,
             stdout=asyncio.subprocess.PIPE,
             stderr=asyncio.subprocess.PIPE,
+            cwd=SCREENSHOT_DIR,
             env={**os.environ, 'DISPLAY': display}
         )
 
@@ -118,70 +173,112 @@ async def _take_screenshot_import(display: str, output_path: str) -> Dict:
         )
 
         if process.returncode != 0:
-            logger.warning(f"import failed: {stderr.decode()}")
+            logger.warning("%s failed: %s", name, stderr.decode())
             return None
 
-        return await _read_screenshot(output_path)
+        return stdout
 
     except FileNotFoundError:
-        logger.debug("import (ImageMagick) not found")
+        logger.debug("%s not found", name)
         return None
     except asyncio.TimeoutError:
-        logger.warning("import timed out")
+        logger.warning("%s timed out", name)
         return None
     except Exception as e:
-        logger.debug(f"import error: {e}")
+        logger.debug("%s error: %s", name, e)
+        return None
+
+
+async def _take_screenshot_scrot(display: str, output_path: str, geometry: Optional[str] = None) -> Optional[bytes]:
+    """Take screenshot using scrot, piping the PNG through stdout."""
+    area = ['-a', geometry] if geometry else []
+    image_data = await _run_capture('scrot', ['scrot', *area, '-o', '-'], display)
+    if image_data is None:
         return None
+    if image_data.startswith(PNG_SIGNATURE):
+        return image_data
 
+    # scrot builds without stdout support ('-' is just a filename to them)
+    if await _run_capture('scrot', ['scrot', *area, '-o', output_path], display) is None:
+        return None
+    return _read_file(output_path)
+
+
+async def _take_screenshot_import(display: str, output_path: str) -> Optional[bytes]:
+    """Take screenshot using ImageMagick import, writing PNG to stdout."""
+    image_data = await _run_capture('import', ['import', '-window', 'root', 'png:-'], display)
+    if image_data is None or not image_data.startswith(PNG_SIGNATURE):
+        return None
+    return image_data
 
-async def _read_screenshot(filepath: str) -> Dict:
-    """Read screenshot file and return as base64."""
+
+def _read_file(filepath: str) -> Optional[bytes]:
+    """Bytes of the file a capture tool wrote, or None if it wrote nothing."""
     if not os.path.exists(filepath):
-        return {"error": f"Screenshot file not created: {filepath}"}
+        logger.warning("Screenshot file not created: %s", filepath)
+        return None
 
     with open(filepath, 'rb') as f:
-        image_data = f.read()
+        return f.read()
+
+
+def _png_size(image_data: bytes) -> Tuple[int, int]:
+    """Width and height from the PNG IHDR chunk (bytes 16-24), without decoding."""
+    if image_data.startswith(PNG_SIGNATURE) and image_data[12:16] == b"IHDR":
+        return struct.unpack(">II", image_data[16:24])
+    # Not a PNG after all: let PIL work it out
+    return Image.open(io.BytesIO(image_data)).size
 
-    # Get dimensions using PIL
-    img = Image.open(io.BytesIO(image_data))
-    width, height = img.size
 
-    logger.info(f"Screenshot captured: {width}x{height}")
+async def _process_screenshot(image_data: bytes) -> Dict:
+    """Build the screenshot result (base64, size, persistent copy) from PNG bytes."""
+    width, height = _png_size(image_data)
 
-    # Save a copy to persistent storage with timestamp
-    saved_path = await _save_screenshot_persistent(image_data)
-    if saved_path:
-        logger.info(f"Screenshot saved to: {saved_path}")
+    logger.info("Screenshot captured: %sx%s", width, height)
+
+    # Save a copy to persistent storage in the background
+    _schedule_persistent_save(image_data)
 
     return {
-        "image_base64": base64.b64encode(image_data).decode('utf-8'),
+        "image_base64": _b64encode(image_data),
+        "image_bytes": image_data,  # raw PNG, for callers that skip base64
         "width": width,
-        "height": height,
-        "saved_path": saved_path
+        "height": height
     }
 
 
-async def _save_screenshot_persistent(image_data: bytes) -> str:
-    """Save screenshot to persistent storage with timestamp."""
-    try:
-        # Ensure persistent directory exists
-        os.makedirs(PERSISTENT_SCREENSHOT_DIR, exist_ok=True)
+def _schedule_persistent_save(image_data: bytes) -> None:
+    """Start a background save; the screenshot is returned without waiting for the disk."""
+    task = asyncio.create_task(_save_screenshot_persistent(image_data))
+    # The loop only keeps weak references to tasks
+    _pending_saves.add(task)
+    task.add_done_callback(_pending_saves.discard)
 
-        # Generate filename with timestamp
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3]
-        filename = f"screenshot_{timestamp}.png"
-        filepath = os.path.join(PERSISTENT_SCREENSHOT_DIR, filename)
 
-        # Save the file
-        with open(filepath, 'wb') as f:
-            f.write(image_data)
+async def _save_screenshot_persistent(image_data: bytes) -> Optional[str]:
+    """Save screenshot to persistent storage with timestamp."""
+    # Generate filename with timestamp (at capture time, not write time)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3]
+    filename = f"screenshot_{timestamp}.png"
+    filepath = os.path.join(PERSISTENT_SCREENSHOT_DIR, filename)
 
+    try:
+        async with _save_slots:
+            await asyncio.to_thread(_write_persistent, filepath, image_data)
+        logger.info("Screenshot saved to: %s", filepath)
         return filepath
     except Exception as e:
-        logger.warning(f"Failed to save persistent screenshot: {e}")
+        logger.warning("Failed to save persistent screenshot: %s", e)
         return None
 
 
+def _write_persistent(filepath: str, image_data: bytes) -> None:
+    # Ensure persistent directory exists
+    os.makedirs(PERSISTENT_SCREENSHOT_DIR, exist_ok=True)
+    with open(filepath, 'wb') as f:
+        f.write(image_data)
+
+
 async def take_region_screenshot(
     x: int,
     y: int,
@@ -205,36 +302,29 @@ async def take_region_screenshot(
     output_path = os.path.join(SCREENSHOT_DIR, "region_screenshot.png")
 
     try:
-        # Use scrot with geometry
-        process = await asyncio.create_subprocess_exec(
-            'scrot', '-a', f'{x},{y},{width},{height}', '-o', output_path,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
-            env={**os.environ, 'DISPLAY': display}
-        )
-
-        await asyncio.wait_for(process.communicate(), timeout=10)
-
-        if process.returncode == 0:
-            return await _read_screenshot(output_path)
-
-        # Fallback: take full screenshot and crop
-        full_result = await take_screenshot(display)
-        if "error" in full_result:
-            return full_result
+        # Grab just the region in-process, else scrot with geometry
+        image_data = await _grab_display(display, {"left": x, "top": y, "width": width, "height": height})
+        if image_data is None:
+            image_data = await _take_screenshot_scrot(display, output_path, geometry=f'{x},{y},{width},{height}')
+        if image_data is not None:
+            return await _process_screenshot(image_data)
+
+        # Fallback: capture the full display and crop; the full frame is
+        # decoded once and never base64-encoded or saved
+        image_data = await _capture_raw(display, os.path.join(SCREENSHOT_DIR, "screenshot.png"))
+        if image_data is None:
+            return {"error": "No screenshot method available"}
 
-        # Decode and crop
-        image_data = base64.b64decode(full_result["image_base64"])
         img = Image.open(io.BytesIO(image_data))
         cropped = img.crop((x, y, x + width, y + height))
 
-        # Encode cropped image
+        # Encode cropped image (compress_level=1: lossless, much less zlib work)
         buffer = io.BytesIO()
-        cropped.save(buffer, format='PNG')
+        cropped.save(buffer, format='PNG', compress_level=1)
         cropped_data = buffer.getvalue()
 
         return {
-            "image_base64": base64.b64encode(cropped_data).decode('utf-8'),
+            "image_base64": _b64encode(cropped_data),
             "width": width,
             "height": height
         }
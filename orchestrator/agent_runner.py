@@ -15,12 +15,25 @@ Architecture:
 
 import json
 import logging
+import functools
 from pathlib import Path
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Callable
 import httpx
 import anthropic
 from dataclasses import dataclass
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import h2  # noqa: F401
+    H2_AVAILABLE = True
+except ImportError:
+    H2_AVAILABLE = False
+
 # Import S3 skill loader
 try:
     from .skill_loader import get_skill_loader
@@ -34,8 +47,27 @@ except ImportError:
         logger = logging.getLogger(__name__)
         logger.warning("S3 Skill Loader not available - skills will not be loaded")
 
+try:
+    from .tool_cache import ToolResultCache
+    from .tool_result import ToolResult
+    from .s3_skill_executor import execute_s3_skill
+except ImportError:
+    from tool_cache import ToolResultCache
+    from tool_result import ToolResult
+    from s3_skill_executor import execute_s3_skill
+
 logger = logging.getLogger(__name__)
 
+# Anthropic native tools handled locally -> NativeToolHandler method
+NATIVE_TOOL_METHODS = {
+    "bash": "handle_bash",
+    "str_replace_based_edit_tool": "handle_text_editor",
+    "computer": "handle_computer",
+}
+
+# Names the computer tool is known by (MCP servers may add their own variants)
+COMPUTER_TOOLS = frozenset({"computer", "computer_20250124", "computer_20241022"})
+
 
 @dataclass
 class MCPServer:
@@ -53,11 +85,20 @@ class MCPClient:
     Discovers tools dynamically from all enabled servers.
     """
 
-    def __init__(self, settings_path: str = ".claude/settings.json"):
+    def __init__(self, settings_path: str = ".claude/settings.json", http_client: Optional[httpx.Client] = None):
         self.settings_path = Path(settings_path)
         self.servers: Dict[str, MCPServer] = {}
         self.all_tools: List[Dict[str, Any]] = []
 
+        # One pooled client for every MCP request (httpx.Client is
+        # thread-safe; tools run on worker threads). Callers may inject one.
+        self._owns_http_client = http_client is None
+        self.http_client = http_client or httpx.Client(
+            timeout=httpx.Timeout(30.0, connect=5.0),
+            limits=httpx.Limits(max_connections=64, max_keepalive_connections=32, keepalive_expiry=60.0),
+            http2=H2_AVAILABLE,
+        )
+
     def load_settings(self) -> Dict[str, Any]:
         """Load MCP server configuration from settings.json."""
         if not self.settings_path.exists():
@@ -128,14 +169,13 @@ class MCPClient:
             "id": 1
         }
 
-        with httpx.Client(timeout=30.0) as client:
-            response = client.post(
-                url,
-                json=request,
-                headers={"Content-Type": "application/json"}
-            )
-            response.raise_for_status()
-            return response.json()
+        response = self.http_client.post(
+            url,
+            json=request,
+            headers={"Content-Type": "application/json"}
+        )
+        response.raise_for_status()
+        return response.json()
 
     def _discover_tools(self, url: str) -> List[Dict[str, Any]]:
         """Discover tools from an MCP server."""
@@ -179,6 +219,11 @@ class MCPClient:
 
         return str(content)
 
+    def close(self):
+        """Close the HTTP client (unless it was injected by the caller)."""
+        if self._owns_http_client:
+            self.http_client.close()
+
     def get_tools_for_anthropic(self) -> List[Dict[str, Any]]:
         """
         Get tools in Anthropic's tool format.
@@ -259,6 +304,22 @@ class DynamicAgent:
         # Track if computer tools are enabled
         self.computer_tools_enabled = False
 
+        # Tool name -> handler(tool_input) for native tools and S3 skills;
+        # anything else goes to the MCP client
+        self.skill_names: frozenset = frozenset()
+        self.cacheable_tools: frozenset = frozenset()
+        self.computer_tools: frozenset = COMPUTER_TOOLS
+        self._tool_dispatch: Dict[str, Callable[[Dict[str, Any]], Any]] = {}
+        self._native_handler = None
+        self.tool_cache = ToolResultCache()
+        self._rebuild_dispatch()
+
+        # Plain-dict copy of self.tools sent with every request, and the
+        # system prompt; both are rebuilt only when tools or skills change
+        self._tools_payload: List[Dict[str, Any]] = []
+        self._cached_system_prompt: Optional[str] = None
+        self._refresh_tools_payload()
+
         logger.info(f"✓ Dynamic Agent initialized")
         logger.info(f"  - MCP servers: {len(self.mcp_client.servers)}")
         logger.info(f"  - Tools discovered: {len(self.tools)}")
@@ -322,18 +383,125 @@ class DynamicAgent:
 
         # Set flag to include computer use guidance in system prompt
         self.computer_tools_enabled = True
+        self._refresh_tools_payload()
 
         logger.info(f"✓ Computer use tools enabled ({len(computer_tools)} tools added)")
         logger.info(f"   Note: Computer tool (screenshots, mouse/keyboard) provided via MCP server")
         return len(computer_tools)
 
+    def reload_skills(self):
+        """Re-download S3 skills and refresh the tool dispatch table."""
+        if self.skill_loader:
+            self.skills_loaded = len(self.skill_loader.get_skills(force_refresh=True)) > 0
+        self._rebuild_dispatch()
+        self._refresh_tools_payload()
+
+    def _refresh_tools_payload(self):
+        """Freeze self.tools into JSON-round-tripped dicts and drop the cached system prompt."""
+        if ORJSON_AVAILABLE:
+            self._tools_payload = orjson.loads(orjson.dumps(self.tools))
+        else:
+            self._tools_payload = json.loads(json.dumps(self.tools))
+        # A cache breakpoint on the last tool lets the API reuse the whole
+        # tool list from its prompt cache on later turns
+        if self._tools_payload:
+            self._tools_payload[-1]["cache_control"] = {"type": "ephemeral"}
+        self._cached_system_prompt = None
+
+    def _rebuild_dispatch(self):
+        """
+        Rebuild the tool dispatch table.
+
+        Native tools take precedence over S3 skills, matching the order
+        the servers used to check them in.
+        """
+        dispatch: Dict[str, Callable[[Dict[str, Any]], Any]] = {}
+        cacheable = {
+            tool["name"] for tool in self.mcp_client.all_tools
+            if tool.get("x-cacheable") or tool.get("inputSchema", {}).get("x-cacheable")
+        }
+
+        if self.skill_loader and self.skills_loaded:
+            skills = self.skill_loader.get_skills()
+            self.skill_names = frozenset(skills)
+            for name, skill_data in skills.items():
+                dispatch[name] = functools.partial(execute_s3_skill, self.skill_loader, name)
+                if (skill_data.get("metadata") or {}).get("cacheable") is True:
+                    cacheable.add(name)
+        else:
+            self.skill_names = frozenset()
+
+        for tool_name, method in NATIVE_TOOL_METHODS.items():
+            dispatch[tool_name] = functools.partial(self._call_native, method)
+
+        self.computer_tools = COMPUTER_TOOLS | {
+            tool["name"] for tool in self.mcp_client.all_tools if "computer" in tool["name"].lower()
+        }
+
+        # Native tools always mutate state (or read it, like screenshots)
+        self.cacheable_tools = frozenset(cacheable - NATIVE_TOOL_METHODS.keys())
+        self._tool_dispatch = dispatch
+        self.tool_cache.clear()
+        logger.debug(f"Tool dispatch rebuilt: {len(dispatch)} local handlers, "
+                     f"{len(self.cacheable_tools)} cacheable tools")
+
+    def _call_native(self, method: str, tool_input: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Run a native tool.
+
+        The handler module pulls in pyautogui/mss, so it is imported on the
+        first native call rather than at startup, then kept.
+        """
+        if self._native_handler is None:
+            try:
+                from .native_tool_handlers import get_handler
+            except ImportError:
+                from native_tool_handlers import get_handler
+            self._native_handler = get_handler()
+        return getattr(self._native_handler, method)(tool_input)
+
+    def get_tool_handler(self, tool_name: str) -> Callable[[Dict[str, Any]], Any]:
+        """Return the handler for *tool_name*, falling back to the MCP client."""
+        handler = self._tool_dispatch.get(tool_name)
+        if handler is None:
+            return functools.partial(self.mcp_client.call_tool, tool_name)
+        return handler
+
+    def run_tool(self, tool_name: str, tool_input: Dict[str, Any], use_cache: bool = True) -> ToolResult:
+        """
+        Execute a tool, reusing a recent result for cacheable tools.
+
+        Calls to any non-cacheable tool clear the cache, since they may
+        have changed what the cached reads would return.
+        """
+        if tool_name not in self.cacheable_tools:
+            self.tool_cache.clear()
+            return ToolResult.from_handler(self.get_tool_handler(tool_name)(tool_input))
+
+        key = self.tool_cache.make_key(tool_name, tool_input)
+        if use_cache:
+            result = self.tool_cache.get(key)
+            if result is not None:
+                logger.debug(f"Tool cache hit: {tool_name}")
+                return result
+        result = ToolResult.from_handler(self.get_tool_handler(tool_name)(tool_input))
+        self.tool_cache.put(key, result)
+        return result
+
     def _build_system_prompt(self) -> str:
         """
         Build system prompt with all available tools + S3 skills.
         Dynamically generated based on:
         1. Discovered MCP servers (tools)
         2. S3 skills (documentation + scripts)
+
+        The result is cached until tools or skills change.
         """
+        if self._cached_system_prompt is None:
+            self._cached_system_prompt = self._render_system_prompt()
+        return self._cached_system_prompt
+
+    def _render_system_prompt(self) -> str:
         prompt = "You are an AI agent with access to multiple tools across different MCP servers"
         if self.skills_loaded:
             prompt += " and pre-loaded skills from S3"
@@ -485,16 +653,13 @@ Multiple tools can be used in sequence to accomplish complex tasks.
                     max_tokens=4096,
                     system=system_prompt,
                     messages=conversation_history,
-                    tools=self.tools if self.tools else []
+                    tools=self._tools_payload
                 )
 
                 # Check stop reason
                 if response.stop_reason == "end_turn":
                     # Task complete
-                    final_text = ""
-                    for block in response.content:
-                        if hasattr(block, "text"):
-                            final_text += block.text
+                    final_text = "".join(block.text for block in response.content if block.type == "text")
 
                     logger.info(f"✓ Task completed in {turn + 1} turns, {tool_call_count} tool calls")
 
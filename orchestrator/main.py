@@ -75,6 +75,10 @@ async def lifespan(app: FastAPI):
     print(f"  Docs available at: http://localhost:8000/docs")
     print("=" * 70 + "\n")
     logger.info("Starting Computer-Use Orchestrator API...")
+    # Open the connection pool to the default container before the first task
+    local_container_url = os.getenv("LOCAL_CONTAINER_URL", "http://localhost:8080")
+    warm = await ComputerUseAgent.warm_up(local_container_url)
+    print(f"  [startup] HTTP pool to {local_container_url} warmed (healthy={warm})")
     yield
     print("\n" + "=" * 70)
     print("  ORCHESTRATOR API — SHUTTING DOWN")
@@ -91,9 +95,10 @@ async def lifespan(app: FastAPI):
         except Exception as e:
             print(f"  [shutdown] ERROR cleaning session {session_id}: {e}")
             logger.error(f"Error cleaning up session {session_id}: {e}")
-    # Close HTTP client
+    # Close HTTP clients
     await http_client.aclose()
-    print("  [shutdown] HTTP client closed")
+    await ComputerUseAgent.close_http_clients()
+    print("  [shutdown] HTTP clients closed")
     print("=" * 70 + "\n")
 
 
@@ -499,16 +504,10 @@ async def check_container_health(session_id: str):
     agent_info = active_agents[session_id]
     container_url = agent_info.get("container_url", session.container_url)
 
-    # Direct health check to container
-    try:
-        print(f"  [container-health] GET {container_url}/health")
-        response = await http_client.get(f"{container_url}/health")
-        healthy = response.status_code == 200
-        print(f"  [container-health] Response: {response.status_code} → healthy={healthy}")
-    except Exception as e:
-        print(f"  [container-health] FAILED: {e}")
-        logger.error(f"Container health check failed: {e}")
-        healthy = False
+    # Health check through the session's agent (cached briefly, shares its connection pool)
+    print(f"  [container-health] GET {container_url}/health")
+    healthy = await agent_info["agent"].health_check()
+    print(f"  [container-health] healthy={healthy}")
 
     return ContainerHealthResponse(
         session_id=session_id,
@@ -194,14 +194,22 @@ class NativeToolHandler:
         try:
             content = path.read_text(encoding='utf-8')
 
-            if old_str not in content:
+            # One find() locates the match, a second checks it is unique;
+            # the file is only counted in full when reporting ambiguity
+            idx = content.find(old_str)
+            if idx < 0:
                 return {
                     "error": f"String not found in file: {old_str[:50]}...",
                     "success": False
                 }
+            end = idx + len(old_str)
+            if content.find(old_str, end) != -1:
+                return {
+                    "error": f"String appears {content.count(old_str)} times. Be more specific.",
+                    "success": False
+                }
 
-            new_content = content.replace(old_str, new_str, 1)  # Replace first occurrence
-            path.write_text(new_content, encoding='utf-8')
+            path.write_text(content[:idx] + new_str + content[end:], encoding='utf-8')
 
             return {
                 "output": f"Replaced in {path}",
@@ -261,6 +269,7 @@ class NativeToolHandler:
             {
                 "output": "...",
                 "base64_image": "..." (for screenshot),
+                "_image_bytes": b"..." (for screenshot, not sent to Claude),
                 "success": true
             }
         """
@@ -349,13 +358,23 @@ class NativeToolHandler:
 
         # Fallback to container (if available)
         try:
-            response = httpx.get(f"{container_url}/screenshot", timeout=10)
-            response.raise_for_status()
-
-            data = response.json()
+            # Raw PNG avoids a base64 encode/decode round trip; containers
+            # without /screenshot/raw still get the JSON endpoint
+            response = httpx.get(f"{container_url}/screenshot/raw", timeout=10)
+            if response.status_code == 404:
+                response = httpx.get(f"{container_url}/screenshot", timeout=10)
+                response.raise_for_status()
+                b64 = response.json().get("base64_image", "")
+                image_bytes = base64.b64decode(b64) if b64 else None
+            else:
+                response.raise_for_status()
+                image_bytes = response.content
+                b64 = base64.b64encode(image_bytes).decode()
             return {
                 "output": "Screenshot captured",
-                "base64_image": data.get("base64_image", ""),
+                "base64_image": b64,
+                # Raw PNG for callers uploading it; "_" keys are not sent to Claude
+                "_image_bytes": image_bytes,
                 "success": True
             }
         except Exception as e:
@@ -0,0 +1,74 @@
+"""
+orchestrator/tool_cache.py
+--------------------------
+Short-lived memoization of read-only tool results.
+
+Only tools that declare themselves cacheable are memoized:
+  - MCP tools whose definition (or inputSchema) sets "x-cacheable": true
+  - S3 skills whose skill.md frontmatter sets "cacheable: true"
+
+Any other tool call may change state (bash, computer, file edits), so it
+clears the cache instead of being cached. Tools run in worker threads, so
+every operation takes a lock.
+"""
+
+import json
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CacheKey = Tuple[str, str]
+
+
+class ToolResultCache:
+    """LRU cache of tool results keyed on (tool_name, canonical input), with a TTL."""
+
+    def __init__(self, maxsize: int = 512, ttl: float = 30.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[CacheKey, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(tool_name: str, tool_input: Optional[Dict[str, Any]]) -> CacheKey:
+        """Canonical key: key order in the tool input does not matter."""
+        return tool_name, json.dumps(tool_input or {}, sort_keys=True, default=str)
+
+    def get(self, key: CacheKey) -> Optional[Any]:
+        """Return the cached result for *key*, or None if missing/expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            stored_at, value = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: CacheKey, value: Any):
+        """Store *value*, evicting the least recently used entries."""
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            if self._entries:
+                logger.debug(f"Tool result cache cleared ({len(self._entries)} entries)")
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,66 @@
+"""
+orchestrator/tool_result.py
+---------------------------
+Uniform result type for every tool the agent runs.
+
+Native tools return dicts, MCP tools and S3 skills return text. Wrapping
+both in a ToolResult lets the server build the Anthropic tool_result block
+directly, without a dict -> pretty-printed JSON -> dict round trip, and
+carries the raw screenshot bytes alongside (never sent to Claude).
+"""
+
+import json
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+@dataclass(slots=True)
+class ToolResult:
+    content: Any
+    is_error: bool = False
+    image_bytes: Optional[bytes] = None
+
+    @classmethod
+    def from_handler(cls, result: Any) -> "ToolResult":
+        """
+        Wrap a handler's return value.
+
+        Dict results (native tools) lose their "_"-prefixed keys, which
+        carry data for the server only (e.g. _image_bytes), and count as
+        errors when they report success: False.
+        """
+        if isinstance(result, ToolResult):
+            return result
+        if isinstance(result, dict):
+            return cls(
+                content={k: v for k, v in result.items() if not k.startswith("_")},
+                is_error=result.get("success") is False,
+                image_bytes=result.get("_image_bytes"),
+            )
+        return cls(content=str(result))
+
+    @property
+    def text(self) -> str:
+        """Content as the string sent to Claude (lists are left to the API)"""
+        if isinstance(self.content, str):
+            return self.content
+        if ORJSON_AVAILABLE:
+            return orjson.dumps(self.content).decode()
+        return json.dumps(self.content)
+
+    def as_anthropic_content(self, tool_use_id: str) -> Dict[str, Any]:
+        """Build the tool_result block for the Messages API"""
+        block = {
+            "type": "tool_result",
+            "tool_use_id": tool_use_id,
+            "content": self.content if isinstance(self.content, list) else self.text,
+        }
+        if self.is_error:
+            block["is_error"] = True
+        return block
@@ -45,6 +45,11 @@ class TestAgentConfig:
             config = AgentConfig()
             assert config.container_url == "http://myhost:9090"
 
+    def test_config_default_wait_seconds_from_env(self):
+        with patch.dict(os.environ, {"DEFAULT_WAIT_SECONDS": "0.2"}):
+            config = AgentConfig()
+            assert config.default_wait_seconds == 0.2
+
     def test_config_validation_fails_without_key(self):
         config = AgentConfig()
         config.anthropic_api_key = ""
@@ -71,13 +76,14 @@ class TestAgentToolExecution:
     @pytest.mark.asyncio
     async def test_exec_bash(self, agent):
         """Test bash execution."""
-        mock_response = AsyncMock()
-        mock_response.json.return_value = {
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.is_success = True
+        mock_response.content = json.dumps({
             "stdout": "Hello, World!",
             "stderr": "",
             "return_code": 0,
-        }
-        mock_response.raise_for_status = MagicMock()
+        }).encode()
         agent.http = AsyncMock()
         agent.http.post.return_value = mock_response
 
@@ -87,13 +93,14 @@ class TestAgentToolExecution:
     @pytest.mark.asyncio
     async def test_exec_bash_error(self, agent):
         """Test bash with non-zero exit code."""
-        mock_response = AsyncMock()
-        mock_response.json.return_value = {
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.is_success = True
+        mock_response.content = json.dumps({
             "stdout": "",
             "stderr": "command not found",
             "return_code": 127,
-        }
-        mock_response.raise_for_status = MagicMock()
+        }).encode()
         agent.http = AsyncMock()
         agent.http.post.return_value = mock_response
 
@@ -104,13 +111,14 @@ class TestAgentToolExecution:
     @pytest.mark.asyncio
     async def test_exec_computer_screenshot(self, agent):
         """Test screenshot action."""
-        mock_response = AsyncMock()
-        mock_response.json.return_value = {
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.headers = {"content-type": "application/json"}
+        mock_response.content = json.dumps({
             "image_base64": "dGVzdA==",
             "width": 1920,
             "height": 1080,
-        }
-        mock_response.raise_for_status = MagicMock()
+        }).encode()
         agent.http = AsyncMock()
         agent.http.get.return_value = mock_response
 
@@ -119,6 +127,45 @@ class TestAgentToolExecution:
         assert result[0]["type"] == "image"
         assert result[0]["source"]["type"] == "base64"
 
+    @pytest.mark.asyncio
+    async def test_screenshot_reused_until_screen_changes(self, agent):
+        """Test that back-to-back screenshots share one container request."""
+        mock_response = MagicMock()
+        mock_response.headers = {"content-type": "application/json"}
+        mock_response.content = json.dumps({"image_base64": "dGVzdA==", "width": 1920, "height": 1080}).encode()
+        agent.http = AsyncMock()
+        agent.http.get.return_value = mock_response
+
+        first = await agent._execute_tool("computer", {"action": "screenshot"})
+        second = await agent._execute_tool("computer", {"action": "screenshot"})
+        assert second is first
+        assert agent.http.get.call_count == 1
+
+        await agent._execute_tool("computer", {"action": "left_click", "coordinate": [1, 2]})
+        await agent._execute_tool("computer", {"action": "screenshot"})
+        assert agent.http.get.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_screenshot_raw_png(self, agent):
+        """Test raw PNG screenshots are base64-encoded once on the agent side."""
+        mock_response = MagicMock()
+        mock_response.headers = {"content-type": "image/png", "x-image-width": "1920", "x-image-height": "1080"}
+        mock_response.content = b"test"
+        agent.http = AsyncMock()
+        agent.http.get.return_value = mock_response
+
+        result = await agent._exec_computer({"action": "screenshot"})
+        assert result[0]["source"]["data"] == "dGVzdA=="
+        assert agent.http.get.call_args[1]["headers"]["Accept"] == "image/png"
+
+    @pytest.mark.asyncio
+    async def test_exec_computer_wait_is_capped(self, agent):
+        """Test the wait action never sleeps longer than MAX_WAIT_SECONDS."""
+        with patch("agent.computer_use_agent.asyncio.sleep", new=AsyncMock()) as sleep:
+            result = await agent._exec_computer({"action": "wait", "duration": 3600})
+        sleep.assert_awaited_once_with(60.0)
+        assert result == "Waited 60.0 second(s)"
+
     @pytest.mark.asyncio
     async def test_exec_computer_click(self, agent):
         """Test left_click action."""
@@ -132,6 +179,19 @@ class TestAgentToolExecution:
         assert "100" in result
         assert "200" in result
 
+    @pytest.mark.asyncio
+    async def test_exec_computer_double_click(self, agent):
+        """Test double_click is sent as one click with click_count=2."""
+        mock_response = AsyncMock()
+        mock_response.raise_for_status = MagicMock()
+        agent.http = AsyncMock()
+        agent.http.post.return_value = mock_response
+
+        result = await agent._exec_computer({"action": "double_click", "coordinate": [10, 20]})
+        assert "double_click" in result
+        assert agent.http.post.call_count == 1
+        assert json.loads(agent.http.post.call_args[1]["content"])["params"]["click_count"] == 2
+
     @pytest.mark.asyncio
     async def test_exec_computer_type(self, agent):
         """Test type action."""
@@ -168,16 +228,31 @@ class TestAgentToolExecution:
     @pytest.mark.asyncio
     async def test_exec_editor_view(self, agent):
         """Test editor view command."""
-        mock_response = AsyncMock()
+        mock_response = MagicMock()
         mock_response.status_code = 200
-        mock_response.json.return_value = {"content": "line 1\nline 2\nline 3"}
-        mock_response.raise_for_status = MagicMock()
+        mock_response.is_success = True
+        mock_response.content = json.dumps({"content": "line 1\nline 2\nline 3"}).encode()
         agent.http = AsyncMock()
         agent.http.post.return_value = mock_response
 
         result = await agent._exec_editor({"command": "view", "path": "/workspace/test.txt"})
         assert "1\t" in result  # line numbers
 
+    @pytest.mark.asyncio
+    async def test_post_json_raises_on_error_status(self, agent):
+        """Test non-2xx container replies raise without decoding the body."""
+        from agent.computer_use_agent import ContainerHTTPError
+        mock_response = MagicMock()
+        mock_response.is_success = False
+        mock_response.status_code = 503
+        agent.http = AsyncMock()
+        agent.http.post.return_value = mock_response
+
+        with pytest.raises(ContainerHTTPError) as exc:
+            await agent._post_json(agent._url_bash, {"command": "ls"})
+        assert exc.value.status_code == 503
+        assert "503" in str(exc.value)
+
     @pytest.mark.asyncio
     async def test_exec_editor_create(self, agent):
         """Test editor create command."""
@@ -192,18 +267,24 @@ class TestAgentToolExecution:
     @pytest.mark.asyncio
     async def test_exec_editor_str_replace(self, agent):
         """Test editor str_replace command."""
+        # Container without the patch endpoint: falls back to read + write
+        no_patch = MagicMock()
+        no_patch.status_code = 501
+
         # Mock read response
-        read_response = AsyncMock()
+        read_response = MagicMock()
         read_response.status_code = 200
-        read_response.json.return_value = {"content": "hello world"}
-        read_response.raise_for_status = MagicMock()
+        read_response.is_success = True
+        read_response.content = json.dumps({"content": "hello world"}).encode()
 
         # Mock write response
-        write_response = AsyncMock()
-        write_response.raise_for_status = MagicMock()
+        write_response = MagicMock()
+        write_response.status_code = 200
+        write_response.is_success = True
+        write_response.content = json.dumps({"status": "success"}).encode()
 
         agent.http = AsyncMock()
-        agent.http.post.side_effect = [read_response, write_response]
+        agent.http.post.side_effect = [no_patch, read_response, write_response]
 
         result = await agent._exec_editor({
             "command": "str_replace",
@@ -212,6 +293,92 @@ class TestAgentToolExecution:
             "new_str": "goodbye",
         })
         assert "Replaced" in result
+        assert json.loads(agent.http.post.call_args[1]["content"])["content"] == "goodbye world"
+
+    @pytest.mark.asyncio
+    async def test_exec_editor_str_replace_via_patch(self, agent):
+        """Test str_replace uses the single-call patch endpoint."""
+        patch_response = MagicMock()
+        patch_response.status_code = 200
+        patch_response.content = json.dumps({"status": "success", "count": 2, "applied": False}).encode()
+        agent.http = AsyncMock()
+        agent.http.post.return_value = patch_response
+
+        result = await agent._exec_editor({
+            "command": "str_replace",
+            "path": "/workspace/test.txt",
+            "old_str": "hello",
+            "new_str": "goodbye",
+        })
+        assert result == "Error: String appears 2 times. Be more specific."
+        assert agent.http.post.call_count == 1
+        assert agent.http.post.call_args[0][0].endswith("/tools/file/patch")
+
+    @pytest.mark.asyncio
+    async def test_exec_editor_patch_non_json_404_falls_back(self, agent):
+        """Test a proxy's HTML 404 for the patch endpoint falls back to read + write."""
+        proxy_404 = MagicMock()
+        proxy_404.status_code = 404
+        proxy_404.content = b"<html><body>404 Not Found</body></html>"
+        read_response = MagicMock()
+        read_response.status_code = 200
+        read_response.is_success = True
+        read_response.content = json.dumps({"content": "hello world"}).encode()
+        write_response = MagicMock()
+        write_response.status_code = 200
+        write_response.is_success = True
+        write_response.content = b"{}"
+        agent.http = AsyncMock()
+        agent.http.post.side_effect = [proxy_404, read_response, write_response]
+
+        result = await agent._exec_editor({
+            "command": "str_replace",
+            "path": "/workspace/test.txt",
+            "old_str": "hello",
+            "new_str": "goodbye",
+        })
+        assert result == "Replaced text in /workspace/test.txt"
+
+    @pytest.mark.asyncio
+    async def test_exec_editor_fallback_write_failure(self, agent):
+        """Test a failed write-back in the read/write fallback is reported, not swallowed."""
+        no_patch = MagicMock()
+        no_patch.status_code = 501
+        read_response = MagicMock()
+        read_response.status_code = 200
+        read_response.is_success = True
+        read_response.content = json.dumps({"content": "hello world"}).encode()
+        write_response = MagicMock()
+        write_response.status_code = 500
+        write_response.is_success = False
+        agent.http = AsyncMock()
+        agent.http.post.side_effect = [no_patch, read_response, write_response]
+
+        result = await agent._execute_tool("str_replace_based_edit_tool", {
+            "command": "str_replace",
+            "path": "/workspace/test.txt",
+            "old_str": "hello",
+            "new_str": "goodbye",
+        })
+        assert result.startswith("Error: Container returned HTTP 500")
+
+    @pytest.mark.asyncio
+    async def test_exec_editor_view_revalidates_cache(self, agent):
+        """Test a repeated view sends the etag and reuses the cached copy on 304."""
+        first = MagicMock()
+        first.status_code = 200
+        first.content = json.dumps({
+            "content": "   1\thello", "numbered": True, "total_lines": 1, "etag": '"abc"',
+        }).encode()
+        not_modified = MagicMock()
+        not_modified.status_code = 304
+        agent.http = AsyncMock()
+        agent.http.post.side_effect = [first, not_modified]
+
+        view = {"command": "view", "path": "/workspace/test.txt"}
+        assert await agent._exec_editor(view) == "   1\thello"
+        assert await agent._exec_editor(view) == "   1\thello"
+        assert json.loads(agent.http.post.call_args[1]["content"])["if_etag"] == '"abc"'
 
     @pytest.mark.asyncio
     async def test_execute_tool_unknown(self, agent):
@@ -219,6 +386,144 @@ class TestAgentToolExecution:
         result = await agent._execute_tool("unknown_tool", {})
         assert "Unknown tool" in result
 
+    @pytest.mark.asyncio
+    async def test_execute_many_preserves_order(self, agent):
+        """Test that concurrent tool calls return results in input order."""
+        async def slow_bash(inp):
+            await asyncio.sleep(0.05)
+            return "bash done"
+
+        async def fast_editor(inp):
+            return f"viewed {inp['path']}"
+
+        agent._exec_bash = slow_bash
+        agent._exec_editor = fast_editor
+
+        results = await agent.execute_many([
+            ("bash", {"command": "sleep 1"}),
+            ("str_replace_based_edit_tool", {"command": "view", "path": "/workspace/a.txt"}),
+            ("unknown_tool", {}),
+        ])
+        assert results == ["bash done", "viewed /workspace/a.txt", "Unknown tool: unknown_tool"]
+
+    @pytest.mark.asyncio
+    async def test_execute_many_serializes_same_resource(self, agent):
+        """Test that calls on the same resource run one at a time, in order."""
+        order = []
+
+        async def record(inp):
+            order.append(("start", inp["action"]))
+            await asyncio.sleep(0.01)
+            order.append(("end", inp["action"]))
+            return inp["action"]
+
+        agent._exec_computer = record
+
+        results = await agent.execute_many([
+            ("computer", {"action": "left_click"}),
+            ("computer", {"action": "screenshot"}),
+        ])
+        assert results == ["left_click", "screenshot"]
+        assert order == [
+            ("start", "left_click"), ("end", "left_click"),
+            ("start", "screenshot"), ("end", "screenshot"),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_execute_many_keeps_turn_order(self, agent):
+        """Test a turn with any mutating call runs every call in order."""
+        order = []
+
+        async def record(inp):
+            label = inp.get("command") or inp.get("path")
+            order.append(("start", label))
+            await asyncio.sleep(0.01)
+            order.append(("end", label))
+            return label
+
+        agent._exec_editor = record
+        agent._exec_bash = record
+
+        results = await agent.execute_many([
+            ("str_replace_based_edit_tool", {"command": "create", "path": "/workspace/run.sh"}),
+            ("bash", {"command": "sh /workspace/run.sh"}),
+        ])
+        assert results == ["create", "sh /workspace/run.sh"]
+        assert order == [
+            ("start", "create"), ("end", "create"),
+            ("start", "sh /workspace/run.sh"), ("end", "sh /workspace/run.sh"),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_execute_many_read_only_concurrent(self, agent):
+        """Test a turn of only read-only calls runs them concurrently."""
+        running = 0
+        peak = 0
+
+        async def view(inp):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return inp["path"]
+
+        agent._exec_editor = view
+
+        results = await agent.execute_many([
+            ("str_replace_based_edit_tool", {"command": "view", "path": "/workspace/a.txt"}),
+            ("str_replace_based_edit_tool", {"command": "view", "path": "/workspace/b.txt"}),
+        ])
+        assert results == ["/workspace/a.txt", "/workspace/b.txt"]
+        assert peak == 2
+
+    @pytest.mark.asyncio
+    async def test_execute_many_batches_input_actions(self, agent):
+        """Test consecutive key/type actions are sent as one batch request."""
+        batch_response = MagicMock()
+        batch_response.content = json.dumps({
+            "status": "success",
+            "data": {"results": [{"typed": "a"}, {"typed": "[Enter]"}]},
+        }).encode()
+        agent.http = AsyncMock()
+        agent.http.post.return_value = batch_response
+
+        results = await agent.execute_many([
+            ("computer", {"action": "type", "text": "a"}),
+            ("computer", {"action": "key", "key": "Return"}),
+        ])
+        assert results == ["Typed text", "Pressed key: Return"]
+        assert agent.http.post.call_count == 1
+        body = json.loads(agent.http.post.call_args[1]["content"])
+        assert body["action"] == "batch"
+        assert [op["params"]["text"] for op in body["params"]["ops"]] == ["a", "[Enter]"]
+
+    @pytest.mark.asyncio
+    async def test_health_check_is_cached(self, agent):
+        """Test repeated health checks within the TTL hit the container once."""
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        agent.http = AsyncMock()
+        agent.http.get.return_value = mock_response
+
+        assert await agent.health_check() is True
+        assert await agent.health_check() is True
+        assert agent.http.get.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_http_client_shared_per_container(self):
+        """Test agents for the same container share one HTTP client."""
+        from agent.computer_use_agent import ComputerUseAgent
+        url = "http://shared-client-test:8080"
+        a = ComputerUseAgent(container_url=url, api_key="test-key")
+        b = ComputerUseAgent(container_url=url, api_key="test-key")
+        assert a.http is b.http
+
+        await a.cleanup()
+        assert not b.http.is_closed
+        await b.cleanup()
+        assert b.http.is_closed
+
     def test_reset_conversation(self, agent):
         """Test conversation reset."""
         agent.conversation_history = [{"role": "user", "content": "test"}]
@@ -233,6 +538,39 @@ class TestAgentToolExecution:
         assert history is not agent.conversation_history  # must be a copy
 
 
+# ── Editor Helper Tests ──────────────────────────────────────────────
+
+class TestEditorHelpers:
+    """Test the agent's pure editor helpers."""
+
+    def test_replace_unique(self):
+        from agent.computer_use_agent import _replace_unique
+        assert _replace_unique("hello world", "world", "there") == ("hello there", 1)
+
+    def test_replace_unique_not_found(self):
+        from agent.computer_use_agent import _replace_unique
+        assert _replace_unique("hello world", "moon", "sun") == (None, 0)
+
+    def test_replace_unique_ambiguous(self):
+        from agent.computer_use_agent import _replace_unique
+        assert _replace_unique("a-a-a", "a", "b") == (None, 3)
+
+    def test_insert_line(self):
+        from agent.computer_use_agent import _insert_line
+        assert _insert_line("a\nb", 0, "x") == "x\na\nb"
+        assert _insert_line("a\nb", 1, "x") == "a\nx\nb"
+        assert _insert_line("a\nb", 9, "x") == "a\nb\nx"
+
+    @pytest.mark.asyncio
+    async def test_apply_edit_offloads_large_content(self):
+        from agent.computer_use_agent import _apply_edit, _replace_unique, EDIT_OFFLOAD_BYTES
+        content = "x" * EDIT_OFFLOAD_BYTES + "needle"
+        with patch("agent.computer_use_agent.asyncio.to_thread", wraps=asyncio.to_thread) as to_thread:
+            new_content, count = await _apply_edit(_replace_unique, content, "needle", "pin")
+        assert count == 1 and new_content.endswith("pin")
+        to_thread.assert_called_once()
+
+
 # ── Session Manager Tests ────────────────────────────────────────────
 
 class TestSessionManager:
@@ -328,5 +666,52 @@ class TestToolResultFormatting:
         assert "Error" in result
 
 
+
+# ── Tool Result Cache Tests ──────────────────────────────────────────
+
+class TestToolResultCache:
+    """Test memoization of cacheable tool results."""
+
+    def test_key_ignores_input_order(self):
+        from orchestrator.tool_cache import ToolResultCache
+        assert ToolResultCache.make_key("t", {"a": 1, "b": 2}) == ToolResultCache.make_key("t", {"b": 2, "a": 1})
+
+    def test_entries_expire(self):
+        from orchestrator.tool_cache import ToolResultCache
+        cache = ToolResultCache(ttl=0.0)
+        key = cache.make_key("t", {})
+        cache.put(key, "result")
+        assert cache.get(key) is None
+
+    def test_lru_eviction(self):
+        from orchestrator.tool_cache import ToolResultCache
+        cache = ToolResultCache(maxsize=2)
+        for name in ("a", "b", "c"):
+            cache.put(cache.make_key(name, {}), name)
+        assert cache.get(cache.make_key("a", {})) is None
+        assert cache.get(cache.make_key("c", {})) == "c"
+
+
+class TestToolResult:
+    """Test the ToolResult -> tool_result block conversion."""
+
+    def test_native_dict_result(self):
+        from orchestrator.tool_result import ToolResult
+        result = ToolResult.from_handler({"output": "hi", "success": True, "_image_bytes": b"png"})
+        assert result.image_bytes == b"png"
+        block = result.as_anthropic_content("toolu_1")
+        assert block["tool_use_id"] == "toolu_1"
+        assert json.loads(block["content"]) == {"output": "hi", "success": True}
+        assert "is_error" not in block
+
+    def test_failed_native_result_is_error(self):
+        from orchestrator.tool_result import ToolResult
+        block = ToolResult.from_handler({"error": "boom", "success": False}).as_anthropic_content("t")
+        assert block["is_error"] is True
+
+    def test_text_result_passes_through(self):
+        from orchestrator.tool_result import ToolResult
+        assert ToolResult.from_handler("done").as_anthropic_content("t")["content"] == "done"
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -0,0 +1,237 @@
+"""
+Container Tool Unit Tests.
+
+Tests the container-side tools (file, bash, screenshot helpers) directly,
+without the tool server. The workspace root is pointed at a temp dir.
+
+Usage:
+    pytest tests/test_container_tools.py -v
+"""
+
+import pytest
+import os
+import sys
+
+# The tools package __init__ imports playwright; load the modules directly
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "container", "tools"))
+
+import file_tool
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    """Point file_tool at a temp workspace."""
+    root = os.path.realpath(tmp_path)
+    monkeypatch.setattr(file_tool, "_WS", root)
+    monkeypatch.setattr(file_tool, "_WS_PREFIX", root + os.sep)
+    monkeypatch.setattr(file_tool, "_read_cache", type(file_tool._read_cache)())
+    return tmp_path
+
+
+# ── Path Validation Tests ────────────────────────────────────────────
+
+class TestValidatePath:
+    """Test workspace path validation."""
+
+    def test_relative_and_dotdot(self, workspace):
+        assert str(file_tool._validate_path("a/../b.txt")) == os.path.join(file_tool._WS, "b.txt")
+        with pytest.raises(PermissionError):
+            file_tool._validate_path("../outside")
+
+    def test_symlinked_file_outside_rejected(self, workspace, tmp_path_factory):
+        outside = tmp_path_factory.mktemp("outside")
+        (outside / "secret").write_text("x")
+        os.symlink(outside / "secret", workspace / "link")
+        with pytest.raises(PermissionError):
+            file_tool._validate_path("link")
+
+    def test_directory_swapped_for_symlink_rejected(self, workspace, tmp_path_factory):
+        outside = tmp_path_factory.mktemp("outside")
+        (outside / "secret").write_text("x")
+        (workspace / "d").mkdir()
+        (workspace / "d" / "secret").write_text("ok")
+        assert file_tool._validate_path("d/secret")
+
+        # Replace the already-validated directory with a symlink out
+        (workspace / "d" / "secret").unlink()
+        (workspace / "d").rmdir()
+        os.symlink(outside, workspace / "d")
+        with pytest.raises(PermissionError):
+            file_tool._validate_path("d/secret")
+
+
+# ── File Copy Tests ──────────────────────────────────────────────────
+
+class TestCopyFile:
+    """Test copy_file."""
+
+    @pytest.mark.asyncio
+    async def test_copy_creates_parents(self, workspace):
+        (workspace / "src.bin").write_bytes(b"\x00\xff" * 100000)
+        assert await file_tool.copy_file("src.bin", "out/dst.bin") == 200000
+        assert (workspace / "out" / "dst.bin").read_bytes() == (workspace / "src.bin").read_bytes()
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("dst", ["a.txt", "./a.txt", "sub/../a.txt", "hard.txt"])
+    async def test_copy_onto_itself_keeps_data(self, workspace, dst):
+        (workspace / "a.txt").write_text("keep me")
+        os.link(workspace / "a.txt", workspace / "hard.txt")
+        with pytest.raises(ValueError):
+            await file_tool.copy_file("a.txt", dst)
+        assert (workspace / "a.txt").read_text() == "keep me"
+
+    @pytest.mark.asyncio
+    async def test_missing_source_leaves_no_directories(self, workspace):
+        with pytest.raises(FileNotFoundError):
+            await file_tool.copy_file("nope.txt", "new/dir/dst.txt")
+        assert not (workspace / "new").exists()
+
+
+# ── File Read Tests ──────────────────────────────────────────────────
+
+class TestReadFile:
+    """Test read_file and the read helpers."""
+
+    @pytest.mark.asyncio
+    async def test_large_file_decoded(self, workspace):
+        text = "héllo wörld\n" * 200000
+        (workspace / "big.txt").write_text(text)
+        assert await file_tool.read_file("big.txt") == text
+
+    @pytest.mark.asyncio
+    async def test_invalid_utf8_replaced(self, workspace):
+        (workspace / "bad.txt").write_bytes(b"ok\xff" * 500000)
+        content = await file_tool.read_file("bad.txt")
+        assert content == "ok�" * 500000
+
+    def test_read_all_matches_file(self, workspace):
+        data = os.urandom(3 * 1024 * 1024 + 7)
+        (workspace / "blob").write_bytes(data)
+        assert file_tool._read_all(workspace / "blob") == data
+
+
+# ── Bash Tool Tests ──────────────────────────────────────────────────
+
+@pytest.fixture
+def bash_tool():
+    """bash_tool, skipped when msgspec is not installed."""
+    pytest.importorskip("msgspec")
+    import bash_tool
+    return bash_tool
+
+
+class TestBashTool:
+    """Test bash command execution."""
+
+    @pytest.mark.asyncio
+    async def test_missing_binary_falls_back_to_shell(self, bash_tool, tmp_path):
+        result = await bash_tool.execute_bash("no-such-binary-xyz --flag", working_dir=str(tmp_path))
+        assert result.return_code == 127
+        assert "not found" in result.stderr
+
+    @pytest.mark.asyncio
+    async def test_script_without_shebang_runs_in_shell(self, bash_tool, tmp_path):
+        script = tmp_path / "noshebang.sh"
+        script.write_text("echo hi\n")
+        script.chmod(0o755)
+        result = await bash_tool.execute_bash("./noshebang.sh", working_dir=str(tmp_path))
+        assert result.return_code == 0
+        assert result.stdout == "hi\n"
+
+    @pytest.mark.asyncio
+    async def test_non_executable_falls_back_to_shell(self, bash_tool, tmp_path):
+        script = tmp_path / "noexec.sh"
+        script.write_text("echo hi\n")
+        script.chmod(0o644)
+        result = await bash_tool.execute_bash("./noexec.sh", working_dir=str(tmp_path))
+        assert result.return_code == 126
+        assert "Permission denied" in result.stderr
+
+    @pytest.mark.asyncio
+    async def test_output_truncated_at_max_size(self, bash_tool, tmp_path):
+        result = await bash_tool.execute_bash("head -c 300000 /dev/zero", working_dir=str(tmp_path))
+        assert result.return_code == 0
+        assert result.stdout == "\0" * bash_tool.MAX_OUTPUT_SIZE + bash_tool._TRUNCATED_SUFFIX
+
+    @pytest.mark.asyncio
+    async def test_timeout_kills_command(self, bash_tool, tmp_path):
+        result = await bash_tool.execute_bash("sleep 30", timeout=0.3, working_dir=str(tmp_path))
+        assert result.return_code == -1
+        assert "timed out" in result.stderr
+
+    @pytest.mark.asyncio
+    async def test_timeout_kills_term_ignoring_command(self, bash_tool, tmp_path, monkeypatch):
+        monkeypatch.setattr(bash_tool, "_KILL_GRACE", 0.2)
+        result = await bash_tool.execute_bash(
+            "trap '' TERM; sleep 30", timeout=0.3, working_dir=str(tmp_path)
+        )
+        assert result.return_code == -1
+        assert "timed out" in result.stderr
+
+    @pytest.mark.asyncio
+    async def test_interactive_feeds_stdin(self, bash_tool, tmp_path):
+        result = await bash_tool.execute_bash_interactive("cat", input_text="hello\n", working_dir=str(tmp_path))
+        assert result.stdout == "hello\n"
+        assert result.return_code == 0
+
+    @pytest.mark.asyncio
+    async def test_interactive_large_stdin(self, bash_tool, tmp_path):
+        # Larger than a pipe buffer, so stdin must be fed while output drains
+        result = await bash_tool.execute_bash_interactive(
+            "wc -c", input_text="x" * (2 * 1024 * 1024), working_dir=str(tmp_path)
+        )
+        assert result.stdout.strip() == str(2 * 1024 * 1024)
+
+
+# ── Screenshot Helper Tests ──────────────────────────────────────────
+
+class TestPngSize:
+    """Test reading PNG dimensions from the header."""
+
+    def test_reads_ihdr(self):
+        import io
+        from PIL import Image
+        import screenshot_tool
+
+        buf = io.BytesIO()
+        Image.new("RGB", (123, 45)).save(buf, format="PNG")
+        assert screenshot_tool._png_size(buf.getvalue()) == (123, 45)
+
+    def test_non_png_falls_back_to_pil(self):
+        import io
+        from PIL import Image
+        import screenshot_tool
+
+        buf = io.BytesIO()
+        Image.new("RGB", (7, 9)).save(buf, format="BMP")
+        assert screenshot_tool._png_size(buf.getvalue()) == (7, 9)
+
+
+# ── Read Cache Tests ─────────────────────────────────────────────────
+
+class TestReadCache:
+    """Test the stat-validated read cache and etags."""
+
+    def test_same_size_rewrite_within_tick_not_stale(self, workspace):
+        f = workspace / "f.txt"
+        f.write_text("aaaa")
+        st = os.stat(f)
+        assert file_tool._read_cached(f) == b"aaaa"
+
+        # Rewrite in place with the same size and restore the old mtime,
+        # as happens when both writes land in one timer tick
+        f.write_text("bbbb")
+        os.utime(f, ns=(st.st_atime_ns, st.st_mtime_ns))
+        assert file_tool._read_cached(f) == b"bbbb"
+        assert file_tool.file_etag("f.txt") is None
+
+    def test_settled_file_cached_and_etagged(self, workspace):
+        f = workspace / "f.txt"
+        f.write_text("aaaa")
+        old = os.stat(f).st_mtime_ns - 10**9
+        os.utime(f, ns=(old, old))
+        assert file_tool._read_cached(f) == b"aaaa"
+        assert str(f) in file_tool._read_cache
+        etag = file_tool.file_etag("f.txt")
+        assert etag is not None
+        assert file_tool.file_etag("f.txt") == etag